@@ -0,0 +1,66 @@
+from functools import lru_cache
+
+from sympy import Basic
+
+from estimates.profiling import count
+
+# A cache for sympy assumption queries (`expr.is_positive`, `expr.is_real`, etc.).
+# Sympy derives these facts afresh for every new instance of a compound expression, which is slow, and the same expressions are queried repeatedly by the tactics.
+# Since the answer to such a query depends only on the expression (the assumptions on the variables are part of the variables themselves), the answers can be safely memoized.
+# Queries made within a proof are memoized in a table attached to the proof state (and shared with its copies); other queries are memoized in a bounded project-level cache.
+
+ASSUMPTION_CACHE_SIZE = 2**14   # The maximum number of queries held in the project-level cache
+
+
+@lru_cache(maxsize=ASSUMPTION_CACHE_SIZE)
+def _query(expr: Basic, fact: str) -> bool | None:
+    """Query sympy's assumption system, memoized in the project-level cache."""
+    return getattr(expr, "is_" + fact)
+
+
+def ask(
+    expr: Basic, fact: str, cache: dict[tuple[Basic, str], bool | None] | None = None
+) -> bool | None:
+    """
+    Return `expr.is_<fact>` (e.g., `ask(x, "positive")` returns `x.is_positive`), memoized in the given cache, or in the project-level cache if no cache is given.
+    Atoms (such as the variables declared by `Type` hypotheses, or numbers) store their assumptions directly, so these are answered directly without using a cache.
+    """
+    if expr.is_Atom:
+        return getattr(expr, "is_" + fact)
+    if cache is None:
+        return _query(expr, fact)
+    key = (expr, fact)
+    if key in cache:
+        count("assumption_cache_hits")
+    else:
+        count("assumption_cache_misses")
+        cache[key] = getattr(expr, "is_" + fact)
+    return cache[key]
+
+
+def is_positive(
+    expr: Basic, cache: dict[tuple[Basic, str], bool | None] | None = None
+) -> bool | None:
+    """A cached version of `expr.is_positive`."""
+    return ask(expr, "positive", cache)
+
+
+def is_nonnegative(
+    expr: Basic, cache: dict[tuple[Basic, str], bool | None] | None = None
+) -> bool | None:
+    """A cached version of `expr.is_nonnegative`."""
+    return ask(expr, "nonnegative", cache)
+
+
+def is_real(
+    expr: Basic, cache: dict[tuple[Basic, str], bool | None] | None = None
+) -> bool | None:
+    """A cached version of `expr.is_real`."""
+    return ask(expr, "real", cache)
+
+
+def is_integer(
+    expr: Basic, cache: dict[tuple[Basic, str], bool | None] | None = None
+) -> bool | None:
+    """A cached version of `expr.is_integer`."""
+    return ask(expr, "integer", cache)
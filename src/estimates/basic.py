@@ -1,7 +1,9 @@
+from collections.abc import Set as AbstractSet
 from typing import Any
 
 from sympy import Basic, Expr, S, Symbol, false, true
 
+from estimates.assumptions import ask
 from estimates.order_of_magnitude import OrderSymbol
 from estimates.proposition import Proposition
 
@@ -13,35 +15,35 @@ def typeof(obj: Basic) -> str:
     Return a string describing the type of the object.  This is used to determine the type of a variable in a declaration.
     TODO: implement a more sophisticated type system that can also infer properties from ambient hypotheses.
     """
-    if obj.is_integer:
-        if obj.is_positive:
+    if ask(obj, "integer"):
+        if ask(obj, "positive"):
             return "pos_int"
-        elif obj.is_nonnegative:
+        elif ask(obj, "nonnegative"):
             return "nonneg_int"
-        elif obj.is_nonzero:
+        elif ask(obj, "nonzero"):
             return "nonzero_int"
         else:
             return "int"
-    elif obj.is_rational:
-        if obj.is_positive:
+    elif ask(obj, "rational"):
+        if ask(obj, "positive"):
             return "pos_rat"
-        elif obj.is_nonnegative:
+        elif ask(obj, "nonnegative"):
             return "nonneg_rat"
-        elif obj.is_nonzero:
+        elif ask(obj, "nonzero"):
             return "nonzero_rat"
         else:
             return "rat"
-    elif obj.is_real:
-        if obj.is_positive:
+    elif ask(obj, "real"):
+        if ask(obj, "positive"):
             return "pos_real"
-        elif obj.is_nonnegative:
+        elif ask(obj, "nonnegative"):
             return "nonneg_real"
-        elif obj.is_nonzero:
+        elif ask(obj, "nonzero"):
             return "nonzero_real"
         else:
             return "real"
-    elif obj.is_complex:
-        if obj.is_nonzero:
+    elif ask(obj, "complex"):
+        if ask(obj, "nonzero"):
             return "nonzero_complex"
         return "complex"
     elif obj.is_Boolean:
@@ -122,7 +124,7 @@ def describe(name: str, object: Basic) -> str:
     return f"{name}: {object}"
 
 
-def is_defined(expr: Any, vars: set[Basic]) -> bool:
+def is_defined(expr: Any, vars: AbstractSet[Basic]) -> bool:
     """Check if expr is defined in terms of the set `vars` of other expressions"""
     expr = S(expr)
     if expr in vars:
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from collections import deque
+from collections.abc import Iterable
+from contextlib import redirect_stdout
+from io import StringIO
+from multiprocessing.connection import Connection, wait
+from typing import TextIO
+
+from sympy import Basic
+
+from estimates.output import output_mode
+from estimates.profiling import profiling
+from estimates.proofassistant import ProofAssistant
+from estimates.proofstate import Hypotheses
+from estimates.tactic import TACTIC_ERRORS, Tactic
+
+# A batch runner for checking many proofs at once, without an interactive session.
+# Each job (a set of hypotheses, a goal, and a tactic script) is run in its own process, several at a time, so that a job that crashes or exceeds its time limit cannot affect the others.
+# The result of each job is reported as a line of JSON as soon as the job finishes.
+
+
+class AllGoals:
+    """A step of a tactic script that applies a tactic to all the remaining goals, as in `ProofAssistant.all_goals_use`."""
+
+    def __init__(self, tactic: Tactic) -> None:
+        self.tactic = tactic
+
+    def __str__(self) -> str:
+        return f"all_goals {self.tactic}"
+
+
+class Job:
+    """
+    A proof obligation to be checked: hypotheses (including the `Type` declarations of the variables), a goal, and a tactic script.
+    The steps of the script are applied in order, as by `ProofAssistant.use` (so each tactic acts on the current goal); `AllGoals(tactic)` steps act on all remaining goals.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        hypotheses: dict[str, Basic],
+        goal: Basic,
+        tactics: list[Tactic | AllGoals],
+    ) -> None:
+        self.name = name
+        self.hypotheses = dict(hypotheses)
+        self.goal = goal
+        self.tactics = list(tactics)
+
+    @classmethod
+    def from_assistant(
+        cls, name: str, p: ProofAssistant, tactics: list[Tactic | AllGoals]
+    ) -> Job:
+        """Create a job from the initial proof state of a proof assistant in which a proof has been started (such as one of the exercises in `main.py`)."""
+        if p.proof_tree is None:
+            raise ValueError("No proof has been started.")
+        state = p.proof_tree.proof_state
+        return cls(name, dict(state.hypotheses), state.goal, tactics)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def run_job(job: Job, capture_output: bool = True) -> dict:
+    """
+    Run a job in the current process, under a profiler, and return a summary of the result (including the time spent in each kind of span, and the counters of the profiler).  The status is "proved" if all goals were closed, "open" if some goals remain, and "error" if a tactic raised an exception.
+    :param capture_output: If true, the output of the tactics is captured and returned; otherwise it is not even formatted.
+    """
+    p = ProofAssistant()
+    result = {"name": job.name}
+    steps = 0
+    start = time.perf_counter()
+    output = StringIO()
+    with profiling() as profiler, redirect_stdout(output) if capture_output else output_mode("silent"):
+        try:
+            p.hypotheses = Hypotheses(job.hypotheses)
+            p.begin_proof(job.goal)
+            for step in job.tactics:
+                if isinstance(step, AllGoals):
+                    p.all_goals_use(step.tactic)
+                else:
+                    p.use(step)
+                steps += 1
+        except TACTIC_ERRORS as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["traceback"] = traceback.format_exc()
+    result["seconds"] = time.perf_counter() - start
+    result["steps"] = steps
+    result["timings"] = profiler.summary()
+    result["counters"] = dict(profiler.counters)
+    if p.proof_tree is not None:
+        result["goals"] = p.proof_tree.num_sorries()
+        result["nodes"] = sum(1 for _ in p.proof_tree.iter_nodes())
+        if "status" not in result:
+            result["status"] = "proved" if p.proof_tree.is_sorry_free() else "open"
+        result["proof"] = p.proof()
+    if capture_output:
+        result["output"] = output.getvalue()
+    return result
+
+
+def _worker(job: Job, conn: Connection, capture_output: bool) -> None:
+    """Run a job in a worker process, and send the result back through a pipe."""
+    try:
+        result = run_job(job, capture_output)
+    except Exception as e:  # an unexpected failure: report it, then let the worker die with it
+        conn.send({"name": job.name, "status": "error", "error": f"{type(e).__name__}: {e}"})
+        raise
+    conn.send(result)
+    conn.close()
+
+
+def run_batch(
+    jobs: Iterable[Job],
+    workers: int | None = None,
+    timeout: float | None = 60.0,
+    output: TextIO | None = None,
+    verbose: bool = False,
+) -> list[dict]:
+    """
+    Run a batch of jobs, each in its own process, with at most `workers` (by default, the number of CPUs) running at once.
+    A job that runs for longer than `timeout` seconds is terminated, with status "timeout"; a job whose process dies is reported with status "crashed".
+    As each job finishes, its result is written to `output` (if given) as a line of JSON; the final proof and any traceback are only included if `verbose` is set.  The output of the tactics is only captured (and included) if `verbose` is set.
+    Returns the results, in the order of the jobs.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    jobs = list(jobs)
+    pending = deque(enumerate(jobs))
+    running: dict[Connection, tuple[int, multiprocessing.Process, float]] = {}
+    results: list[dict] = [{} for _ in jobs]
+
+    def finish(index: int, result: dict) -> None:
+        result["index"] = index
+        results[index] = result
+        if output is not None:
+            if not verbose:
+                result = {
+                    key: value
+                    for key, value in result.items()
+                    if key not in ("output", "proof", "traceback")
+                }
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+    while pending or running:
+        while pending and len(running) < workers:
+            index, job = pending.popleft()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_worker, args=(job, sender, verbose), daemon=True)
+            process.start()
+            sender.close()  # only the worker holds the sending end, so that a crash shows up as an EOFError
+            running[receiver] = (index, process, time.perf_counter())
+
+        wait_time = None
+        if timeout is not None:
+            now = time.perf_counter()
+            wait_time = max(
+                0.0, min(started + timeout for _, _, started in running.values()) - now
+            )
+        for conn in wait(list(running), timeout=wait_time):
+            index, process, started = running.pop(conn)
+            try:
+                result = conn.recv()
+            except EOFError:
+                result = {
+                    "name": jobs[index].name,
+                    "status": "crashed",
+                    "seconds": time.perf_counter() - started,
+                }
+            conn.close()
+            process.join()
+            finish(index, result)
+
+        if timeout is not None:
+            now = time.perf_counter()
+            for conn, (index, process, started) in list(running.items()):
+                if now - started >= timeout:
+                    process.terminate()
+                    process.join()
+                    conn.close()
+                    del running[conn]
+                    finish(
+                        index,
+                        {"name": jobs[index].name, "status": "timeout", "seconds": now - started},
+                    )
+    return results
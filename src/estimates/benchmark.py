@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import gc
+import inspect
+import json
+import operator
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import TextIO
+
+import sympy
+from sympy.core.cache import clear_cache
+
+from estimates import assumptions, main
+from estimates.linarith import Linarith
+from estimates.littlewood_paley import LittlewoodPaley
+from estimates.log_linarith import LogLinarith
+from estimates.order_of_magnitude import OrderMax, OrderMin, lesssim
+from estimates.output import get_logger, output_mode
+from estimates.proofassistant import ProofAssistant
+from estimates.propositional_tactics import Cases
+from estimates.simp import IsNonzero, IsPositive, SimpAll
+from estimates.subst import SubstAll
+
+logger = get_logger("estimates.benchmark")  # not __name__, which is "__main__" when run as a script
+
+# A benchmark suite, for tracking the performance of the proof assistant over time.
+# The suite consists of the worked solutions in `main.py`, together with synthetic families of problems of increasing size, designed to exercise the parts of the tactics whose cost grows with the size of the problem.
+# Each benchmark is run several times (with all output silenced) and its median time reported, together with the peak memory allocated during one further run.
+# The results can be saved as a baseline JSON file and later compared against, e.g. after upgrading sympy or z3:
+#     python -m estimates.benchmark --save-baseline baseline.json
+#     python -m estimates.benchmark --baseline baseline.json
+
+BASELINE_FORMAT = "estimates-benchmark"
+
+
+class Benchmark:
+    """A named piece of work to be timed: `setup` (untimed) returns a proof assistant, on which `run` (timed) then acts."""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[ProofAssistant | None], object],
+        setup: Callable[[], ProofAssistant | None] = lambda: None,
+    ) -> None:
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def linarith_ne_family(k: int) -> Benchmark:
+    """`Linarith` with k hypotheses of the form `y_i != i`, each of which doubles the number of scenarios to be checked."""
+
+    def setup() -> ProofAssistant:
+        p = ProofAssistant()
+        x = p.var("real", "x")
+        ys = p.vars("real", *[f"y_{i}" for i in range(1, k + 1)])
+        p.assume(x < 1, "hx")
+        for i, y in enumerate(ys, start=1):
+            p.assume(sympy.Ne(y, i), f"h{i}")
+        p.begin_proof(x < 2)
+        return p
+
+    return Benchmark(f"linarith_ne[{k}]", lambda p: p.use(Linarith()), setup)
+
+
+def log_linarith_order_max_family(n: int) -> Benchmark:
+    """`LogLinarith` on a goal involving the maximum of n orders of magnitude, each of which adds a case to the disjunction to be checked."""
+
+    def setup() -> ProofAssistant:
+        p = ProofAssistant()
+        N = p.var("order", "N")
+        Ns = p.vars("order", *[f"N_{i}" for i in range(1, n + 1)])
+        for i, N_i in enumerate(Ns, start=1):
+            p.assume(lesssim(N_i, N), f"h{i}")
+        p.begin_proof(lesssim(OrderMax(*Ns), N))
+        return p
+
+    return Benchmark(f"log_linarith_order_max[{n}]", lambda p: p.use(LogLinarith()), setup)
+
+
+def littlewood_paley_family(n: int) -> Benchmark:
+    """`Cases` and then `LogLinarith` on each case of a Littlewood-Paley hypothesis with n frequencies."""
+
+    def setup() -> ProofAssistant:
+        p = ProofAssistant()
+        Ns = p.vars("order", *[f"N_{i}" for i in range(1, n + 1)])
+        p.assume(LittlewoodPaley(*Ns), "h")
+        p.begin_proof(OrderMin(*Ns) ** (n - 2) * OrderMax(*Ns) ** 2 <= functools.reduce(operator.mul, Ns))
+        return p
+
+    def run(p: ProofAssistant) -> None:
+        p.use(Cases("h"))
+        p.all_goals_use(LogLinarith())
+
+    return Benchmark(f"littlewood_paley[{n}]", run, setup)
+
+
+def simp_all_family(m: int) -> Benchmark:
+    """`SimpAll` with m hypotheses, each of which is simplified using all the others."""
+
+    def setup() -> ProofAssistant:
+        p = ProofAssistant()
+        xs = p.vars("real", *[f"x_{i}" for i in range(m + 1)])
+        for i in range(m):
+            p.assume(xs[i] > 0 if i % 2 == 0 else xs[i] + xs[i + 1] > 0, f"h{i}")
+        p.begin_proof(xs[0] > 0)
+        return p
+
+    return Benchmark(f"simp_all[{m}]", lambda p: p.use(SimpAll()), setup)
+
+
+def subst_all_family(m: int) -> Benchmark:
+    """`SubstAll` of an equation N = 10 into m hypotheses mentioning N, which share most of their subexpressions."""
+
+    def setup() -> ProofAssistant:
+        p = ProofAssistant()
+        N = p.var("pos_int", "N")
+        xs = p.vars("real", *[f"x_{i}" for i in range(m)])
+        for i, x in enumerate(xs):
+            p.assume(x + N**2 <= (N + 1) ** 2 + i, f"h{i}")
+        p.assume(sympy.Eq(N, 10), "hN")
+        p.begin_proof(sum(xs) <= m * N)
+        return p
+
+    return Benchmark(f"subst_all[{m}]", lambda p: p.use(SubstAll("hN")), setup)
+
+
+def is_positive_family(m: int) -> Benchmark:
+    """`IsPositive` (after `IsNonzero`, untimed) on a variable mentioned by only one of m hypotheses, so that the other hypotheses need not be rewritten."""
+
+    def setup() -> ProofAssistant:
+        p = ProofAssistant()
+        x = p.var("real", "x")
+        ys = p.vars("real", *[f"y_{i}" for i in range(m)])
+        p.assume(x > 0, "hx")
+        for i in range(m - 1):
+            p.assume(ys[i] + ys[i + 1] ** 2 <= i, f"h{i}")
+        p.begin_proof(x**3 + x > 0)
+        p.use(IsNonzero("x"))
+        return p
+
+    return Benchmark(f"is_positive[{m}]", lambda p: p.use(IsPositive("x")), setup)
+
+
+# The synthetic families, and the sizes at which to run them (the first few sizes in quick mode).
+FAMILIES: dict[Callable[[int], Benchmark], tuple[int, ...]] = {
+    linarith_ne_family: (1, 2, 4, 6),
+    log_linarith_order_max_family: (2, 3, 4, 5),
+    littlewood_paley_family: (3, 4, 5),
+    simp_all_family: (4, 8, 16, 32),
+    subst_all_family: (10, 30, 100, 300),
+    is_positive_family: (10, 30, 100, 300),
+}
+
+
+def exercise_benchmarks() -> list[Benchmark]:
+    """A benchmark for each of the worked solutions (and failure examples) in `main.py`."""
+    benchmarks = []
+    for name, function in vars(main).items():
+        if (
+            inspect.isfunction(function)
+            and function.__module__ == main.__name__
+            and ("_solution" in name or name.endswith("_failure_example"))
+        ):
+            benchmarks.append(Benchmark(name, lambda _, function=function: function()))
+    return benchmarks
+
+
+def all_benchmarks(quick: bool = False) -> list[Benchmark]:
+    """The full benchmark suite.  In quick mode, only the two smallest sizes of each synthetic family are included."""
+    benchmarks = exercise_benchmarks()
+    for family, sizes in FAMILIES.items():
+        benchmarks.extend(family(size) for size in (sizes[:2] if quick else sizes))
+    return benchmarks
+
+
+def clear_caches() -> None:
+    """Empty the global caches (sympy's cache, and the project-level cache of assumption queries), so that the next run starts cold rather than reusing the results of earlier runs."""
+    clear_cache()
+    assumptions._query.cache_clear()
+
+
+def measure(benchmark: Benchmark, repeat: int = 3) -> dict:
+    """Run a benchmark `repeat` times, and return the median, minimum and maximum time in seconds, together with the peak memory allocated (in bytes) during one further run.  The global caches are cleared before each run (after its setup), so every run starts cold."""
+    times = []
+    with output_mode("silent"):
+        for _ in range(repeat):
+            p = benchmark.setup()
+            clear_caches()
+            gc.collect()
+            start = time.perf_counter()
+            benchmark.run(p)
+            times.append(time.perf_counter() - start)
+        p = benchmark.setup()
+        clear_caches()
+        gc.collect()
+        tracemalloc.start()  # memory is measured separately, as tracing slows down the code being traced
+        try:
+            benchmark.run(p)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "repeat": repeat,
+        "peak_memory": peak,
+    }
+
+
+def run_benchmarks(benchmarks: Iterable[Benchmark], repeat: int = 3) -> dict[str, dict]:
+    """Measure each of the benchmarks, reporting each result as it is obtained."""
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = result = measure(benchmark, repeat)
+        logger.info(
+            "%-40s %10.4fs %10.1f KiB",
+            benchmark.name,
+            result["median"],
+            result["peak_memory"] / 1024,
+        )
+    return results
+
+
+def environment() -> dict[str, str]:
+    """The versions of the software that the benchmarks depend on."""
+    import z3
+
+    return {
+        "python": platform.python_version(),
+        "sympy": sympy.__version__,
+        "z3": z3.get_version_string(),
+        "platform": platform.platform(),
+    }
+
+
+def save_baseline(results: dict[str, dict], file: TextIO) -> None:
+    """Save benchmark results as a baseline for later comparison."""
+    json.dump(
+        {"format": BASELINE_FORMAT, "environment": environment(), "results": results},
+        file,
+        indent=2,
+    )
+
+
+def load_baseline(file: TextIO) -> dict[str, dict]:
+    """Load benchmark results saved by `save_baseline`."""
+    data = json.load(file)
+    if data.get("format") != BASELINE_FORMAT:
+        raise ValueError("Not a benchmark baseline.")
+    return data["results"]
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], threshold: float = 1.25
+) -> list[str]:
+    """
+    Compare benchmark results against a baseline, reporting the ratio of the median times of each benchmark present in both.
+    Returns the names of the benchmarks that became slower by more than the given factor.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            logger.info("%-40s (not in baseline)", name)
+            continue
+        ratio = result["median"] / max(baseline[name]["median"], 1e-9)
+        memory_ratio = result["peak_memory"] / max(baseline[name]["peak_memory"], 1)
+        if ratio > threshold:
+            regressions.append(name)
+        logger.info(
+            "%-40s %6.2fx time %6.2fx memory%s",
+            name,
+            ratio,
+            memory_ratio,
+            "  SLOWER" if ratio > threshold else "  faster" if ratio < 1 / threshold else "",
+        )
+    return regressions
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m estimates.benchmark",
+        description="Time the worked solutions and synthetic scaling families of the proof assistant.",
+    )
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="number of timed runs of each benchmark (default 3)")
+    parser.add_argument("--quick", action="store_true", help="only run the smallest sizes of the synthetic families")
+    parser.add_argument("--save-baseline", metavar="FILE", help="save the results as a baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare the results against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown factor reported as a regression (default 1.25)")
+    args = parser.parse_args(argv)
+
+    benchmarks = [
+        benchmark for benchmark in all_benchmarks(args.quick) if args.filter in benchmark.name
+    ]
+    results = run_benchmarks(benchmarks, args.repeat)
+    if args.save_baseline:
+        with Path(args.save_baseline).open("w") as file:
+            save_baseline(results, file)
+        logger.info("Saved baseline to %s.", args.save_baseline)
+    if args.baseline:
+        with Path(args.baseline).open() as file:
+            baseline = load_baseline(file)
+        logger.info("")
+        logger.info("Comparison with %s:", args.baseline)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            logger.info("%d benchmark(s) slower than the baseline by more than %gx.", len(regressions), args.threshold)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -3,6 +3,7 @@ from sympy import Basic, Mul, Add, Pow, Expr, Max, Min, Abs
 from sympy.logic.boolalg import Boolean, true, false
 from sympy.core.relational import Relational
 from estimates.order_of_magnitude import OrderMax, OrderMin, OrderMul, OrderPow, Theta
+from estimates.assumptions import is_nonnegative
 
 # Code to implement the concept of 
 ## fixed expressions (expressions independent of parameters); and
@@ -83,7 +84,7 @@ def is_bounded(expr: Expr, hypotheses:set[Basic] = set()) -> bool:
     elif isinstance(expr, (Mul, Add, Abs, Max, Min, Theta, OrderMul, OrderMax, OrderMin)):  # here we use a "whitelist" approach of approved operations that preserve boundedness.  This list can be extended as needed.
         return all(is_bounded(arg, hypotheses) for arg in expr.args)  # sums, products, etc. of bounded expressions are bounded
     elif isinstance(expr, (Pow, OrderPow)):
-        return all(is_bounded(arg, hypotheses) for arg in expr.args) and (expr.args[1].is_nonnegative is True)  # powers of bounded expressions are bounded if the exponent is bounded and nonnegative
+        return all(is_bounded(arg, hypotheses) for arg in expr.args) and (is_nonnegative(expr.args[1]) is True)  # powers of bounded expressions are bounded if the exponent is bounded and nonnegative
     
 
     return False
\ No newline at end of file
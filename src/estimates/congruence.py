@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from sympy import Add, And, Basic, Eq, Max, Min, Mul, Ne, Or, preorder_traversal, sympify
+
+from estimates.basic import Type
+from estimates.order_of_magnitude import OrderMax, OrderMin
+from estimates.profiling import count
+
+# Congruence closure: deciding which terms are equal as a consequence of a set of equations, by the rules of equality alone (reflexivity, symmetry, transitivity, and congruence: if a = b then f(a) = f(b)).
+# The terms are kept in a union-find structure of equivalence classes, together with a table of the "signatures" of compound terms (their head, and the classes of their arguments).  Merging two classes revisits the compound terms that have an argument in the smaller class; any two of these whose signatures now coincide are congruent, and their classes are merged in turn.  This decides all the equalities between n terms in O(n log n) merges, without rewriting any of the terms.
+# Arithmetic is not interpreted, except that the arguments of sums, products, maxima and minima (and conjunctions and disjunctions) are treated as unordered, and distinct numbers are known to be unequal.
+
+# Heads whose arguments are unordered, so that their signatures are sorted.
+COMMUTATIVE = (Add, Mul, Max, Min, OrderMax, OrderMin, And, Or)
+
+
+def size(expr: Basic) -> int:
+    """The number of nodes of an expression."""
+    return sum(1 for _ in preorder_traversal(expr))
+
+
+def preference(expr: Basic) -> tuple[bool, int, str]:
+    """The key by which the representative of a class is chosen: numbers first, then the smallest term (ties broken by their string form)."""
+    return (not expr.is_Number, size(expr), str(expr))
+
+
+class CongruenceClosure:
+    """
+    The congruence closure of a set of equations, built from the `Eq` hypotheses among a collection of hypotheses (`Ne` hypotheses are recorded as disequalities; all other hypotheses are ignored).
+    Further terms may be added at any time (by querying them); the classes of the existing terms only change when equations are added with `merge`.
+    """
+
+    def __init__(self, hypotheses: Iterable[Basic] = ()) -> None:
+        self.terms: list[Basic] = []        # the terms, indexed by their ids
+        self.ids: dict[Basic, int] = {}     # the id of each term
+        self.parent: list[int] = []         # the union-find forest on ids
+        self.members: list[list[int]] = []  # the ids in the class of each root
+        self.uses: list[list[int]] = []     # the compound terms with an argument in the class of each root
+        self.best: list[int] = []           # the representative of the class of each root
+        self.signatures: dict[tuple, int] = {}
+        self.disequalities: list[tuple[int, int]] = []
+        self.inconsistent = False           # whether the equations contradict the disequalities, or equate distinct numbers
+        self.pending: list[tuple[int, int]] = []
+        for hypothesis in hypotheses:
+            if isinstance(hypothesis, Type):
+                continue
+            if isinstance(hypothesis, Eq):
+                self.merge(*hypothesis.args)
+            elif isinstance(hypothesis, Ne):
+                lhs, rhs = (self.add(arg) for arg in hypothesis.args)
+                self.disequalities.append((lhs, rhs))
+                if self.find(lhs) == self.find(rhs):
+                    self.inconsistent = True
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def find(self, i: int) -> int:
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:  # path compression
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def _signature(self, term: Basic) -> tuple:
+        classes = tuple(self.find(self.ids[arg]) for arg in term.args)
+        if isinstance(term, COMMUTATIVE):
+            classes = tuple(sorted(classes))
+        return (term.func, classes)
+
+    def add(self, term: Basic) -> int:
+        """Add a term (and its subterms) to the closure, returning its id."""
+        term = sympify(term)
+        i = self.ids.get(term)
+        if i is not None:
+            return i
+        for arg in term.args:
+            self.add(arg)
+        i = len(self.terms)
+        self.terms.append(term)
+        self.ids[term] = i
+        self.parent.append(i)
+        self.members.append([i])
+        self.uses.append([])
+        self.best.append(i)
+        if term.args:
+            signature = self._signature(term)
+            other = self.signatures.get(signature)
+            if other is None:
+                self.signatures[signature] = i
+            else:
+                self.pending.append((i, other))
+            for arg in set(term.args):
+                self.uses[self.find(self.ids[arg])].append(i)
+            self._propagate()
+        return i
+
+    def merge(self, a: Basic, b: Basic) -> None:
+        """Add the equation a = b."""
+        self.pending.append((self.add(a), self.add(b)))
+        self._propagate()
+
+    def _propagate(self) -> None:
+        while self.pending:
+            i, j = self.pending.pop()
+            i, j = self.find(i), self.find(j)
+            if i == j:
+                continue
+            if len(self.members[i]) > len(self.members[j]):
+                i, j = j, i  # merge the smaller class i into the larger class j
+            count("congruence_merges")
+            self.parent[i] = j
+            self.members[j].extend(self.members[i])
+            first, second = self.terms[self.best[i]], self.terms[self.best[j]]
+            if first.is_Number and second.is_Number and first != second:
+                self.inconsistent = True
+            if preference(first) < preference(second):
+                self.best[j] = self.best[i]
+            for use in self.uses[i]:
+                signature = self._signature(self.terms[use])
+                other = self.signatures.get(signature)
+                if other is None:
+                    self.signatures[signature] = use
+                elif self.find(other) != self.find(use):
+                    self.pending.append((use, other))
+            self.uses[j].extend(self.uses[i])
+            self.members[i] = self.uses[i] = []
+        if self.disequalities and not self.inconsistent:
+            self.inconsistent = any(self.find(a) == self.find(b) for a, b in self.disequalities)
+
+    def equal(self, a: Basic, b: Basic) -> bool:
+        """Whether the equations imply a = b."""
+        return a == b or self.find(self.add(a)) == self.find(self.add(b))
+
+    def distinct(self, a: Basic, b: Basic) -> bool:
+        """Whether the equations and disequalities imply a != b."""
+        i, j = self.find(self.add(a)), self.find(self.add(b))
+        if i == j:
+            return False
+        first, second = self.terms[self.best[i]], self.terms[self.best[j]]
+        if first.is_Number and second.is_Number:
+            return True  # numbers are preferred as representatives, so these are the only numbers in their classes
+        return any({self.find(c), self.find(d)} == {i, j} for c, d in self.disequalities)
+
+    def decide(self, goal: Basic) -> bool | None:
+        """Whether the closure proves (True) or refutes (False) an equation or disequation, or None if it does neither."""
+        if isinstance(goal, Eq | Ne):
+            lhs, rhs = goal.args
+            if self.equal(lhs, rhs):
+                return isinstance(goal, Eq)
+            if self.distinct(lhs, rhs):
+                return isinstance(goal, Ne)
+        return None
+
+    def representative(self, term: Basic) -> Basic:
+        """The representative of the class of a term: the number in the class, if there is one, and otherwise its smallest term."""
+        i = self.ids.get(term)
+        return term if i is None else self.terms[self.best[self.find(i)]]
+
+    def canonical(self, expr: Basic, memo: dict[Basic, Basic] | None = None) -> Basic:
+        """Rewrite an expression (bottom up) by replacing each subexpression known to the closure with the representative of its class."""
+        if memo is None:
+            memo = {}
+        result = memo.get(expr)
+        if result is not None:
+            return result
+        result = expr
+        if expr.args and not isinstance(expr, Type):
+            new_args = tuple(self.canonical(arg, memo) for arg in expr.args)
+            if any(new is not old for new, old in zip(new_args, expr.args, strict=True)):
+                result = expr.func(*new_args)
+        for term in (expr, result):
+            representative = self.representative(term)
+            if representative != result and preference(representative) < preference(result):
+                result = self.canonical(representative, memo)  # the representative is strictly preferred, so this terminates
+                break
+        memo[expr] = result
+        return result
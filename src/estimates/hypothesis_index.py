@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+from sympy import Basic, Eq, Not
+from sympy.core.relational import (
+    GreaterThan,
+    LessThan,
+    Relational,
+    StrictGreaterThan,
+    StrictLessThan,
+)
+from sympy.logic.boolalg import BooleanAtom
+
+from estimates.congruence import CongruenceClosure
+
+# An index of a set of hypotheses, for answering the questions asked by the simplifier about each subexpression of a goal in constant time, rather than by scanning all the hypotheses.
+
+# The possible signs of b - a that are consistent with each relation a (rel) b.
+SIGNS: dict[str, frozenset[int]] = {
+    "<=": frozenset({0, 1}),
+    "<": frozenset({1}),
+    "==": frozenset({0}),
+    ">=": frozenset({-1, 0}),
+    ">": frozenset({-1}),
+    "!=": frozenset({-1, 1}),
+}
+
+# The inverse of SIGNS.
+RELATIONS: dict[frozenset[int], str] = {signs: rel for rel, signs in SIGNS.items()}
+
+
+class HypothesisIndex:
+    """
+    A set of hypotheses, indexed for the lookups performed by the simplifier:
+
+    * `signs` maps each (ordered) pair of expressions (a, b) that are related by some relational hypothesis to the set of signs of b - a consistent with all such hypotheses (with the signs written as in `SIGNS`, so that e.g. a < b gives {1}).
+    * `negated` is the set of propositions p for which `Not(p)` is a hypothesis.
+    * `larger` maps each expression a to the set of expressions b for which a < b or a <= b is a hypothesis (with a != b), and `smaller` is its inverse; these are used for removing redundant arguments of maxima and minima.
+    * `relations` maps each such pair to the list of relational hypotheses relating it (for reporting which hypotheses were used), and `canonical_relations()` maps the canonical form of each relational hypothesis to the hypothesis.
+    * `closure()` is the congruence closure of the equality hypotheses (see `congruence.py`), which is only built when first needed.
+    """
+
+    def __init__(self, hypotheses: Iterable[Basic]) -> None:
+        self.hypotheses = frozenset(hypotheses)
+        self.signs: dict[tuple[Basic, Basic], frozenset[int]] = {}
+        self.negated: set[Basic] = set()
+        self.larger: dict[Basic, set[Basic]] = {}
+        self.smaller: dict[Basic, set[Basic]] = {}
+        self.relations: dict[tuple[Basic, Basic], list[Basic]] = {}
+        self._canonical_relations: dict[Basic, Basic] | None = None
+        self._closure: CongruenceClosure | None = None
+        for hypothesis in self.hypotheses:
+            if isinstance(hypothesis, Relational):
+                lhs, rhs = hypothesis.args
+                signs = SIGNS[hypothesis.rel_op]
+                self._restrict(lhs, rhs, signs)
+                self._restrict(rhs, lhs, frozenset(-sign for sign in signs))
+                self.relations.setdefault((lhs, rhs), []).append(hypothesis)
+                self.relations.setdefault((rhs, lhs), []).append(hypothesis)
+                if isinstance(hypothesis, LessThan | StrictLessThan | GreaterThan | StrictGreaterThan) and hypothesis.lts != hypothesis.gts:
+                    self.larger.setdefault(hypothesis.lts, set()).add(hypothesis.gts)
+                    self.smaller.setdefault(hypothesis.gts, set()).add(hypothesis.lts)
+            elif isinstance(hypothesis, Not):
+                self.negated.add(hypothesis.args[0])
+
+    def _restrict(self, lhs: Basic, rhs: Basic, signs: frozenset[int]) -> None:
+        existing = self.signs.get((lhs, rhs))
+        self.signs[lhs, rhs] = signs if existing is None else existing & signs
+
+    def __contains__(self, hypothesis: object) -> bool:
+        return hypothesis in self.hypotheses
+
+    def __iter__(self) -> Iterator[Basic]:
+        return iter(self.hypotheses)
+
+    def __len__(self) -> int:
+        return len(self.hypotheses)
+
+    def refutes(self, goal: Basic) -> bool:
+        """Whether the negation of the goal is one of the hypotheses."""
+        if isinstance(goal, Not):
+            return goal.args[0] in self.hypotheses
+        if isinstance(goal, Relational):
+            return goal.negated in self.hypotheses
+        if isinstance(goal, BooleanAtom) or goal.is_Number:
+            return Not(goal) in self.hypotheses
+        return goal in self.negated
+
+    def canonical_relations(self) -> dict[Basic, Basic]:
+        """The relational hypotheses, keyed by their canonical forms (computed when first needed)."""
+        if self._canonical_relations is None:
+            self._canonical_relations = {
+                hypothesis.canonical: hypothesis
+                for hypothesis in self.hypotheses
+                if isinstance(hypothesis, Relational)
+            }
+        return self._canonical_relations
+
+    def closure(self) -> CongruenceClosure | None:
+        """The congruence closure of the equality hypotheses, or None if there are none."""
+        if self._closure is None and any(isinstance(hypothesis, Eq) for hypothesis in self.hypotheses):
+            self._closure = CongruenceClosure(self.hypotheses)
+        return self._closure
+
+    def relation_signs(self, lhs: Basic, rhs: Basic) -> frozenset[int] | None:
+        """The signs of rhs - lhs consistent with the relational hypotheses relating lhs and rhs, or None if there are no such hypotheses."""
+        return self.signs.get((lhs, rhs))
+
+    def redundant_max_arg(self, args: tuple[Basic, ...]) -> Basic | None:
+        """An argument of a maximum that is at most some other argument (and can hence be removed), if any."""
+        argset = set(args)
+        for arg in args:
+            for other in self.larger.get(arg, ()):
+                if other in argset:
+                    return arg
+        return None
+
+    def redundant_min_arg(self, args: tuple[Basic, ...]) -> Basic | None:
+        """An argument of a minimum that is at least some other argument (and can hence be removed), if any."""
+        argset = set(args)
+        for arg in args:
+            for other in self.smaller.get(arg, ()):
+                if other in argset:
+                    return arg
+        return None
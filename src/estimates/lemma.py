@@ -4,9 +4,12 @@ from abc import ABC, abstractmethod
 from sympy import Basic, Eq, S
 from fractions import Fraction
 
-from estimates.basic import describe, is_defined
+from estimates.basic import is_defined
 from estimates.proofstate import ProofState
 from estimates.tactic import Tactic
+from estimates.output import get_logger
+
+logger = get_logger(__name__)
 
 class Lemma(ABC):
     """A base class for a lemma object, to be used by the use_lemma() method."""
@@ -66,7 +69,7 @@ class UseLemma(Tactic):
         statement = self.lemma.apply(state)
         newstate = state.copy()
         newstate.hypotheses[hyp] = statement
-        print(f"Applying lemma {self.lemma} to conclude {describe(hyp, statement)}.")
+        logger.info("Applying lemma %s to conclude %s: %s.", self.lemma, hyp, statement)
         return [newstate]
 
     def __str__(self) -> str:
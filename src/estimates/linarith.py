@@ -13,13 +13,18 @@ from sympy import (
 )
 from sympy.core.relational import Relational
 
+from estimates.assumptions import is_integer, is_nonnegative, is_positive, is_real
 from estimates.basic import Type
 from estimates.linprog import Inequality, feasibility, is_valid_counterexample
 from estimates.proofstate import ProofState
 from estimates.tactic import Tactic
+from estimates.output import get_logger
+from estimates.profiling import count
 
 from itertools import product
 
+logger = get_logger(__name__)
+
 
 class Linarith(Tactic):
     """A tactic to try to establish a goal via linear arithmetic.  Inspired by the linarith tactic in Lean."""
@@ -29,6 +34,7 @@ class Linarith(Tactic):
         :param verbose: If true, print the inequalities generated.
         """
         self.verbose = verbose
+        self.certificates = {}  # certificates of infeasibility found by this tactic, reused when the tactic is replayed
 
     def activate(self, state: ProofState) -> list[ProofState]:
         # First, gather all the hypotheses that can generate inequalities.
@@ -53,6 +59,7 @@ class Linarith(Tactic):
         for choice in product(*options):
             scenarios.append(set(choice))
 
+        count("linarith_scenarios", len(scenarios))
         found_counterexample = False
         proofs = []
         inequalities_list = []
@@ -66,8 +73,8 @@ class Linarith(Tactic):
                 if isinstance(
                     hypothesis, Type
                 ):  # check for positivity conditions to add to the inequalities
-                    if hypothesis.var().is_positive:
-                        if hypothesis.var().is_integer:
+                    if is_positive(hypothesis.var(), state.assumption_cache):
+                        if is_integer(hypothesis.var(), state.assumption_cache):
                             inequalities.append(
                                 Inequality({hypothesis.var(): S(1)}, "geq", S(1))
                             )  # the integrality gap!
@@ -75,7 +82,7 @@ class Linarith(Tactic):
                             inequalities.append(
                                 Inequality({hypothesis.var(): S(1)}, "gt", S(0))
                             )
-                    elif hypothesis.var().is_nonnegative:
+                    elif is_nonnegative(hypothesis.var(), state.assumption_cache):
                         inequalities.append(
                             Inequality({hypothesis.var(): S(1)}, "geq", S(0))
                         )
@@ -87,7 +94,7 @@ class Linarith(Tactic):
                     # Linarith ignores any relations that involve anything other than a real number.  (One could make a companion tactic, say Linalg, to handle linear equalities over vector spaces other than the reals.)
                     all_real = True
                     for var in coeffs:
-                        if not var.is_real:
+                        if not is_real(var, state.assumption_cache):
                             all_real = False
                             break
                     if not all_real:
@@ -110,7 +117,7 @@ class Linarith(Tactic):
                         inequalities.append(Inequality(coeffs, "gt", const))
 
             inequalities_list.append(inequalities)
-            outcome, dict = feasibility(inequalities)
+            outcome, dict = feasibility(inequalities, self.certificates)
             if outcome:
                 found_counterexample = True
                 break
@@ -119,37 +126,37 @@ class Linarith(Tactic):
 
         if found_counterexample:
             if self.verbose:
-                print("Checking feasibility of the following inequalities:")
+                logger.info("Checking feasibility of the following inequalities:")
                 for ineq in inequalities:
-                    print(ineq)
+                    logger.info("%s", ineq)
 
                 if is_valid_counterexample(dict):
-                    print("Feasible with the following values:")
+                    logger.info("Feasible with the following values:")
                     for var, value in dict.items():
-                        print(f"{var} = {value}")
-                    print("The counterexample proves the goal to be false.")
+                        logger.info("%s = %s", var, value)
+                    logger.info("The counterexample proves the goal to be false.")
                 else:
-                    print("Linear arithmetic was unable to prove goal.")
+                    logger.info("Linear arithmetic was unable to prove goal.")
             else:
-                print("Linear arithmetic was unable to prove goal.")
+                logger.info("Linear arithmetic was unable to prove goal.")
             return [state.copy()]
         else:
             if self.verbose:
                 n = 0
                 for inequalities in inequalities_list:
-                    print("Checking feasibility of the following inequalities:")
+                    logger.info("Checking feasibility of the following inequalities:")
                     for ineq in inequalities:
-                        print(ineq)
-                    print("Infeasible by summing the following:")
+                        logger.info("%s", ineq)
+                    logger.info("Infeasible by summing the following:")
                     dict = proofs[n]
                     for ineq, coeff in dict.items():
                         if coeff.as_fraction() != Fraction(0, 1):
-                            print(f"{ineq} multiplied by {coeff}")
+                            logger.info("%s multiplied by %s", ineq, coeff)
                     n += 1
                 if n == 0:
-                    print("Conclusion followed tautologically from hypotheses.")
+                    logger.info("Conclusion followed tautologically from hypotheses.")
             else:
-                print("Goal solved by linear arithmetic!")
+                logger.info("Goal solved by linear arithmetic!")
             return []
 
     def __str__(self) -> str:
@@ -1,10 +1,13 @@
+import hashlib
 from fractions import Fraction
 from numbers import Rational
 from typing import Literal
 
 from sympy import Pow
 
-from z3 import Real, Solver, Sum, sat, simplify
+from z3 import Real, RealVal, Solver, Sum, sat, simplify
+
+from estimates.profiling import count, profiled
 
 # exact linear programming tools.
 
@@ -27,6 +30,16 @@ class Inequality:
     def variables(self) -> set[str]:
         return set(self.coeffs.keys())
 
+    def key(self) -> tuple:
+        """
+        Return a canonical key for the inequality, which does not depend on the order of the terms or on the identity of the object.  Used to store and look up certificates of infeasibility.
+        """
+        return (
+            tuple(sorted((str(v), str(c)) for v, c in self.coeffs.items())),
+            self.sense,
+            str(self.rhs),
+        )
+
     def dual_name(self) -> str:
         """
         Return an internal name for the dual variable of this inequality, suitable for LP solvers.
@@ -61,8 +74,69 @@ def ineq_variables(inequalities: list[Inequality]) -> set:
     return vars
 
 
-def feasibility(inequalities: list[Inequality]) -> tuple[bool, dict]:
-    """Test via dual linear programming if a list of inequalities is feasible, outputting a certificate in both cases."""
+def certificate_key(inequalities: list[Inequality]) -> tuple[str, list[Inequality]]:
+    """
+    Return a canonical key for a list of inequalities, which does not depend on their order or on repetitions (a short digest of their sorted keys), together with the distinct inequalities in canonical order.
+    """
+    representatives = {}
+    for ineq in inequalities:
+        representatives.setdefault(ineq.key(), ineq)
+    keys = sorted(representatives)
+    digest = hashlib.sha256(repr(keys).encode()).hexdigest()[:32]
+    return digest, [representatives[key] for key in keys]
+
+
+def verify_certificate(
+    canonical: list[Inequality], certificate: tuple[tuple[int, Fraction], ...]
+) -> bool:
+    """
+    Check a certificate of infeasibility for a list of inequalities, given as the distinct inequalities in canonical order (as returned by `certificate_key`): a list of pairs (n, multiplier), where n is the position of an inequality in `canonical` (omitted inequalities have multiplier zero), such that the corresponding linear combination of the inequalities is contradictory (Farkas' lemma).
+    The check uses exact arithmetic only, and is much faster than finding the certificate.  Since it checks the certificate directly, a certificate that does not fit the inequalities is simply rejected.
+    """
+    combination: dict = {}
+    final_sum = Fraction(0)
+    strict = False
+    for n, coeff in certificate:
+        if n < 0 or n >= len(canonical):
+            return False
+        ineq = canonical[n]
+        match ineq.sense:
+            case "leq" | "lt":
+                if coeff > 0:
+                    return False
+            case "geq" | "gt":
+                if coeff < 0:
+                    return False
+        if ineq.sense in ("lt", "gt") and coeff != 0:
+            strict = True
+        for var, c in ineq.coeffs.items():
+            combination[var] = combination.get(var, Fraction(0)) + coeff * c
+        final_sum += coeff * ineq.rhs
+    if any(value != 0 for value in combination.values()):
+        return False
+    return final_sum > 0 or (final_sum == 0 and strict)
+
+
+@profiled("feasibility", "lp")
+def feasibility(
+    inequalities: list[Inequality], certificates: dict | None = None
+) -> tuple[bool, dict]:
+    """
+    Test via dual linear programming if a list of inequalities is feasible, outputting a certificate in both cases.
+    If a dictionary of `certificates` is supplied, certificates of infeasibility are looked up in (and added to) it, keyed by `certificate_key`; a stored certificate is verified and then used instead of calling the solver.  (The key is only computed when it is needed: for a lookup in a nonempty dictionary, or to store a new certificate.)
+    """
+
+    count("lp_calls")
+    key = canonical = None
+    if certificates:
+        key, canonical = certificate_key(inequalities)
+        certificate = certificates.get(key)
+        if certificate is not None and verify_certificate(canonical, certificate):
+            count("certificate_hits")
+            duals = {ineq: RealVal(0) for ineq in inequalities}
+            for n, coeff in certificate:
+                duals[canonical[n]] = RealVal(str(coeff))
+            return False, duals
 
     # collect the primal variables
     variables = ineq_variables(inequalities)
@@ -167,7 +241,19 @@ def feasibility(inequalities: list[Inequality]) -> tuple[bool, dict]:
 
     if dual_s.check() == sat:
         m = dual_s.model()
-        return False, {ineq: m[v] for ineq, v in dual_vars.items()}
+        duals = {ineq: m[v] for ineq, v in dual_vars.items()}
+        if certificates is not None:
+            if key is None:
+                key, canonical = certificate_key(inequalities)
+            position = {ineq.key(): n for n, ineq in enumerate(canonical)}
+            multipliers: dict[int, Fraction] = {}
+            for ineq, value in duals.items():
+                n = position[ineq.key()]
+                multipliers[n] = multipliers.get(n, Fraction(0)) + value.as_fraction()
+            certificates[key] = tuple(
+                (n, coeff) for n, coeff in sorted(multipliers.items()) if coeff != 0
+            )
+        return False, duals
     else:
         raise ValueError(
             f"Farkas lemma violation!  Problem is neither feasible nor infeasible. Inequalities: {inequalities}"
@@ -17,7 +17,8 @@ from sympy import (
 )
 from sympy.core.relational import Rel, Relational
 
-from estimates.basic import Type, describe
+from estimates.assumptions import is_integer, is_positive
+from estimates.basic import Type
 from estimates.linprog import Inequality, feasibility
 from estimates.order_of_magnitude import (
     OrderMax,
@@ -30,6 +31,10 @@ from estimates.order_of_magnitude import (
 from estimates.proofstate import ProofState
 from estimates.tactic import Tactic
 from estimates.bounded import is_bounded, is_fixed
+from estimates.output import Lazy, get_logger
+from estimates.profiling import count
+
+logger = get_logger(__name__)
 
 class ApplyTheta(Tactic):
     """A tactic to apply the Theta function to an hypothesis."""
@@ -52,7 +57,7 @@ class ApplyTheta(Tactic):
         if isinstance(hyp_statement, Ne):
             raise ValueError("Unequalities do not have useful asymptotic forms.")
         elif isinstance(hyp_statement, Eq):
-            new_rel_op = "="
+            new_rel_op = "=="
         elif isinstance(hyp_statement, LessThan | StrictLessThan):
             new_rel_op = (
                 "<="  # Asymptotically, strict inequalities become non-strict ones.
@@ -71,8 +76,12 @@ class ApplyTheta(Tactic):
         newhyp_statement = Rel(
             Theta(hyp_statement.args[0]), Theta(hyp_statement.args[1]), new_rel_op
         )
-        print(
-            f"Adding asymptotic version of {describe(self.hyp, hyp_statement)} as {describe(newhyp, newhyp_statement)}."
+        logger.info(
+            "Adding asymptotic version of %s: %s as %s: %s.",
+            self.hyp,
+            hyp_statement,
+            newhyp,
+            newhyp_statement,
         )
         newstate = state.copy()
         newstate.hypotheses[newhyp] = newhyp_statement
@@ -89,6 +98,46 @@ class ApplyTheta(Tactic):
     arguments = ["hypotheses"]
 
 
+class ApplyThetaAll(Tactic):
+    """A tactic to apply the Theta function to all hypotheses that have a useful asymptotic form."""
+
+    def activate(self, state: ProofState) -> list[ProofState]:
+        newstate = state.copy()
+        existing = set(state.hypotheses.values())
+        found = False
+        for name, hypothesis in state.hypotheses.items():
+            if not isinstance(hypothesis, Relational):
+                continue
+            if hypothesis not in state.asymptotic_forms:
+                state.asymptotic_forms[hypothesis] = asymptotic_form(
+                    hypothesis, state.assumption_cache
+                )
+            form = state.asymptotic_forms[hypothesis]
+            if form is None or len(form) != 1 or form[0] in existing or form[0] in (true, false):
+                continue  # no new asymptotic information
+            newhyp = newstate.new(name + "_theta")
+            logger.info(
+                "Adding asymptotic version of %s: %s as %s: %s.",
+                name,
+                hypothesis,
+                newhyp,
+                form[0],
+            )
+            newstate.hypotheses[newhyp] = form[0]
+            existing.add(form[0])
+            found = True
+        if not found:
+            logger.info("No new asymptotic forms of hypotheses found.")
+        return [newstate]
+
+    def __str__(self) -> str:
+        return "apply_theta_all"
+
+    label = "Apply Theta to all"
+    description = "Apply the Theta function to all hypotheses with positive sides, adding their asymptotic forms as new hypotheses."
+    arguments = []
+
+
 def extract_monomials(expr: Basic) -> dict[Basic, Fraction]:
     """
     Extracts the monomials from an order of magnitude expression and returns them as a dictionary.
@@ -200,6 +249,81 @@ def min_objects(expr: Basic) -> list[Basic]:
         return set()
 
 
+def asymptotic_form(
+    hypothesis: Basic, cache: dict[tuple[Basic, str], bool | None] | None = None
+) -> list[Basic] | None:
+    """
+    Convert a hypothesis into its asymptotic form: a list of relations between orders of magnitude, at least one of which must hold.  In most cases, only one relation is generated.  Returns None if the hypothesis has no useful asymptotic form.
+    `cache` is an optional memo table for assumption queries (see `assumptions.ask`).
+    """
+    if isinstance(hypothesis, Type):
+        # check for positivity conditions to add to the inequalities
+        if is_positive(hypothesis.var(), cache) and is_integer(hypothesis.var(), cache):
+            return [Rel(Theta(hypothesis.var()), Theta(1), ">=")]  # the integrality gap!
+        return None
+
+    if not isinstance(
+        hypothesis,
+        Eq | LessThan | StrictLessThan | GreaterThan | StrictGreaterThan | Ne,
+    ):
+        return None
+
+    lhs, rhs = hypothesis.args
+    if isinstance(lhs, OrderOfMagnitude) and isinstance(rhs, OrderOfMagnitude):
+        if isinstance(hypothesis, Ne):
+            # unequalities of orders of magnitude generate two hypotheses.
+            return [Rel(Theta(lhs), Theta(rhs), "<"), Rel(Theta(lhs), Theta(rhs), ">")]
+        return [hypothesis]
+    elif isinstance(lhs, OrderOfMagnitude):
+        logger.warning(
+            "Warning: somehow an order of magnitude %s is being compared with a non-order of magnitude %s.",
+            lhs,
+            rhs,
+        )
+        return None
+    elif isinstance(rhs, OrderOfMagnitude):
+        logger.warning(
+            "Warning: somehow an order of magnitude %s is being compared with a non-order of magnitude %s.",
+            rhs,
+            lhs,
+        )
+        return None
+    elif is_positive(lhs, cache) and is_positive(rhs, cache):
+        # Note that Theta turns strict inequalities into non-strict ones.
+        if isinstance(hypothesis, LessThan | StrictLessThan):
+            return [Rel(Theta(lhs), Theta(rhs), "<=")]
+        elif isinstance(hypothesis, GreaterThan | StrictGreaterThan):
+            return [Rel(Theta(lhs), Theta(rhs), ">=")]
+        elif isinstance(hypothesis, Eq):
+            return [Rel(Theta(lhs), Theta(rhs), "==")]
+    return None
+
+
+def asymptotic_forms(state: ProofState) -> list[list[Basic]]:
+    """
+    Convert all the hypotheses of a proof state, together with the negation of its goal, into their asymptotic forms, omitting those with no useful asymptotic form.
+    The asymptotic form of a statement depends only on the statement itself, so the forms are memoized in the `asymptotic_forms` table of the proof state, which is shared with all of its copies.  Repeated calls on the same or descendant proof states thus only need to convert the statements that have changed.
+    """
+    statements = state.list_hypotheses(variables=True)
+    if isinstance(
+        state.goal,
+        Eq | LessThan | StrictLessThan | GreaterThan | StrictGreaterThan | Ne,
+    ):
+        statements.append(Not(state.goal))
+
+    memo = state.asymptotic_forms
+    forms = []
+    for statement in dict.fromkeys(statements):  # remove duplicates, but keep the order
+        if statement in memo:
+            count("asymptotic_form_cache_hits")
+        else:
+            memo[statement] = asymptotic_form(statement, state.assumption_cache)
+        form = memo[statement]
+        if form is not None:
+            forms.append(form)
+    return forms
+
+
 class LogLinarith(Tactic):
     """A tactic to try to establish a goal via logaithmic linear arithmetic for asymptotic inequalities.  Inspired by the linarith tactic in Lean."""
 
@@ -210,120 +334,25 @@ class LogLinarith(Tactic):
         """
         self.verbose = verbose
         self.split_max = split_max
+        self.certificates = {}  # certificates of infeasibility found by this tactic, reused when the tactic is replayed
 
     def activate(self, state: ProofState) -> list[ProofState]:
         # First, gather all the hypotheses that can generate inequalities.
         if false in state.list_hypotheses() or state.goal == true:
-            print("Goal trivially follows from hypotheses.")
+            logger.info("Goal trivially follows from hypotheses.")
             return []
 
-        hypotheses = set()
-
-        for hypothesis in state.list_hypotheses(variables=True):
-            if isinstance(
-                hypothesis,
-                Eq
-                | LessThan
-                | StrictLessThan
-                | GreaterThan
-                | StrictGreaterThan
-                | Ne
-                | Type,
-            ):
-                hypotheses.add(hypothesis)
-        if isinstance(
-            state.goal,
-            Eq | LessThan | StrictLessThan | GreaterThan | StrictGreaterThan | Ne,
-        ):
-            hypotheses.add(Not(state.goal))
-
         # Now gather a list of inequalities for each hypothesis.  In most cases, only one inequality is generated.
         inequality_lists : list[list[Inequality]] = []
         max_objects_set = set()
         min_objects_set = set()
-        for hypothesis in hypotheses:
-            # convert the hypothesis to an asymptotic form, which in the case of unequalities generates two hypotheses.
-            newhypotheses = []
-            if isinstance(
-                hypothesis, Type
-            ):  # check for positivity conditions to add to the inequalities
-                if hypothesis.var().is_positive and hypothesis.var().is_integer:
-                    newhypotheses = [
-                        Rel(Theta(hypothesis.var()), Theta(1), ">=")
-                    ]  # the integrality gap!
-                else:
-                    continue
-            elif isinstance(hypothesis, Relational):
-                # Obtain the associated relation involving orders of magnitude.
-                if isinstance(hypothesis.args[0], OrderOfMagnitude) and isinstance(
-                    hypothesis.args[1], OrderOfMagnitude
-                ):
-                    if isinstance(hypothesis, Ne):
-                        newhypotheses = [
-                            Rel(
-                                Theta(hypothesis.args[0]),
-                                Theta(hypothesis.args[1]),
-                                "<",
-                            ),
-                            [
-                                Rel(
-                                    Theta(hypothesis.args[0]),
-                                    Theta(hypothesis.args[1]),
-                                    ">",
-                                )
-                            ],
-                        ]
-                    else:
-                        newhypotheses = [hypothesis]
-                elif isinstance(hypothesis.args[0], OrderOfMagnitude):
-                    print(
-                        f"Warning: somehow an order of magnitude {hypothesis.args[0]} is being compared with a non-order of magnitude {hypothesis.args[1]}."
-                    )
-                    continue
-                elif isinstance(hypothesis.args[1], OrderOfMagnitude):
-                    print(
-                        f"Warning: somehow an order of magnitude {hypothesis.args[1]} is being compared with a non-order of magnitude {hypothesis.args[0]}."
-                    )
-                    continue
-                elif hypothesis.args[0].is_positive and hypothesis.args[1].is_positive:
-                    if isinstance(hypothesis, LessThan | StrictLessThan):
-                        # Note that Theta turns strict inequalities into non-strict ones.
-                        newhypotheses = [
-                            Rel(
-                                Theta(hypothesis.args[0]),
-                                Theta(hypothesis.args[1]),
-                                "<=",
-                            )
-                        ]
-                    elif isinstance(hypothesis, GreaterThan | StrictGreaterThan):
-                        newhypotheses = [
-                            Rel(
-                                Theta(hypothesis.args[1]),
-                                Theta(hypothesis.args[0]),
-                                ">=",
-                            )
-                        ]
-                    elif isinstance(hypothesis, Eq):
-                        newhypotheses = [
-                            Rel(
-                                Theta(hypothesis.args[0]),
-                                Theta(hypothesis.args[1]),
-                                "=",
-                            )
-                        ]
-                    else:
-                        continue
-                else:
-                    continue
-            else:
-                continue
-
+        for newhypotheses in asymptotic_forms(state):
             newhypotheses = [
                 hyp for hyp in newhypotheses if hyp != false
             ]  # remove false hypotheses
 
             if len(newhypotheses) == 0:
-                print("Goal trivially follows from hypotheses.")
+                logger.info("Goal trivially follows from hypotheses.")
                 return []
 
             # If we are splitting max objects, do so.
@@ -367,18 +396,23 @@ class LogLinarith(Tactic):
                 )
 
         if self.verbose:
-            print(
+            logger.info(
                 "Identified the following disjunctions of asymptotic inequalities that we need to obtain a contradiction from:"
             )
             for inequalities in inequality_lists:
-                print([order_str(ineq) for ineq in inequalities])
+                logger.info(
+                    "%s",
+                    Lazy(lambda ineqs: [order_str(ineq) for ineq in ineqs], inequalities),
+                )
 
         # Now, iterate over all possible combinations of inequalities, and check if they are feasible.
         found_counterexample = False
         proofs = []
 
+        count("log_linarith_disjunctions", len(inequality_lists))
         for inequalities in product(*inequality_lists):
-            outcome, dict = feasibility(inequalities)
+            count("log_linarith_scenarios")
+            outcome, dict = feasibility(inequalities, self.certificates)
             if outcome:
                 found_counterexample = True
                 break
@@ -387,34 +421,38 @@ class LogLinarith(Tactic):
 
         if found_counterexample:
             if self.verbose:
-                print("Checking feasibility of the following inequalities:")
+                logger.info("Checking feasibility of the following inequalities:")
                 for ineq in inequalities:
-                    print(order_str(ineq))
-                print(
+                    logger.info("%s", Lazy(order_str, ineq))
+                logger.info(
                     "Feasible with the following values, for an unbounded order of magnitude X:"
                 )
                 for var, value in dict.items():
-                    print(f"{var} = X**{value}")
+                    logger.info("%s = X**%s", var, value)
             else:
-                print("Log-linear arithmetic was unable to prove goal.")
+                logger.info("Log-linear arithmetic was unable to prove goal.")
             return [state.copy()]
         else:
             if self.verbose:
                 n = 0
                 for inequalities in product(*inequality_lists):
-                    print("Checking feasibility of the following inequalities:")
+                    logger.info("Checking feasibility of the following inequalities:")
                     for ineq in inequalities:
-                        print(order_str(ineq))
-                    print("Infeasible by multiplying the following:")
+                        logger.info("%s", Lazy(order_str, ineq))
+                    logger.info("Infeasible by multiplying the following:")
                     dict = proofs[n]
                     for ineq, coeff in dict.items():
                         if coeff.as_fraction() != Fraction(0, 1):
-                            print(f"{order_str(ineq)} raised to power {coeff}")
+                            logger.info(
+                                "%s raised to power %s",
+                                Lazy(order_str, ineq),
+                                coeff,
+                            )
                     n += 1
                 if n == 0:
-                    print("Conclusion followed tautologically from hypotheses.")
+                    logger.info("Conclusion followed tautologically from hypotheses.")
             else:
-                print("Goal solved by log-linear arithmetic!")
+                logger.info("Goal solved by log-linear arithmetic!")
             return []
 
     def __str__(self) -> str:
@@ -5,10 +5,11 @@ from sympy import Eq, Max, Min
 from estimates.lemma import Amgm
 from estimates.linarith import Linarith
 from estimates.littlewood_paley import LittlewoodPaley, bracket, sqrt
-from estimates.log_linarith import ApplyTheta, LogLinarith
+from estimates.log_linarith import ApplyTheta, ApplyThetaAll, LogLinarith
 from estimates.order_of_magnitude import OrderMax, OrderMin, asymp, gtrsim, lesssim
 from estimates.proofassistant import ProofAssistant
-from estimates.propositional_tactics import ByCases, Cases, Claim, SplitGoal, SplitHyp, Contrapose
+from estimates.propositional_tactics import ByCases, Cases, Claim, SplitGoal, SplitHyp, Contrapose, Tauto
+from estimates.search import Auto
 from estimates.simp import (
     IsNonnegative,
     IsNonzero,
@@ -16,7 +17,7 @@ from estimates.simp import (
     SimpAll,
     Calc
 )
-from estimates.subst import Set, Subst, SubstAll
+from estimates.subst import Congruence, Set, Subst, SubstAll
 from estimates.test import Trivial
 from estimates.bounded import Bounded
 
@@ -63,6 +64,12 @@ def case_split_solution() -> None:
     p.use(Cases("h1"))
     p.all_goals_use(SimpAll(repeat=True))
 
+
+def case_split_tauto_solution() -> None:
+    p = case_split_exercise()
+    p.use(Tauto())
+
+
 def split_exercise() -> ProofAssistant:
     p = ProofAssistant()
     x, y = p.vars("real", "x", "y")
@@ -93,6 +100,12 @@ def pigeonhole_solution() -> None:
     p.use(SplitHyp("h"))
     p.use(Linarith())
 
+
+def pigeonhole_auto_solution() -> None:
+    p = pigeonhole_exercise()
+    p.use(Auto())
+
+
 def trichotomy_exercise() -> ProofAssistant:
     p = ProofAssistant()
     x, y = p.vars("real", "x", "y")
@@ -236,6 +249,18 @@ def loglinarith_hard_solution2() -> None:
     p.use(LogLinarith())
 
 
+def loglinarith_hard_solution3() -> None:
+    p = loglinarith_hard_exercise()
+    p.use(ApplyThetaAll())
+    N = p.get_var("N")
+    p.use(Claim(lesssim(1, N), "h3"))
+    p.use(LogLinarith())
+    p.use(Claim(lesssim(1, N**2), "h4"))
+    p.use(LogLinarith())
+    p.use(SimpAll())
+    p.use(LogLinarith())
+
+
 def loglinarith_imposssible_example() -> ProofAssistant:
     p = ProofAssistant()
     N = p.var("pos_int", "N")
@@ -376,6 +401,13 @@ def subst_all_solution() -> None:
     p.use(SubstAll("hN"))
     p.use(Linarith())
 
+
+def subst_all_congruence_solution() -> None:
+    p = subst_all_example()
+    p.use(Congruence())
+    p.use(Linarith())
+
+
 def subst_all_example_reversed() -> ProofAssistant:
     p = ProofAssistant()
     N = p.var("pos_int", "N")
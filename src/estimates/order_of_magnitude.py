@@ -1,6 +1,11 @@
 from sympy import Add, Basic, Eq, Expr, Max, Mul, Pow, S, Symbol, sympify
 from sympy.core.relational import Relational
 
+from estimates.assumptions import is_positive
+from estimates.output import get_logger
+
+logger = get_logger(__name__)
+
 class Undefined(Expr):
     """A marker that says “– is not defined”, but is still technically a `Expr` for the purposes of sympy operations.
     Return this value (and optionally, print a warning), rather than an error, when performing an operation that is not defined."""
@@ -116,8 +121,11 @@ class Theta(OrderOfMagnitude, Expr):
         if isinstance(expr, OrderOfMagnitude):
             return expr
 
-        if not expr.is_positive:
-            print(f"Warning: a non-positive argument {expr!s} was passed to Theta.")
+        if not is_positive(expr):
+            logger.warning(
+                "Warning: a non-positive argument %s was passed to Theta.",
+                expr,
+            )
             return Undefined()
 
         if expr.is_number:
@@ -127,16 +135,16 @@ class Theta(OrderOfMagnitude, Expr):
             return obj
 
         if isinstance(expr, Add | Max):
-            if all(arg.is_positive for arg in expr.args):
+            if all(is_positive(arg) for arg in expr.args):
                 # Distribute the Theta operator over the sum or max
                 return OrderMax(*[Theta(arg) for arg in expr.args]).doit()
 
-        if isinstance(expr, Mul) and all(arg.is_positive for arg in expr.args):
+        if isinstance(expr, Mul) and all(is_positive(arg) for arg in expr.args):
             # Distribute the Theta operator over the product
             return OrderMul(*[Theta(arg) for arg in expr.args]).doit()
 
         if isinstance(expr, Pow) and (
-            expr.args[0].is_positive
+            is_positive(expr.args[0])
             and expr.args[1].is_number
             and expr.args[1].is_rational
         ):
@@ -174,7 +182,7 @@ class OrderMax(OrderOfMagnitude, Expr):
         # TODO: respect sympy's evaluate flag
         newargs = list(dict.fromkeys([Theta(arg) for arg in args]))
         if len(newargs) == 0:
-            print("Warning: OrderMax was passed no arguments.")
+            logger.warning("Warning: OrderMax was passed no arguments.")
             return Undefined()
         if len(newargs) == 1:
             # if there's only one argument, just return it
@@ -219,7 +227,7 @@ class OrderMin(OrderOfMagnitude, Expr):
 
         newargs = list(dict.fromkeys([Theta(arg) for arg in args]))
         if len(newargs) == 0:
-            print("Warning: OrderMin was passed no arguments.")
+            logger.warning("Warning: OrderMin was passed no arguments.")
             return Undefined()
         if len(newargs) == 1:
             # if there's only one argument, just return it
@@ -337,15 +345,15 @@ class OrderPow(OrderOfMagnitude, Expr):
         # TODO: respect sympy's evaluate flag
 
         if len(args) != 2:
-            print(f"OrderPow{args} requires exactly two arguments.")
+            logger.warning("OrderPow%s requires exactly two arguments.", args)
             return Undefined()
         base = S(args[0])
         exp = S(args[1])
         if not exp.is_number:
-            print(f"Exponent {exp} must be a number.")
+            logger.warning("Exponent %s must be a number.", exp)
             return Undefined()
         if not isinstance(base, OrderOfMagnitude):
-            print(f"Base {base} must be an order of magnitude.")
+            logger.warning("Base %s must be an order of magnitude.", base)
             return Undefined()
 
         if exp == S(0):
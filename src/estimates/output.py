@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import logging
+import sys
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Literal
+
+# The output channel for the messages of the proof assistant and its tactics, built on the standard `logging` module.
+# Each module obtains a logger with `get_logger(__name__)`, and reports messages with `logger.info(...)` (or `logger.warning(...)` for warnings), passing any arguments separately in the %-style (`logger.info("Simplified %s to %s.", goal, new_goal)`), so that the message is only formatted if it is actually output.
+# Arguments that are themselves expensive to construct can be wrapped as `Lazy(function, *args)`, which only calls the function if the message is output.
+# There are three output modes:
+# * "console" (the default): messages are printed to standard output, exactly as `print` would.
+# * "json": each message is printed to standard output as a line of JSON, recording its level and source module as well as its text.
+# * "silent": messages are discarded without being formatted.
+
+OutputMode = Literal["console", "json", "silent"]
+
+logger = logging.getLogger("estimates")
+
+
+class _StdoutHandler(logging.Handler):
+    """A handler that writes to the current `sys.stdout` (rather than to the stream at the time the handler was created), so that the output can be captured or redirected in the usual ways."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+class _JSONFormatter(logging.Formatter):
+    """Format a message as a line of JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {
+                "level": record.levelname.lower(),
+                "source": record.name,
+                "message": record.getMessage(),
+            }
+        )
+
+
+_CONSOLE_FORMATTER = logging.Formatter("%(message)s")
+_JSON_FORMATTER = _JSONFormatter()
+
+_handler = _StdoutHandler()
+_handler.setFormatter(_CONSOLE_FORMATTER)
+logger.addHandler(_handler)
+logger.setLevel(logging.INFO)
+logger.propagate = False  # do not also pass messages to any handlers of the root logger
+
+_mode: OutputMode = "console"
+
+
+class Lazy:
+    """A message argument that is only computed (by calling a function) if the message is actually output."""
+
+    def __init__(self, function: Callable[..., Any], *args: Any) -> None:
+        self.function = function
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.function(*self.args))
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the logger for a module of this package (pass `__name__`)."""
+    return logging.getLogger(name)
+
+
+def get_output_mode() -> OutputMode:
+    """Return the current output mode."""
+    return _mode
+
+
+def set_output_mode(mode: OutputMode) -> None:
+    """Set the output mode to "console", "json", or "silent"."""
+    global _mode
+    match mode:
+        case "console":
+            _handler.setFormatter(_CONSOLE_FORMATTER)
+            logger.setLevel(logging.INFO)
+        case "json":
+            _handler.setFormatter(_JSON_FORMATTER)
+            logger.setLevel(logging.INFO)
+        case "silent":
+            logger.setLevel(logging.CRITICAL + 1)  # above every level, so that no message is even formatted
+        case _:
+            raise ValueError(
+                f"Unknown output mode {mode}.  Currently accepted modes: 'console', 'json', 'silent'."
+            )
+    _mode = mode
+
+
+class _RecordingHandler(logging.Handler):
+    """A handler that records messages instead of writing them."""
+
+    def __init__(self, records: list[tuple[str, int, str]]) -> None:
+        super().__init__()
+        self.records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append((record.name, record.levelno, record.getMessage()))
+
+
+@contextmanager
+def recording() -> Iterator[list[tuple[str, int, str]]]:
+    """
+    A context manager that records the messages output within it (as triples of source, level and text), instead of writing them, so that they can be output later with `replay`.  Messages that the current output mode would discard are not recorded.
+    This is used to output the messages of work done in other processes in a deterministic order.
+    """
+    records: list[tuple[str, int, str]] = []
+    handler = _RecordingHandler(records)
+    logger.removeHandler(_handler)
+    logger.addHandler(handler)
+    try:
+        yield records
+    finally:
+        logger.removeHandler(handler)
+        logger.addHandler(_handler)
+
+
+def replay(records: list[tuple[str, int, str]]) -> None:
+    """Output messages recorded by `recording`."""
+    for name, level, message in records:
+        logging.getLogger(name).log(level, "%s", message)
+
+
+@contextmanager
+def output_mode(mode: OutputMode) -> Iterator[None]:
+    """A context manager that sets the output mode, restoring the previous mode on exit."""
+    previous = _mode
+    set_output_mode(mode)
+    try:
+        yield
+    finally:
+        set_output_mode(previous)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+
+from estimates.output import OutputMode, recording, set_output_mode
+from estimates.proofstate import ProofState
+from estimates.tactic import TACTIC_ERRORS, Tactic
+
+# Support for using a tactic on many independent proof states at once, in a pool of worker processes.
+# This module is only imported when parallelism is requested (it is not needed, and multiprocessing is not available, in the browser version of the proof assistant).
+# Proof states are sent to the workers without their memo tables (see `ProofState.__getstate__`), and the messages output by each worker are recorded and output again by the main process, in the order of the proof states, so that the output is the same as if the tactic had been used on each proof state in turn.
+
+
+class Outcome:
+    """The result of using a tactic on one proof state in a worker: the resulting proof states (or the error raised), the messages output, and the tactic itself (which may have recorded information, such as certificates, while being used)."""
+
+    def __init__(
+        self,
+        states: list[ProofState] | None,
+        records: list[tuple[str, int, str]],
+        tactic: Tactic,
+        error: str | None = None,
+    ) -> None:
+        self.states = states
+        self.records = records
+        self.tactic = tactic
+        self.error = error
+
+
+def _activate(tactic: Tactic, state: ProofState, mode: OutputMode) -> Outcome:
+    """Use a tactic on a proof state in a worker process."""
+    set_output_mode(mode)
+    with recording() as records:
+        try:
+            states = tactic.activate(state)
+        except TACTIC_ERRORS as e:
+            return Outcome(None, records, tactic, f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+    return Outcome(states, records, tactic)
+
+
+def activate_all(
+    tactic: Tactic, states: list[ProofState], mode: OutputMode, workers: int | None = None
+) -> list[Outcome]:
+    """
+    Use a tactic on each of a list of proof states, in a pool of `workers` processes (by default, one per CPU).  Returns the outcomes in the order of the proof states.
+    A failure on one proof state (an error raised by the tactic because it does not apply, or the death of a worker) is reported in its outcome, and does not affect the others; any other error raised by the tactic is raised again here, as it would be if the tactic were used in this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(states)))
+    outcomes = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures: list[Future[Outcome]] = [
+            pool.submit(_activate, tactic, state, mode) for state in states
+        ]
+        for state, future in zip(states, futures, strict=True):
+            try:
+                outcome = future.result()
+            except (BrokenProcessPool, PicklingError) as e:  # the worker process died, or a result could not be sent back
+                outcome = Outcome(None, [], tactic, f"{type(e).__name__}: {e}")
+            if outcome.states is not None:
+                for new_state in outcome.states:  # share the memo tables of the original proof state again
+                    new_state.asymptotic_forms = state.asymptotic_forms
+                    new_state.assumption_cache = state.assumption_cache
+            outcomes.append(outcome)
+    return outcomes
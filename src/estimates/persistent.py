@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any, Generic, TypeVar
+
+# Persistent (immutable, structure-sharing) ordered maps, implemented as path-copying AVL trees.
+# An update creates O(log n) new nodes and shares all the others with the original map, so that "copying" a map is free, and many slightly different versions of a map can be kept alive cheaply.
+# Nodes are tuples (key, value, left, right, height), with None representing the empty tree.  Keys must be mutually comparable (e.g., all strings, or all integers).
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+Node = tuple[Any, Any, Any, Any, int] | None
+
+
+def _height(node: Node) -> int:
+    return 0 if node is None else node[4]
+
+
+def _make(key: Any, value: Any, left: Node, right: Node) -> Node:
+    return (key, value, left, right, max(_height(left), _height(right)) + 1)
+
+
+def _balance(key: Any, value: Any, left: Node, right: Node) -> Node:
+    """Create a node, applying a rotation if the heights of the two subtrees differ by more than one."""
+    hl = _height(left)
+    hr = _height(right)
+    if hl > hr + 1:
+        lkey, lvalue, lleft, lright, _ = left
+        if _height(lleft) >= _height(lright):
+            return _make(lkey, lvalue, lleft, _make(key, value, lright, right))
+        lrkey, lrvalue, lrleft, lrright, _ = lright
+        return _make(
+            lrkey, lrvalue, _make(lkey, lvalue, lleft, lrleft), _make(key, value, lrright, right)
+        )
+    if hr > hl + 1:
+        rkey, rvalue, rleft, rright, _ = right
+        if _height(rright) >= _height(rleft):
+            return _make(rkey, rvalue, _make(key, value, left, rleft), rright)
+        rlkey, rlvalue, rlleft, rlright, _ = rleft
+        return _make(
+            rlkey, rlvalue, _make(key, value, left, rlleft), _make(rkey, rvalue, rlright, rright)
+        )
+    return _make(key, value, left, right)
+
+
+def _insert(node: Node, key: Any, value: Any) -> tuple[Node, bool]:
+    """Return the tree with key set to value, and whether the key is new."""
+    if node is None:
+        return (key, value, None, None, 1), True
+    nkey, nvalue, left, right, height = node
+    if key < nkey:
+        left, added = _insert(left, key, value)
+        return _balance(nkey, nvalue, left, right), added
+    if nkey < key:
+        right, added = _insert(right, key, value)
+        return _balance(nkey, nvalue, left, right), added
+    if nvalue is value:
+        return node, False
+    return (key, value, left, right, height), False
+
+
+def _remove_min(node: Node) -> tuple[Node, Any, Any]:
+    """Return the tree with its smallest key removed, together with that key and its value."""
+    key, value, left, right, _ = node
+    if left is None:
+        return right, key, value
+    left, min_key, min_value = _remove_min(left)
+    return _balance(key, value, left, right), min_key, min_value
+
+
+def _delete(node: Node, key: Any) -> Node:
+    """Return the tree with the key removed.  Raises KeyError if the key is not present."""
+    if node is None:
+        raise KeyError(key)
+    nkey, nvalue, left, right, _ = node
+    if key < nkey:
+        return _balance(nkey, nvalue, _delete(left, key), right)
+    if nkey < key:
+        return _balance(nkey, nvalue, left, _delete(right, key))
+    if left is None:
+        return right
+    if right is None:
+        return left
+    right, min_key, min_value = _remove_min(right)
+    return _balance(min_key, min_value, left, right)
+
+
+class PersistentMap(Generic[K, V]):
+    """
+    An immutable map from keys to values, ordered by key.  `set()` and `delete()` return new maps, sharing most of their structure with the original.
+    """
+
+    __slots__ = ("_len", "_root")
+
+    _root: Node   # The root node of the AVL tree
+    _len: int     # The number of keys in the map
+
+    def __init__(self) -> None:
+        self._root = None
+        self._len = 0
+
+    @classmethod
+    def _from_root(cls, root: Node, length: int) -> PersistentMap[K, V]:
+        new = cls.__new__(cls)
+        new._root = root
+        new._len = length
+        return new
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        """Return the value of a key, or `default` if the key is not present."""
+        node = self._root
+        while node is not None:
+            nkey = node[0]
+            if key < nkey:
+                node = node[2]
+            elif nkey < key:
+                node = node[3]
+            else:
+                return node[1]
+        return default
+
+    def __getitem__(self, key: K) -> V:
+        node = self._root
+        while node is not None:
+            nkey = node[0]
+            if key < nkey:
+                node = node[2]
+            elif nkey < key:
+                node = node[3]
+            else:
+                return node[1]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        node = self._root
+        while node is not None:
+            nkey = node[0]
+            if key < nkey:
+                node = node[2]
+            elif nkey < key:
+                node = node[3]
+            else:
+                return True
+        return False
+
+    def set(self, key: K, value: V) -> PersistentMap[K, V]:
+        """Return a new map in which the key is set to the value."""
+        root, added = _insert(self._root, key, value)
+        if root is self._root:
+            return self
+        return self._from_root(root, self._len + 1 if added else self._len)
+
+    def delete(self, key: K) -> PersistentMap[K, V]:
+        """Return a new map with the key removed.  Raises KeyError if the key is not present."""
+        return self._from_root(_delete(self._root, key), self._len - 1)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _nodes(self) -> Iterator[tuple[Any, Any, Any, Any, int]]:
+        """Iterate through the nodes in key order."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node[2]
+            node = stack.pop()
+            yield node
+            node = node[3]
+
+    def __iter__(self) -> Iterator[K]:
+        for node in self._nodes():
+            yield node[0]
+
+    def keys(self) -> Iterator[K]:
+        """Iterate through the keys, in order."""
+        return iter(self)
+
+    def values(self) -> Iterator[V]:
+        """Iterate through the values, in the order of their keys."""
+        for node in self._nodes():
+            yield node[1]
+
+    def items(self) -> Iterator[tuple[K, V]]:
+        """Iterate through the (key, value) pairs, in key order."""
+        for node in self._nodes():
+            yield node[0], node[1]
+
+    def __repr__(self) -> str:
+        return "PersistentMap({" + ", ".join(f"{k!r}: {v!r}" for k, v in self.items()) + "})"
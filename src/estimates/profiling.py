@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import TYPE_CHECKING, Any, TextIO, TypeVar
+
+from sympy import Basic, preorder_traversal
+
+if TYPE_CHECKING:
+    from estimates.proofstate import ProofState
+
+# Instrumentation for finding out where the time goes in a proof.
+# While a profiler is active (inside `with profiling() as profiler: ...`), the proof assistant records
+# * spans: timed sections of code, such as a tactic, a call to the linear programming solver, or a simplification pass; and
+# * counters: numbers of events, such as solver calls, scenarios considered, or cache hits.
+# The spans can be exported as a Chrome trace (viewable in chrome://tracing, Perfetto or speedscope, as a flame graph), and the time and counters of each tactic are also attached to its proof tree node.
+# When no profiler is active, the hooks do nothing beyond checking a global variable.
+
+_active: Profiler | None = None
+
+
+class Profiler:
+    """A record of the spans and counters collected while profiling."""
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []  # completed spans, in Chrome trace format
+        self.counters: dict[str, int] = {}
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[dict[str, Any]]:
+        """Time a section of code.  Yields the dictionary of arguments of the span, to which further information can be added."""
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Add n to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Return the number of spans and their total time in seconds, for each span name (sorted by decreasing total time)."""
+        totals: dict[str, dict[str, float]] = {}
+        for event in self.events:
+            total = totals.setdefault(event["name"], {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] += event["dur"] / 1e6
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Return the spans and counters as a Chrome trace (a JSON-compatible object)."""
+        events = sorted(self.events, key=lambda event: (event["ts"], -event["dur"]))
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": dict(self.counters)},
+        }
+
+    def write_chrome_trace(self, file: TextIO) -> None:
+        """Write the spans and counters to a file as a Chrome trace."""
+        json.dump(self.chrome_trace(), file, default=str)
+
+
+@contextmanager
+def profiling(profiler: Profiler | None = None) -> Iterator[Profiler]:
+    """A context manager that activates a profiler (a new one, if none is given) for a block of code."""
+    global _active
+    if profiler is None:
+        profiler = Profiler()
+    previous = _active
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+def active_profiler() -> Profiler | None:
+    """Return the active profiler, if any."""
+    return _active
+
+
+def span(name: str, category: str = "", **args: Any) -> Any:
+    """Time a section of code with the active profiler, if any."""
+    if _active is None:
+        return nullcontext(args)
+    return _active.span(name, category, **args)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter of the active profiler, if any."""
+    if _active is not None:
+        _active.count(name, n)
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def profiled(name: str, category: str = "") -> Callable[[F], F]:
+    """A decorator that times every call of a function with the active profiler, if any."""
+
+    def decorator(function: F) -> F:
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _active is None:
+                return function(*args, **kwargs)
+            with _active.span(name, category):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def expression_size(expr: Basic) -> int:
+    """The number of nodes in the expression tree of a sympy expression."""
+    return sum(1 for _ in preorder_traversal(expr))
+
+
+def state_size(state: ProofState) -> int:
+    """The total size of the goal and hypotheses of a proof state."""
+    return expression_size(state.goal) + sum(
+        expression_size(hypothesis) for hypothesis in state.hypotheses.values()
+    )
@@ -1,12 +1,23 @@
+import json
+import time
+from collections.abc import Iterator
+from collections.abc import Set as AbstractSet
+from typing import TextIO
+
 from sympy import Basic, S, Expr
 from sympy.logic.boolalg import Boolean
 
 from estimates.basic import Type, describe, is_defined, new_var
 from estimates.lemma import Lemma, UseLemma
-from estimates.proofstate import ProofState
-from estimates.prooftree import ProofTree
+from estimates.output import get_logger, get_output_mode, output_mode, replay
+from estimates.proofstate import Hypotheses, ProofState
+from estimates.prooftree import ProofTree, StateBudget
+from estimates.search import Search
+from estimates.serialization import proof_from_dict, proof_to_dict
 from estimates.tactic import Tactic
 
+logger = get_logger(__name__)
+
 # A pseudo-Lean stype proof assistant.  The proof assistant will, at any time, be one of two modes:
 
 # * Assumption mode (the starting mode).  Here, one can add variables and hypotheses as running assumptions, until one starts a proof.
@@ -15,19 +26,21 @@ from estimates.tactic import Tactic
 
 class ProofAssistant:
     mode : str                      # either "assumption" or "tactic"   
-    hypotheses : dict[str, Basic]   # a dictionary of (str, Basic) pairs
+    hypotheses : Hypotheses         # a dictionary of (str, Basic) pairs
     theorem_str : str               # a description of the theorem
     proof_tree : ProofTree | None   # the root of the proof tree
     current_node : ProofTree | None # the current node in the proof tree
     auto_finish : bool              # whether one automatically finishes the proof when all sorries are cleared
+    state_budget : int | None       # the number of interior proof states to hold in memory, or None for no limit
 
     def __init__(self) -> None:
         self.mode = "assumption"
-        self.hypotheses = {}  
+        self.hypotheses = Hypotheses()
         self.theorem_str = "" 
         self.proof_tree = None 
         self.current_node = None 
         self.auto_finish = True
+        self.state_budget = None
 
     def assume(self, assumption: Basic, name: str = "this") -> None:
         """Add a hypothesis to the list of assumptions."""
@@ -48,16 +61,35 @@ class ProofAssistant:
 
     def auto_finish_on(self) -> None:
         """Automatically finish the proof when all sorries are cleared."""
-        print(
+        logger.info(
             "Proof assistant will automatically exit Tactic mode when proof is complete."
         )
         self.auto_finish = True
 
     def auto_finish_off(self) -> None:
         """Do not automatically finish the proof when all sorries are cleared."""
-        print("Proof assistant will stay in Tactic mode even when proof is complete.")
+        logger.info(
+            "Proof assistant will stay in Tactic mode even when proof is complete."
+        )
         self.auto_finish = False
 
+    def set_state_budget(self, size: int | None) -> None:
+        """
+        Limit the number of proof states held in memory by the interior nodes of the proof tree to a given size (or remove the limit, if size is None).
+        Evicted states are recomputed from the stored tactics when needed, and the states in closed subtrees are dropped as soon as the subtree is closed.
+        """
+        self.state_budget = size
+        if self.proof_tree is not None:
+            self.proof_tree.set_budget(None if size is None else StateBudget(size))
+
+    def collapse_closed(self, node: ProofTree) -> None:
+        """If a node lies in a closed subtree, drop the proof states of the largest closed subtree containing it (when a state budget is in force)."""
+        if self.state_budget is None or node.sorry_count > 0:
+            return
+        while node.parent is not None and node.parent.sorry_count == 0:
+            node = node.parent
+        node.collapse()
+
     def var(self, type: str, name: str = "this") -> Expr:
         """Introduce a variable of a given type, stored as a Tuple wrapper around a sympy variable of the same type."""
         if self.mode == "assumption":
@@ -86,7 +118,7 @@ class ProofAssistant:
     def clear_hypotheses(self) -> None:
         """Clear the list of hypotheses."""
         if self.mode == "assumption":
-            self.hypotheses = {}  # clear the hypotheses
+            self.hypotheses = Hypotheses()  # clear the hypotheses
         else:
             raise ValueError(
                 "Cannot clear hypotheses in tactic mode.  Please switch to assumption mode."
@@ -140,12 +172,10 @@ class ProofAssistant:
             varlist.append(self.get_var(name))
         return varlist
 
-    def get_all_vars(self) -> set[Basic]:
-        """Get all variables from the list of assumptions (in Assumption mode) or proof state (in Tactic mode)."""
+    def get_all_vars(self) -> AbstractSet[Basic]:
+        """Get all variables from the list of assumptions (in Assumption mode) or proof state (in Tactic mode), as a read-only set."""
         if self.mode == "assumption":
-            return {
-                obj.var() for obj in self.hypotheses.values() if isinstance(obj, Type)
-            }
+            return self.hypotheses.vars()
         else:
             return self.get_state().get_all_vars()
 
@@ -161,6 +191,8 @@ class ProofAssistant:
                 )
             self.mode = "tactic"
             self.proof_tree = ProofTree(ProofState(goal, self.hypotheses))
+            if self.state_budget is not None:
+                self.proof_tree.set_budget(StateBudget(self.state_budget))
             self.current_node = self.proof_tree
             self.theorem_str = "example "
             self.theorem_str += " ".join(
@@ -170,9 +202,9 @@ class ProofAssistant:
                 ]
             )
             self.theorem_str += f": {goal}"
-            self.hypotheses = {}
-            print("Starting proof.  Current proof state:")
-            print(self.current_proof_state())
+            self.hypotheses = Hypotheses()
+            logger.info("Starting proof.  Current proof state:")
+            logger.info("%s", self.current_proof_state())
         else:
             raise ValueError(
                 "Cannot start a proof in tactic mode.  Please switch to assumption mode."
@@ -187,7 +219,7 @@ class ProofAssistant:
         """Return the current goal."""
         return self.current_proof_state().goal
 
-    def current_hypotheses(self) -> dict[str, Basic]:
+    def current_hypotheses(self) -> Hypotheses:
         """Return the current hypotheses."""
         assert self.current_node is not None, "Current node is not initialized."
         return self.current_node.proof_state.hypotheses
@@ -199,7 +231,7 @@ class ProofAssistant:
             self.proof_tree = None
             self.current_node = None
             self.theorem_str = ""
-            self.hypotheses = {}
+            self.hypotheses = Hypotheses()
         else:
             raise ValueError(
                 "Cannot abandon a proof in assumption mode.  Please start a proof first."
@@ -210,7 +242,7 @@ class ProofAssistant:
         if self.mode == "tactic":
             self.mode = "assumption"
             self.current_node = None
-            print("Exiting Tactic mode.")
+            logger.info("Exiting Tactic mode.")
         else:
             raise ValueError("You are already in assumption mode!")
 
@@ -219,33 +251,64 @@ class ProofAssistant:
         if self.mode == "assumption":
             self.mode = "tactic"
             self.current_node = self.proof_tree
-            print("Re-entering Tactic mode.  Current proof state:")
-            print(self.current_proof_state())
+            logger.info("Re-entering Tactic mode.  Current proof state:")
+            logger.info("%s", self.current_proof_state())
         else:
             raise ValueError("You are already in tactic mode!")
 
+    def proof_lines(self) -> Iterator[str]:
+        """Generate the lines of the current proof tree, one at a time."""
+        if self.proof_tree is None:
+            raise ValueError("No proof tree available.")
+        yield self.theorem_str + " := by"
+        yield from self.proof_tree.iter_lines(current_node=self.current_node)
+
     def proof(self) -> str:
         """Return the current proof tree as a string."""
+        return "\n".join(self.proof_lines())
+
+    def write_proof(self, file: TextIO) -> None:
+        """Write the current proof tree to a file (or any other text stream), one line at a time, without building the whole proof as a string."""
+        for line in self.proof_lines():
+            file.write(line + "\n")
+
+    def save_proof(self, file: TextIO, certificates: bool = True) -> None:
+        """
+        Save the current proof tree (together with its initial hypotheses and goal) to a file, in a format that can be read back by `load_proof`.
+        :param certificates: If true, also save the certificates found by linear arithmetic tactics, so that they do not need to be searched for again when the proof is loaded.
+        """
         if self.proof_tree is None:
             raise ValueError("No proof tree available.")
-        else:
-            return (
-                self.theorem_str
-                + " := by"
-                + "\n"
-                + self.proof_tree.rstr_join(current_node=self.current_node)
+        json.dump(proof_to_dict(self.proof_tree, certificates), file)
+
+    def load_proof(self, file: TextIO) -> None:
+        """Load a proof saved by `save_proof`, replaying its tactics without printing their output.  Only valid in assumption mode; the hypotheses are replaced by those of the saved proof."""
+        if self.mode != "assumption":
+            raise ValueError(
+                "Cannot load a proof in tactic mode.  Please switch to assumption mode."
             )
+        hypotheses, goal, steps = proof_from_dict(json.load(file))
+        with output_mode("silent"):
+            self.hypotheses = Hypotheses(hypotheses)
+            self.begin_proof(goal)
+            assert self.proof_tree is not None, "Proof tree is not initialized."
+            self.proof_tree.replay(steps)
+        logger.info("Loaded proof.")
+        self.status()
+        self.current_node = self.proof_tree.first_sorry()
+        if self.current_node is None and self.auto_finish:
+            self.mode = "assumption"
 
     def status(self) -> None:
         """Print the current status of the proof."""
         assert self.proof_tree is not None, "Proof tree is not initialized."
         n = self.proof_tree.num_sorries()
         if n == 0:
-            print("Proof complete!")
+            logger.info("Proof complete!")
         elif n == 1:
-            print("1 goal remaining.")
+            logger.info("1 goal remaining.")
         else:
-            print(f"{n} goals remaining.")
+            logger.info("%s goals remaining.", n)
 
     def use(self, tactic: Tactic) -> None:
         """Apply a tactic to the current proof state."""
@@ -256,27 +319,92 @@ class ProofAssistant:
             assert self.current_node is not None, "Current node is not initialized."
             if not self.current_node.use_tactic(tactic):
                 return  # Tactic did nothing, so don't change the current node
-            self.status()
-            _, before, after = self.proof_tree.find_sorry(self.current_node)
-            if after is not None:
-                self.current_node = after
-            elif before is not None:
-                self.current_node = before
-            else:
-                # all goals cleared!
-                if self.auto_finish:
-                    self.current_node = None
-                    self.mode = "assumption"
+            self._advance()
+        else:
+            raise ValueError(
+                "Cannot apply tactics in assumption mode.  Please switch to tactic mode."
+            )
+
+    def _advance(self) -> None:
+        """After a tactic has been used at the current node, report the status of the proof and move to the next goal."""
+        assert self.proof_tree is not None, "Proof tree is not initialized."
+        assert self.current_node is not None, "Current node is not initialized."
+        self.collapse_closed(self.current_node)
+        self.status()
+        _, before, after = self.proof_tree.find_sorry(self.current_node)
+        if after is not None:
+            self.current_node = after
+        elif before is not None:
+            self.current_node = before
         else:
+            # all goals cleared!
+            if self.auto_finish:
+                self.current_node = None
+                self.mode = "assumption"
+
+    def auto(self, max_depth: int = 4, max_tactics: int = 500, timeout: float | None = 60.0) -> None:
+        """
+        Search for a proof of the current goal using the other tactics (see `search.py`), and if one is found, record it in the proof tree.
+        :param max_depth: The maximum number of non-closing tactics along any branch of the proof.
+        :param max_tactics: The maximum number of tactics to use.
+        :param timeout: The maximum time to search for, in seconds.
+        """
+        if self.mode != "tactic":
             raise ValueError(
                 "Cannot apply tactics in assumption mode.  Please switch to tactic mode."
             )
+        assert self.current_node is not None, "Current node is not initialized."
+        search = Search(max_depth, max_tactics, timeout)
+        start = time.perf_counter()
+        proof = search.prove(self.current_node.proof_state)
+        seconds = time.perf_counter() - start
+        if proof is None:
+            logger.info(
+                "Proof search was unable to prove goal (%s tactics used in %.2f seconds).",
+                search.tactics_used,
+                seconds,
+            )
+            return
+        logger.info(
+            "Proof found by search (%s tactics used in %.2f seconds):",
+            search.tactics_used,
+            seconds,
+        )
+        for line in proof.iter_lines():
+            logger.info("%s", line)
+        stack = [(self.current_node, proof)]
+        while stack:
+            node, step = stack.pop()
+            children = node.splice(step.tactic, step.states)
+            stack.extend(zip(children, step.children, strict=True))
+        self._advance()
         
-    def all_goals_use(self, tactic: Tactic) -> None:
-        """Apply a tactic to all the goals in the proof tree."""
+    def all_goals_use(self, tactic: Tactic, workers: int | None = 1) -> None:
+        """
+        Apply a tactic to all the goals in the proof tree.
+        :param workers: The number of processes to use.  If more than one (or None, for one per CPU), the tactic is used on the goals in parallel, and a goal on which the tactic fails is left open (with a warning) without affecting the others.
+        """
         assert self.proof_tree is not None, "Proof tree is not initialized."
-        for node in self.proof_tree.list_sorries():
-            node.use_tactic(tactic)
+        nodes = self.proof_tree.list_sorries()
+        if workers == 1 or len(nodes) <= 1:
+            for node in nodes:
+                node.use_tactic(tactic)
+                self.collapse_closed(node)
+                self.status()
+            return
+
+        from estimates.parallel import activate_all  # multiprocessing is only imported when needed
+
+        outcomes = activate_all(tactic, [node.proof_state for node in nodes], get_output_mode(), workers)
+        for node, outcome in zip(nodes, outcomes, strict=True):
+            replay(outcome.records)
+            if hasattr(tactic, "certificates"):
+                tactic.certificates.update(outcome.tactic.certificates)
+            if outcome.states is None:
+                logger.warning("%s failed on %s: %s", tactic, node.proof_state.goal, outcome.error)
+            elif not (len(outcome.states) == 1 and outcome.states[0].eq(node.proof_state)):
+                node.splice(tactic, outcome.states)
+                self.collapse_closed(node)
             self.status()
 
     def use_lemma(self, lemma: Lemma, name: str = "this") -> None:
@@ -287,17 +415,20 @@ class ProofAssistant:
         """Set the current node to a given node in the proof tree."""
         if self.mode == "tactic":
             assert self.proof_tree is not None, "Proof tree is not initialized."
-            if node in self.proof_tree.list_sorries():
+            found, num_before, num_after = self.proof_tree.count_sorries(node)
+            if found and node.tactic is None:
                 self.current_node = node
-                _, num_before, num_after = self.proof_tree.count_sorries(
-                    self.current_node
-                )
-                print(
-                    f"Moved to goal {num_before + 1} of {num_before + 1 + num_after}."
+                logger.info(
+                    "Moved to goal %s of %s.",
+                    num_before + 1,
+                    num_before + 1 + num_after,
                 )
             else:
                 self.current_node = node
-                print(f'Moved to a proof state currently handled by "{node.tactic}").')
+                logger.info(
+                    'Moved to a proof state currently handled by "%s").',
+                    node.tactic,
+                )
         else:
             raise ValueError("Cannot set current node in assumption mode.")
 
@@ -310,7 +441,7 @@ class ProofAssistant:
             if after is not None:
                 self.set_current_node(after)
             else:
-                print("No subsequent goal to move to.")
+                logger.info("No subsequent goal to move to.")
         else:
             raise ValueError("Cannot move to next goal in assumption mode.")
 
@@ -323,7 +454,7 @@ class ProofAssistant:
             if before is not None:
                 self.set_current_node(before)
             else:
-                print("No previous goal to move to.")
+                logger.info("No previous goal to move to.")
         else:
             raise ValueError("Cannot move to previous goal in assumption mode.")
 
@@ -335,7 +466,7 @@ class ProofAssistant:
             if first is not None:
                 self.set_current_node(first)
             else:
-                print("No goals to move to.")
+                logger.info("No goals to move to.")
         else:
             raise ValueError("Cannot move to first goal in assumption mode.")
 
@@ -347,7 +478,7 @@ class ProofAssistant:
             if last is not None:
                 self.set_current_node(last)
             else:
-                print("No goals to move to.")
+                logger.info("No goals to move to.")
         else:
             raise ValueError("Cannot move to last goal in assumption mode.")
 
@@ -357,9 +488,9 @@ class ProofAssistant:
             assert self.current_node is not None, "Current node is not initialized."
             if self.current_node.parent is not None:
                 self.set_current_node(self.current_node.parent)
-                print("Moved back a step in the proof.")
+                logger.info("Moved back a step in the proof.")
             else:
-                print("Already at start of proof.")
+                logger.info("Already at start of proof.")
         else:
             raise ValueError("Cannot move back in assumption mode.")
 
@@ -368,23 +499,33 @@ class ProofAssistant:
         if self.mode == "tactic":
             assert self.current_node is not None, "Current node is not initialized."
             if len(self.current_node.children) == 0:
-                print("There are no more steps in this branch of the proof.")
+                logger.info("There are no more steps in this branch of the proof.")
             elif case > len(self.current_node.children):
-                print(
-                    "There are only {len(self.current_node.children)} cases after this step of the proof."
+                logger.info(
+                    "There are only %s cases after this step of the proof.",
+                    len(self.current_node.children),
                 )
             else:
                 self.set_current_node(self.current_node.children[case - 1])
                 if len(self.current_node.children) == 1:
-                    print("Moved forward a step in the proof.")
+                    logger.info("Moved forward a step in the proof.")
                 elif case == 1:
-                    print("Moved forward to the first case of this step in the proof.")
+                    logger.info(
+                        "Moved forward to the first case of this step in the proof."
+                    )
                 elif case == 2:
-                    print("Moved forward to the second case of this step in the proof.")
+                    logger.info(
+                        "Moved forward to the second case of this step in the proof."
+                    )
                 elif case == 3:
-                    print("Moved forward to the third case of this step in the proof.")
+                    logger.info(
+                        "Moved forward to the third case of this step in the proof."
+                    )
                 else:
-                    print("Moved forward to case {case} of this step in the proof.")
+                    logger.info(
+                        "Moved forward to case %s of this step in the proof.",
+                        case,
+                    )
         else:
             raise ValueError("Cannot move forward in assumption mode.")
 
@@ -394,11 +535,10 @@ class ProofAssistant:
             assert self.current_node is not None, "Current node is not initialized."
             if self.current_node.parent is not None:
                 self.set_current_node(self.current_node.parent)
-                print(f"Undid previous tactic ({self.current_node.tactic}).")
-                self.current_node.tactic = None  # clear the tactic
-                self.current_node.children = []  # clear the children
+                logger.info("Undid previous tactic (%s).", self.current_node.tactic)
+                self.current_node.clear_tactic()
             else:
-                print("No tactics to undo.")
+                logger.info("No tactics to undo.")
         else:
             raise ValueError("Cannot undo in assumption mode.")
 
@@ -408,9 +548,9 @@ class ProofAssistant:
         N = self.proof_tree.num_sorries()
         count = 1
         for node in self.proof_tree.list_sorries():
-            print(f"Goal {count} of {N}:")
+            logger.info("Goal %s of %s:", count, N)
             count += 1
-            print(node.proof_state)
+            logger.info("%s", node.proof_state)
 
     def __str__(self) -> str:
         if self.mode == "assumption":
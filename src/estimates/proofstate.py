@@ -1,25 +1,233 @@
 from __future__ import annotations
 
-from sympy import Basic
+from collections.abc import ItemsView, Iterable, Iterator, KeysView, Mapping, MutableMapping, ValuesView
+from collections.abc import Set as AbstractSet
+
+from sympy import Basic, Symbol
 
 from estimates.basic import Type, describe
+from estimates.persistent import PersistentMap
 from estimates.test import test
 
+HASH_MASK = 2**64 - 1   # Content hashes are computed modulo 2**64
+
 ## Proof states describe the current state of a proof (a list of hypotheses and a goal).  The hypotheses are a dictionary of string-Basic pairs that match a hypothesis name to the sympy basic class they represent.  The goals are stored as sympy basic classes.
 
 ## Goals should be predicate objects.  Hypotheses can be either predicates or variables.  In the latter case, the name of the hypothesis should match the name of the variable.
 
 
+def symbol_key(symbol: Basic) -> str:
+    """The key of a symbol in the occurrence index of the hypotheses.  Symbols with the same name share a key, which can only add hypotheses to the results of `Hypotheses.mentioning`."""
+    return symbol.name if isinstance(symbol, Symbol) else str(symbol)
+
+
+class Hypotheses(MutableMapping[str, Basic]):
+    """
+    A dictionary of hypotheses, where the key is the name of the hypothesis and the value is the sympy basic class it represents.  Behaves like a `dict` (including iterating in insertion order), with these differences:
+
+    * The hypotheses are stored in persistent maps (see `persistent.py`), so that `copy()` takes constant time and an update takes logarithmic time, with all copies sharing most of their structure.  This matters because every tactic copies the proof state, and the proof tree keeps all of these copies alive.
+    * It maintains a symbol table of the variables declared by `Type` hypotheses, which is updated incrementally whenever a hypothesis is added, replaced or removed.  This makes variable lookups independent of the number of hypotheses.
+    * It maintains a content hash, combining the hashes of all (name, hypothesis) pairs, which is also updated incrementally.  Two sets of hypotheses with different content hashes are unequal, so most equality checks take constant time.
+    * Once `mentioning()` has been called, it maintains an occurrence index, mapping (the name of) each free symbol to the hypotheses that mention it.  This is also stored in persistent maps, shared with all copies and updated incrementally, so that rewriting tactics need only visit the hypotheses mentioning the symbols they rewrite.
+    """
+
+    _by_name: PersistentMap[str, tuple[int, Basic]]   # Maps each name to its insertion number and hypothesis
+    _by_seq: PersistentMap[int, tuple[str, Basic]]    # Maps each insertion number to its name and hypothesis, to preserve the insertion order
+    _next: int                                        # The next insertion number to use
+    _names: dict[Basic, str]   # The symbol table, mapping each declared variable to the name of its declaration
+    _owns_names: bool          # Whether the symbol table is owned by this object, rather than shared with copies (it is copied on write)
+    _hash: int                 # The content hash: the sum (modulo 2**64) of the hashes of the (name, hypothesis) pairs
+    _occurrences: PersistentMap[str, PersistentMap[int, str]] | None  # The occurrence index, mapping the name of each free symbol to the insertion numbers and names of the hypotheses mentioning it (or None if it has not been built)
+
+    def __init__(self, hypotheses: Mapping[str, Basic] | None = None) -> None:
+        self._by_name = PersistentMap()
+        self._by_seq = PersistentMap()
+        self._next = 0
+        self._names = {}
+        self._owns_names = True
+        self._hash = 0
+        self._occurrences = None
+        if hypotheses is not None:
+            for name, hypothesis in hypotheses.items():
+                self[name] = hypothesis
+
+    def __getitem__(self, name: str) -> Basic:
+        return self._by_name[name][1]
+
+    def __setitem__(self, name: str, hypothesis: Basic) -> None:
+        entry = self._by_name.get(name)
+        if entry is None:
+            seq = self._next
+            self._next += 1
+        else:
+            seq = entry[0]
+            self._hash = (self._hash - hash((name, entry[1]))) & HASH_MASK
+            if self._occurrences is not None:
+                self._unindex(seq, entry[1])
+        self._hash = (self._hash + hash((name, hypothesis))) & HASH_MASK
+        self._by_name = self._by_name.set(name, (seq, hypothesis))
+        self._by_seq = self._by_seq.set(seq, (name, hypothesis))
+        if entry is not None:
+            self._forget(name, entry[1])
+        if self._occurrences is not None:
+            self._index(seq, name, hypothesis)
+        if isinstance(hypothesis, Type) and hypothesis.var() not in self._names:
+            self._own_names()
+            self._names[hypothesis.var()] = name
+
+    def __delitem__(self, name: str) -> None:
+        seq, hypothesis = self._by_name[name]
+        self._by_name = self._by_name.delete(name)
+        self._by_seq = self._by_seq.delete(seq)
+        self._forget(name, hypothesis)
+        self._hash = (self._hash - hash((name, hypothesis))) & HASH_MASK
+        if self._occurrences is not None:
+            self._unindex(seq, hypothesis)
+
+    def _own_names(self) -> None:
+        """Make a private copy of the symbol table, if it is shared, before modifying it."""
+        if not self._owns_names:
+            self._names = self._names.copy()
+            self._owns_names = True
+
+    def _forget(self, name: str, hypothesis: Basic) -> None:
+        """Remove a hypothesis (which has already been removed or replaced in the maps) from the symbol table, if it is the declaration recorded there.  The earliest remaining declaration of the same variable, if any, takes its place."""
+        if isinstance(hypothesis, Type) and self._names.get(hypothesis.var()) == name:
+            var = hypothesis.var()
+            self._own_names()
+            del self._names[var]
+            for other_name, other in self._by_seq.values():
+                if isinstance(other, Type) and other.var() == var:
+                    self._names[var] = other_name
+                    break
+
+    def _index(self, seq: int, name: str, hypothesis: Basic) -> None:
+        """Add a hypothesis to the occurrence index."""
+        for symbol in hypothesis.free_symbols:
+            key = symbol_key(symbol)
+            self._occurrences = self._occurrences.set(key, self._occurrences.get(key, PersistentMap()).set(seq, name))
+
+    def _unindex(self, seq: int, hypothesis: Basic) -> None:
+        """Remove a hypothesis from the occurrence index."""
+        for symbol in hypothesis.free_symbols:
+            key = symbol_key(symbol)
+            names = self._occurrences.get(key)
+            if names is not None and seq in names:
+                names = names.delete(seq)
+                self._occurrences = self._occurrences.set(key, names) if len(names) > 0 else self._occurrences.delete(key)
+
+    def mentioning(self, symbols: Iterable[Basic]) -> list[str]:
+        """
+        Return the names of the hypotheses (in insertion order) that mention all of the given symbols, and possibly some others mentioning symbols of the same names.  The first call builds the occurrence index, which takes time linear in the size of the hypotheses; later calls take time proportional to the number of hypotheses mentioning the rarest of the symbols.
+        """
+        if self._occurrences is None:
+            self._occurrences = PersistentMap()
+            for seq, (name, hypothesis) in self._by_seq.items():
+                self._index(seq, name, hypothesis)
+        entries = [self._occurrences.get(symbol_key(symbol), PersistentMap()) for symbol in symbols]
+        if not entries:
+            return list(self)
+        entries.sort(key=len)
+        return [name for seq, name in entries[0].items() if all(seq in other for other in entries[1:])]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._by_name
+
+    def __iter__(self) -> Iterator[str]:
+        for name, _ in self._by_seq.values():
+            yield name
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def content_hash(self) -> int:
+        """Return a hash of the hypotheses, which takes constant time as it is maintained incrementally.  Equal hypotheses have equal hashes."""
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Hypotheses):
+            if other._hash != self._hash:
+                return False
+            if other._by_name is self._by_name:
+                return True  # structurally shared, hence equal
+        if not isinstance(other, Mapping) or len(self) != len(other):
+            return False
+        return dict(self.items()) == dict(other.items())
+
+    def keys(self) -> KeysView[str]:
+        return _HypothesesKeys(self)
+
+    def values(self) -> ValuesView[Basic]:
+        return _HypothesesValues(self)
+
+    def items(self) -> ItemsView[str, Basic]:
+        return _HypothesesItems(self)
+
+    def copy(self) -> Hypotheses:
+        """Create a copy of the hypotheses.  This takes constant time, as the copy shares its structure with the original."""
+        new = Hypotheses.__new__(Hypotheses)
+        new._by_name = self._by_name
+        new._by_seq = self._by_seq
+        new._next = self._next
+        new._names = self._names
+        new._owns_names = False
+        new._hash = self._hash
+        new._occurrences = self._occurrences
+        self._owns_names = False
+        return new
+
+    def vars(self) -> AbstractSet[Basic]:
+        """Return a read-only view of the set of declared variables."""
+        return self._names.keys()
+
+    def var_name(self, var: Basic) -> str | None:
+        """Return the name of the declaration of a variable, or None if it has not been declared."""
+        return self._names.get(var)
+
+    def __reduce__(self) -> tuple[type[Hypotheses], tuple[dict[str, Basic]]]:
+        # Pickle the hypotheses by their contents, so that the content hash is recomputed when unpickling (hashes of strings differ between processes).
+        return (Hypotheses, (dict(self.items()),))
+
+    def __repr__(self) -> str:
+        return f"Hypotheses({dict(self.items())!r})"
+
+
+class _HypothesesKeys(KeysView[str]):
+    _mapping: Hypotheses
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._mapping)
+
+
+class _HypothesesValues(ValuesView[Basic]):
+    _mapping: Hypotheses
+
+    def __iter__(self) -> Iterator[Basic]:
+        for _, hypothesis in self._mapping._by_seq.values():
+            yield hypothesis
+
+
+class _HypothesesItems(ItemsView[str, Basic]):
+    _mapping: Hypotheses
+
+    def __iter__(self) -> Iterator[tuple[str, Basic]]:
+        return self._mapping._by_seq.values()
+
+
 class ProofState:
     goal: Basic                    # The goal of the proof state
-    hypotheses: dict[str, Basic]   # A dictionary of hypotheses, where the key is the name of the hypothesis and the value is the sympy basic class it represents
+    hypotheses: Hypotheses         # A dictionary of hypotheses, where the key is the name of the hypothesis and the value is the sympy basic class it represents
+    asymptotic_forms: dict[Basic, list[Basic] | None]  # A memo table of the asymptotic forms of statements (see `log_linarith.asymptotic_forms`), shared with all copies of this proof state
+    assumption_cache: dict[tuple[Basic, str], bool | None]  # A memo table of sympy assumption queries (see `assumptions.ask`), shared with all copies of this proof state
 
-    def __init__(self, goal: Basic, hypotheses: dict[str, Basic] | None = None) -> None:
+    def __init__(self, goal: Basic, hypotheses: Mapping[str, Basic] | None = None) -> None:
         """
         Initialize a proof state with a goal, and an optional list of hypotheses.
         """
         self.goal = goal
-        self.hypotheses = hypotheses if hypotheses is not None else {}
+        self.hypotheses = hypotheses if isinstance(hypotheses, Hypotheses) else Hypotheses(hypotheses)
+        self.asymptotic_forms = {}
+        self.assumption_cache = {}
 
     def set_goal(self, goal: Basic) -> None:
         """Set the goal of the proof state."""
@@ -27,14 +235,35 @@ class ProofState:
 
     def copy(self) -> ProofState:
         """
-        Create a copy of the proof state.
+        Create a copy of the proof state.  This takes constant time, as the hypotheses of the copy share their structure with the original.
+        """
+        new_state = ProofState(self.goal, self.hypotheses.copy())
+        new_state.asymptotic_forms = self.asymptotic_forms
+        new_state.assumption_cache = self.assumption_cache
+        return new_state
+
+    def __getstate__(self) -> dict[str, Basic | Hypotheses]:
+        # The memo tables are not pickled (e.g. when sending a proof state to another process), as they may be large; they start out empty in the copy.
+        return {"goal": self.goal, "hypotheses": self.hypotheses}
+
+    def __setstate__(self, state: dict[str, Basic | Hypotheses]) -> None:
+        self.goal = state["goal"]
+        self.hypotheses = state["hypotheses"]
+        self.asymptotic_forms = {}
+        self.assumption_cache = {}
+
+    def content_hash(self) -> int:
         """
-        return ProofState(self.goal, self.hypotheses.copy())
+        Return a hash of the goal and hypotheses of the proof state, which takes constant time.  Equal proof states have equal hashes, so this can be used to detect duplicate proof states.
+        """
+        return hash((self.goal, self.hypotheses.content_hash()))
 
     def eq(self, other: ProofState) -> bool:
         """
-        Check if two proof states are equal.
+        Check if two proof states are equal.  The content hashes are compared first, so a full comparison is only needed if the hashes agree.
         """
+        if self.content_hash() != other.content_hash():
+            return False
         return self.goal == other.goal and self.hypotheses == other.hypotheses
 
     def new(self, name: str) -> str:
@@ -78,18 +307,14 @@ class ProofState:
 
     def get_var_name(self, var: Basic) -> str:
         """Get the name of a variable from the proof state."""
-        for name, obj in self.hypotheses.items():
-            if isinstance(obj, Type) and obj.var() == var:
-                return name
-        raise ValueError(f"Variable {var} not found in proof state.")
-
-    def get_all_vars(self) -> set[Basic]:
-        """Get all variables from the proof state."""
-        vars = set()
-        for obj in self.hypotheses.values():
-            if isinstance(obj, Type):
-                vars.add(obj.var())
-        return vars
+        name = self.hypotheses.var_name(var)
+        if name is None:
+            raise ValueError(f"Variable {var} not found in proof state.")
+        return name
+
+    def get_all_vars(self) -> AbstractSet[Basic]:
+        """Get all variables from the proof state, as a read-only set."""
+        return self.hypotheses.vars()
 
     def rename_hypothesis(self, old_name: str, new_name: str) -> str:
         """Rename a hypothesis in the proof state."""
@@ -1,45 +1,252 @@
 from __future__ import annotations
 
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+
+from estimates.output import output_mode
+from estimates.profiling import Profiler, active_profiler, span, state_size
 from estimates.proofstate import ProofState
 from estimates.tactic import Tactic
 
 # Support for proof trees and tactics, mimicking a Lean-type tactic proof environment.
 
 
+class StateBudget:
+    """
+    A bound on the number of proof states held in memory by the interior (non-sorry) nodes of a proof tree, shared by all the nodes of the tree.
+    The interior nodes whose states are held are kept in least-recently-used order; when there are more of them than the budget allows, the least recently used ones drop their states.  A dropped state is recomputed when next needed, by replaying the stored tactics from the nearest ancestor that still holds its state.
+    The root of the tree and the sorries always hold their states, and do not count against the budget.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size < 0:
+            raise ValueError(f"State budget {size} must be non-negative.")
+        self.size = size
+        self.nodes: OrderedDict[ProofTree, None] = OrderedDict()  # the interior nodes holding their states, least recently used first
+
+    def touch(self, node: ProofTree) -> None:
+        """Record that the state of an interior node has been used, evicting other states if the budget is exceeded."""
+        self.nodes[node] = None
+        self.nodes.move_to_end(node)
+        while len(self.nodes) > self.size:
+            evicted, _ = self.nodes.popitem(last=False)
+            evicted._proof_state = None
+
+    def discard(self, node: ProofTree) -> None:
+        """Stop tracking a node (because it has become a sorry, or has been removed from the tree)."""
+        self.nodes.pop(node, None)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
 class ProofTree:
     """
     A proof tree node representing a proof state and its children.
     Each node has a proof state, a parent node, a tactic used to transform the proof state, and a list of child nodes.
+    Interior nodes may drop their proof states if the tree has been given a state budget; these are then recomputed when needed.
+    Each node also records the number of sorries in its subtree.  These counts are updated whenever a tactic is used or cleared, and turn the tree into an order-statistics tree of its sorries: the n-th sorry, or the position of a node among the sorries, can be found by following a single path of the tree, rather than by walking the whole tree.
     """
 
     def __init__(self, proof_state: ProofState) -> None:
         """
         Initialize a proof tree node with a proof state.
         """
-        self.proof_state = proof_state
+        self._proof_state = proof_state  # None if the state has been evicted
         self.parent = None  # parents are managed automatically by the add_sorry method
         self.tactic = (
             None  # Proof trees are initialized as a "sorry", so the tactic is None
         )
         self.children = []  # Must be empty if self.tactic is None; can also be empty if self.tactic completes the goal
+        self.sorry_count = 1  # The number of sorries in the subtree rooted at this node
+        self.budget = None  # The state budget shared by the nodes of the tree, if any
+        self.profile = None  # The time and counters recorded when the tactic was used, if it was used while profiling
+
+    @property
+    def proof_state(self) -> ProofState:
+        """The proof state at this node, recomputed if it has been evicted."""
+        proof_state = self._proof_state
+        if proof_state is None:
+            proof_state = self._recompute_state()
+        if self.budget is not None and self.tactic is not None and self.parent is not None:
+            self.budget.touch(self)
+        return proof_state
+
+    def _recompute_state(self) -> ProofState:
+        """Recompute an evicted proof state by replaying the tactics from the nearest ancestor that holds its state."""
+        path = []
+        node = self
+        while node._proof_state is None:
+            path.append(node)
+            node = node.parent
+        proof_state = node._proof_state
+        with output_mode("silent"):  # the tactics were already reported when first used
+            for child in reversed(path):
+                parent = child.parent
+                with span("replay " + str(parent.tactic), "replay"):
+                    proof_state_list = parent.tactic.activate(proof_state)
+                if len(proof_state_list) != len(parent.children):
+                    raise RuntimeError(
+                        f"Replaying {parent.tactic} produced {len(proof_state_list)} goals instead of {len(parent.children)}."
+                    )
+                proof_state = proof_state_list[parent.children.index(child)]
+                child._proof_state = proof_state
+                if self.budget is not None and child is not self:
+                    self.budget.touch(child)
+        return proof_state
+
+    def iter_nodes(self) -> Iterator[ProofTree]:
+        """Generate the nodes of the proof tree in order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def to_steps(self) -> list[tuple[Tactic | None, int]]:
+        """Return the tactics of the proof tree in depth-first order, each with the number of children of its node (None and 0 for sorries).  Together these determine the shape of the tree."""
+        return [(node.tactic, len(node.children)) for node in self.iter_nodes()]
+
+    def replay(self, steps: list[tuple[Tactic | None, int]]) -> None:
+        """Rebuild a proof tree below this (sorry) node, by using the tactics listed by `to_steps` in order."""
+        stack = [self]
+        for tactic, num_children in steps:
+            if not stack:
+                raise ValueError("Saved proof has more steps than the proof tree.")
+            node = stack.pop()
+            if tactic is None:
+                continue
+            if not node.use_tactic(tactic) or len(node.children) != num_children:
+                raise ValueError(f"Replaying {tactic} did not reproduce the saved proof.")
+            stack.extend(reversed(node.children))
+
+    def set_budget(self, budget: StateBudget | None) -> None:
+        """Share a state budget among all the nodes of the proof tree (or remove it, if budget is None)."""
+        for node in self.iter_nodes():
+            if node.budget is not None:
+                node.budget.discard(node)
+            node.budget = budget
+            if budget is not None and node.tactic is not None and node.parent is not None and node._proof_state is not None:
+                budget.touch(node)
+
+    def collapse(self) -> None:
+        """
+        Drop the proof states of all the nodes below this one.  Intended for closed subtrees (those without sorries), which are only needed to render the proof; the tactics are retained, so the states can still be recomputed if required.
+        """
+        for node in self.iter_nodes():
+            if node is self or node.tactic is None:
+                continue  # sorries always hold their states
+            if node.budget is not None:
+                node.budget.discard(node)
+            node._proof_state = None
+
+    def _adjust_sorry_count(self, delta: int) -> None:
+        """Add delta to the sorry counts of this node and all of its ancestors."""
+        node = self
+        while node is not None:
+            node.sorry_count += delta
+            node = node.parent
 
     def add_sorry(self, proof_state: ProofState) -> ProofTree:
         """Add a child proof tree node as a 'sorry'."""
         child = ProofTree(proof_state)
         child.parent = self
+        child.budget = self.budget
         self.children.append(child)
+        self._adjust_sorry_count(1)
         return child
 
     def use_tactic(self, tactic: Tactic) -> bool:
-        """Apply a tactic to the proof state and create child nodes for each resulting proof state."""
-        proof_state_list = tactic.activate(self.proof_state)
-        if len(proof_state_list) == 1 and proof_state_list[0].eq(self.proof_state):
+        """Apply a tactic to the proof state and create child nodes for each resulting proof state.  Any tactic previously used at this node is replaced."""
+        proof_state = self.proof_state
+        profiler = active_profiler()
+        if profiler is None:
+            proof_state_list = tactic.activate(proof_state)
+        else:
+            proof_state_list, profile = self._profiled_activate(tactic, proof_state, profiler)
+        if len(proof_state_list) == 1 and proof_state_list[0].eq(proof_state):
             return False  # This tactic did nothing, so don't add a child node
-        self.tactic = tactic
-        for proof_state in proof_state_list:
-            self.add_sorry(proof_state)
+        self.splice(tactic, proof_state_list)
+        if profiler is not None:
+            self.profile = profile
         return True
 
+    def splice(self, tactic: Tactic, proof_state_list: list[ProofState]) -> list[ProofTree]:
+        """Record that a tactic (already activated elsewhere) transformed the proof state at this node into the given proof states, replacing any tactic previously used here.  Returns the new child nodes."""
+        self.clear_tactic()
+        self.tactic = tactic
+        self._adjust_sorry_count(-1)  # this node is no longer a sorry
+        if self.budget is not None and self.parent is not None:
+            self.budget.touch(self)
+        return [self.add_sorry(proof_state) for proof_state in proof_state_list]
+
+    def _profiled_activate(
+        self, tactic: Tactic, proof_state: ProofState, profiler: Profiler
+    ) -> tuple[list[ProofState], dict]:
+        """Activate a tactic, recording its time, the changes in the profiler's counters, and the size of the largest resulting proof state."""
+        counters = dict(profiler.counters)
+        with profiler.span(str(tactic), "tactic", tactic=type(tactic).__name__) as args:
+            start = time.perf_counter()
+            proof_state_list = tactic.activate(proof_state)
+            seconds = time.perf_counter() - start
+            profile = {
+                "seconds": seconds,
+                "counters": {
+                    name: n - counters.get(name, 0)
+                    for name, n in profiler.counters.items()
+                    if n != counters.get(name, 0)
+                },
+                "goals": len(proof_state_list),
+                "peak_state_size": max(
+                    (state_size(state) for state in proof_state_list), default=0
+                ),
+            }
+            args.update(profile)
+        return proof_state_list, profile
+
+    def clear_tactic(self) -> None:
+        """Remove the tactic used at this node (and all the nodes below it), turning the node back into a sorry."""
+        if self.tactic is None:
+            return
+        self._proof_state = self.proof_state  # sorries always hold their states
+        if self.budget is not None:
+            for node in self.iter_nodes():
+                self.budget.discard(node)
+        self._adjust_sorry_count(1 - self.sorry_count)
+        self.tactic = None
+        self.profile = None
+        self.children = []
+
+    def iter_lines(
+        self,
+        indent: str = "  ",
+        next_indent: str = "  ",
+        current_node: ProofTree | None = None,
+    ) -> Iterator[str]:
+        """
+        Generate the lines of a string representation of the proof tree, with indentation for each level.
+        Highlight the node if it is the current node.
+        The tree is traversed with an explicit stack rather than by recursion, so that arbitrarily deep trees can be rendered, one line at a time.
+        """
+        stack = [(self, indent, next_indent)]
+        while stack:
+            node, indent, next_indent = stack.pop()
+            if node.tactic is None:
+                label = "sorry"
+            else:
+                label = str(node.tactic)
+            if node is current_node:
+                yield indent + "**" + label + "**"
+            else:
+                yield indent + label
+            children = node.children
+            if len(children) > 0:
+                # Push the children in reverse order, so that they are popped in order.
+                stack.append((children[-1], next_indent, next_indent))
+                for child in reversed(children[:-1]):
+                    stack.append((child, next_indent + ". ", next_indent + "  "))
+
     def rstr(
         self,
         indent: str = "  ",
@@ -50,140 +257,102 @@ class ProofTree:
         Return a string representation of the proof tree, with indentation for each level.
         Highlight the node if it is the current node.
         """
-        if self.tactic == None:
-            if self == current_node:
-                return [indent + "**sorry**"]
-            else:
-                return [indent + "sorry"]
-        if self == current_node:
-            output = [indent + "**" + str(self.tactic) + "**"]
-        else:
-            output = [indent + str(self.tactic)]
-        if len(self.children) == 0:
-            return output
-        else:
-            for n in range(len(self.children)):
-                if n < len(self.children) - 1:
-                    output.extend(
-                        self.children[n].rstr(
-                            next_indent + ". ", next_indent + "  ", current_node
-                        )
-                    )
-                else:
-                    output.extend(
-                        self.children[n].rstr(next_indent, next_indent, current_node)
-                    )
-            return output
+        return list(self.iter_lines(indent, next_indent, current_node))
 
     def rstr_join(self, current_node: ProofTree | None = None) -> str:
         """Return a string representation of the proof tree, with indentation for each level."""
-        return "\n".join(self.rstr(current_node=current_node))
+        return "\n".join(self.iter_lines(current_node=current_node))
 
-    def list_sorries(self, exclude: list[ProofTree] | None = None) -> list[ProofTree]:
-        """Return a list of sorry nodes in the proof tree, optionally excluding a given node."""
+    def iter_sorries(self, exclude: list[ProofTree] | None = None) -> Iterator[ProofTree]:
+        """Generate the sorry nodes in the proof tree in order, optionally excluding given nodes (and the nodes below them)."""
         if exclude is None:
             exclude = []
-        if self in exclude:
-            return []
-        elif self.tactic is None:
-            return [self]
-        else:
-            sorries = []
-            for child in self.children:
-                sorries.extend(child.list_sorries(exclude))
-            return sorries
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.sorry_count == 0 or node in exclude:
+                continue  # no sorries to find here
+            if node.tactic is None:
+                yield node
+            else:
+                stack.extend(reversed(node.children))
+
+    def list_sorries(self, exclude: list[ProofTree] | None = None) -> list[ProofTree]:
+        """Return a list of sorry nodes in the proof tree, optionally excluding a given node."""
+        return list(self.iter_sorries(exclude))
 
     def num_sorries(self, exclude: list[ProofTree] | None = None) -> int:
         """Return the number of sorries in the proof tree, optionally excluding a given node."""
-        if exclude is None:
-            exclude = []
+        if not exclude:
+            return self.sorry_count
         return len(self.list_sorries(exclude))
 
     def is_sorry_free(self) -> bool:
         """Return True if the proof tree is free of sorries."""
-        return self.num_sorries() == 0
+        return self.sorry_count == 0
+
+    def nth_sorry(self, n: int) -> ProofTree | None:
+        """Return the sorry node in position n (counting from 0) of the proof tree, or None if there are not that many sorries."""
+        if n < 0 or n >= self.sorry_count:
+            return None
+        node = self
+        while node.tactic is not None:
+            for child in node.children:
+                if n < child.sorry_count:
+                    node = child
+                    break
+                n -= child.sorry_count
+        return node
+
+    def sorry_rank(self, target: ProofTree) -> int | None:
+        """Return the number of sorries of the proof tree that come before the subtree rooted at the target, or None if the target is not in the tree."""
+        rank = 0
+        node = target
+        while node is not self:
+            parent = node.parent
+            if parent is None:
+                return None
+            for sibling in parent.children:
+                if sibling is node:
+                    break
+                rank += sibling.sorry_count
+            node = parent
+        return rank
 
     def first_sorry(self) -> ProofTree | None:
         """Return the first sorry node in the proof tree."""
-        sorries = self.list_sorries()
-        if len(sorries) == 0:
-            return None
-        else:
-            return sorries[0]
+        return self.nth_sorry(0)
 
     def last_sorry(self) -> ProofTree | None:
         """Return the last sorry node in the proof tree."""
-        sorries = self.list_sorries()
-        if len(sorries) == 0:
-            return None
-        else:
-            return sorries[len(sorries) - 1]
+        return self.nth_sorry(self.sorry_count - 1)
 
     def find_sorry(
         self, target: ProofTree
     ) -> tuple[bool, ProofTree | None, ProofTree | None]:
         """
-        Recursively find the last sorry before a target and the first sorry after a target.
+        Find the last sorry before a target and the first sorry after a target (or inside it, if the target is not a sorry).
         Also returns whether the target was found in the tree.
         """
-        if self == target:
-            for child in self.children:
-                _, _, first = child.find_sorry(target)
-                if first is not None:
-                    return True, None, first
-            return True, None, None
-        if self.tactic is None:
-            return False, self, self
-        before = None
-        after = None
-        found_target = False
-        for child in self.children:
-            found, last_before, first_after = child.find_sorry(target)
-            if found:
-                found_target = True
-                if last_before is not None:
-                    before = last_before
-                after = first_after
-            else:
-                if found_target:
-                    if after is None:
-                        after = first_after
-                else:
-                    before = last_before
-        return (found_target, before, after)
+        rank = self.sorry_rank(target)
+        if rank is None:
+            return False, None, None
+        before = self.nth_sorry(rank - 1)
+        after = self.nth_sorry(rank + 1 if target.tactic is None else rank)
+        return True, before, after
 
     def count_sorries(self, target: ProofTree) -> tuple[bool, int, int]:
         """
-        Recursively count the number of sorries before and after a target in the proof tree.
+        Count the number of sorries before and after a target in the proof tree (sorries below the target count as being before it).
         Also returns whether the target was found in the tree.
         """
-        if self == target:
-            before = 0
-            after = 0
-            for child in self.children:
-                found, before_count, after_count = child.count_sorries(target)
-                if found:
-                    after += after_count
-                else:
-                    before += before_count
-            return True, before, after
-        if self.tactic is None:
-            return False, 1, 1
-        before = 0
-        after = 0
-        found_target = False
-        for child in self.children:
-            found, before_count, after_count = child.count_sorries(target)
-            if found:
-                found_target = True
-                before += before_count
-                after += after_count
-            else:
-                if found_target:
-                    after += after_count
-                else:
-                    before += before_count
-        return (found_target, before, after)
+        rank = self.sorry_rank(target)
+        if rank is None:
+            return False, self.sorry_count, 0
+        if target.tactic is None:
+            return True, rank, self.sorry_count - rank - 1
+        before = rank + target.sorry_count
+        return True, before, self.sorry_count - before
 
     def __str__(self) -> str:
         return self.rstr_join()
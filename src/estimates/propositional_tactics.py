@@ -5,6 +5,7 @@ from sympy import (
     Basic,
     Eq,
     GreaterThan,
+    Implies,
     LessThan,
     Max,
     Min,
@@ -13,17 +14,25 @@ from sympy import (
     StrictGreaterThan,
     StrictLessThan,
     false,
+    preorder_traversal,
     simplify_logic,
+    true,
 )
-from sympy.core.relational import Rel
-from sympy.logic.boolalg import Boolean
+from sympy.core.relational import Rel, Relational
+from sympy.logic.boolalg import Boolean, BooleanAtom, BooleanFunction
 
-from estimates.basic import describe, is_defined
+from estimates.basic import Type, describe, is_defined
+from estimates.linarith import Linarith
 from estimates.littlewood_paley import LittlewoodPaley
 from estimates.order_of_magnitude import OrderMax, OrderMin
+from estimates.output import Lazy, get_logger, output_mode
+from estimates.profiling import count
 from estimates.proofstate import ProofState
+from estimates.sat import CNF, SatSolver
 from estimates.tactic import Tactic
 
+logger = get_logger(__name__)
+
 # Various tactics for handling propositional logic.
 
 
@@ -123,9 +132,7 @@ class SplitGoal(Tactic):
     def activate(self, state: ProofState) -> list[ProofState]:
         conjuncts = get_conjuncts(state.goal)
         if conjuncts is not None:
-            print(
-                f"Split goal into {', '.join([str(conjunct) for conjunct in conjuncts])}"
-            )
+            logger.info("Split goal into %s", Lazy(lambda: ", ".join(map(str, conjuncts))))
             new_goals = []
             for conjunct in conjuncts:
                 newstate = state.copy()
@@ -133,7 +140,7 @@ class SplitGoal(Tactic):
                 new_goals.append(newstate)
             return new_goals
         else:
-            print(f"{state.goal!s} cannot be split.")
+            logger.info("%s cannot be split.", state.goal)
             return [state.copy()]
 
     def __str__(self) -> str:
@@ -144,38 +151,80 @@ class SplitGoal(Tactic):
     arguments = []
 
 
+# The largest number of atoms in a statement for which `Contrapose(minimize=True)` will minimize its negation (the cost of minimization is exponential in the number of atoms).
+MAX_MINIMIZE_ATOMS = 8
+
+
+def negate(expr: Basic) -> Basic:
+    """
+    The negation of a statement, in negation normal form: the negation is pushed inwards through conjunctions, disjunctions and implications by De Morgan's laws, double negations are removed, and negated relations are flipped (e.g. the negation of x < y is x >= y).  This takes time linear in the size of the statement.
+    """
+    if expr == true:
+        return false
+    if expr == false:
+        return true
+    if isinstance(expr, Not):
+        return expr.args[0]
+    if isinstance(expr, And):
+        return Or(*[negate(arg) for arg in expr.args])
+    if isinstance(expr, Or):
+        return And(*[negate(arg) for arg in expr.args])
+    if isinstance(expr, Implies):
+        return And(expr.args[0], negate(expr.args[1]))
+    if isinstance(expr, Relational):
+        return expr.negated
+    return Not(expr)
+
+
+def propositional_atoms(expr: Basic) -> set[Basic]:
+    """The statements (such as propositions and relations) from which a statement is built by Boolean connectives."""
+    return {
+        node
+        for node in preorder_traversal(expr)
+        if isinstance(node, Boolean) and not isinstance(node, BooleanFunction | BooleanAtom)
+    }
+
+
+def negation(expr: Basic, minimize: bool = False) -> Basic:
+    """The negation of a statement, in negation normal form, or (if `minimize` is True and the statement has at most `MAX_MINIMIZE_ATOMS` atoms) in a minimal form found by `simplify_logic`."""
+    if minimize and len(propositional_atoms(expr)) <= MAX_MINIMIZE_ATOMS:
+        return simplify_logic(Not(expr), force=True)
+    return negate(expr)
+
+
 class Contrapose(Tactic):
     """
-    Contrapose the goal and a hypothesis.  If the hypothesis is a proposition, replace the goal with the negation of the hypothesis, and the hypothesis with the negation of the goal.  If the hypothesis is not a proposition, this becomes a proof by contradiction, adding the negation of the goal as a hypothesis, and "false" as the goal."""
+    Contrapose the goal and a hypothesis.  If the hypothesis is a proposition, replace the goal with the negation of the hypothesis, and the hypothesis with the negation of the goal.  If the hypothesis is not a proposition, this becomes a proof by contradiction, adding the negation of the goal as a hypothesis, and "false" as the goal.
+    The negations are put in negation normal form (see `negate`); with `minimize=True`, small negations are instead minimized by sympy's `simplify_logic`."""
 
-    def __init__(self, h: str = "this") -> None:
+    def __init__(self, h: str = "this", minimize: bool = False) -> None:
         """
         :param h: The name of the hypothesis to use for contraposition.
+        :param minimize: If true, minimize the negations (when they involve at most `MAX_MINIMIZE_ATOMS` atoms).
         """
         self.h = h
+        self.minimize = minimize
 
     def activate(self, state: ProofState) -> list[ProofState]:
         if self.h in state.hypotheses:
             hyp = state.hypotheses[self.h]
             if not isinstance(hyp, Boolean):
                 raise ValueError(f"{describe(self.h, hyp)} is not a proposition.")
-            print(f"Contraposing {describe(self.h, hyp)} with {state.goal}.")
+            logger.info("Contraposing %s: %s with %s.", self.h, hyp, state.goal)
             newstate = state.copy()
-            newstate.set_goal(simplify_logic(Not(hyp), force=True))
-            newstate.hypotheses[self.h] = simplify_logic(Not(state.goal), force=True)
+            newstate.set_goal(negation(hyp, self.minimize))
+            newstate.hypotheses[self.h] = negation(state.goal, self.minimize)
             return [newstate]
         else:
-            print(f"Proving {state.goal} by contradiction.")
+            logger.info("Proving %s by contradiction.", state.goal)
             newstate = state.copy()
             newstate.set_goal(false)
-            newstate.hypotheses[self.h] = simplify_logic(Not(state.goal), force=True)
+            newstate.hypotheses[self.h] = negation(state.goal, self.minimize)
             return [newstate]
 
     def __str__(self) -> str:
-        if self.h == "this":
-            return "contrapose"
-        else:
-            return "contrapose " + self.h
+        name = "contrapose" if self.h == "this" else "contrapose " + self.h
+        return name + " (minimized)" if self.minimize else name
     
     label = "Contrapositive"
     description = 'If the hypothesis is a proposition, replace the goal with the negation of the hypothesis, and the hypothesis with the negation of the goal.  Otherwise, this becomes a proof by contradiction, adding the negation of the goal as a hypothesis, and "false" as the goal.'
@@ -199,8 +248,11 @@ class SplitHyp(Tactic):
             hyp = state.hypotheses[self.h]
             conjuncts = get_conjuncts(hyp)
             if conjuncts is not None:
-                print(
-                    f"Splitting {describe(self.h, hyp)} into {', '.join([str(conjunct) for conjunct in conjuncts])}."
+                logger.info(
+                    "Splitting %s: %s into %s.",
+                    self.h,
+                    hyp,
+                    Lazy(lambda: ", ".join(map(str, conjuncts))),
                 )
                 new_state = state.copy()
                 new_state.remove_hypothesis(self.h)
@@ -209,10 +261,10 @@ class SplitHyp(Tactic):
                     new_state.new_hypothesis(name, conjunct)
                 return [new_state]
             else:
-                print(f"Cannot split {describe(self.h, hyp)}.")
+                logger.info("Cannot split %s: %s.", self.h, hyp)
                 return [state.copy()]
         else:
-            print(f"Cannot find hypothesis {self.h}.")
+            logger.info("Cannot find hypothesis %s.", self.h)
             return [state.copy()]
 
     def __str__(self) -> str:
@@ -241,10 +293,13 @@ class Cases(Tactic):
             hyp = state.hypotheses[self.h]
             disjuncts = get_disjuncts(hyp)
             if disjuncts == None:
-                print(f"Unable to split {hyp} into cases.")
+                logger.info("Unable to split %s into cases.", hyp)
                 return [state.copy()]
-            print(
-                f"Splitting {describe(self.h, hyp)} into cases {', '.join([str(disjunct) for disjunct in disjuncts])}."
+            logger.info(
+                "Splitting %s: %s into cases %s.",
+                self.h,
+                hyp,
+                Lazy(lambda: ", ".join(map(str, disjuncts))),
             )
             new_goals = []
             for disjunct in disjuncts:
@@ -253,7 +308,7 @@ class Cases(Tactic):
                 new_goals.append(new_state)
             return new_goals
         else:
-            print(f"Cannot find hypothesis {self.h}.")
+            logger.info("Cannot find hypothesis %s.", self.h)
             return [state.copy()]
 
     def __str__(self) -> str:
@@ -283,8 +338,12 @@ class ByCases(Tactic):
         new_state = state.copy()
         new_state.hypotheses[name] = Not(self.statement)
         new_states.append(new_state)
-        print(
-            f"Splitting into cases {describe(name, self.statement)} and {describe(name, Not(self.statement))}."
+        logger.info(
+            "Splitting into cases %s: %s and %s: %s.",
+            name,
+            self.statement,
+            name,
+            Lazy(Not, self.statement),
         )
         return new_states
 
@@ -313,8 +372,11 @@ class Option(Tactic):
             raise ValueError(f"Goal {state.goal} did not split into a disjunction.")
         if self.n > len(disjuncts):
             raise ValueError(f"Goal {state.goal} only had {len(disjuncts)} disjuncts.")
-        print(
-            f"Replacing goal {state.goal} with option {self.n}: {disjuncts[self.n - 1]}."
+        logger.info(
+            "Replacing goal %s with option %s: %s.",
+            state.goal,
+            self.n,
+            disjuncts[self.n - 1],
         )
         new_state = state.copy()
         new_state.set_goal(disjuncts[self.n - 1])
@@ -351,17 +413,17 @@ class Claim(Tactic):
 
         if first_state.test(first_state.goal, verbose=False):
             if second_state.test(second_state.goal, verbose=False):
-                print(f"Goal follows trivially after observing {self.expr}.")
+                logger.info("Goal follows trivially after observing %s.", self.expr)
                 return []
             else:
-                print(f"Observe that {self.expr} holds.")
+                logger.info("Observe that %s holds.", self.expr)
                 return [second_state]
         else:
             if second_state.test(second_state.goal, verbose=False):
-                print(f"Clearly, it suffices to show {self.expr}.")
+                logger.info("Clearly, it suffices to show %s.", self.expr)
                 return [first_state]
             else:
-                print(f"We claim that {self.expr}.")
+                logger.info("We claim that %s.", self.expr)
                 return [first_state, second_state]
 
     def __str__(self) -> str:
@@ -373,3 +435,60 @@ class Claim(Tactic):
     label = "Claim"
     description = "Similar to the `have` tactic in Lean.  Add a subgoal to prove, and then prove the original goal assuming the subgoal."
     arguments = ["expressions"]
+
+
+class Tauto(Tactic):
+    """
+    Prove the goal if it follows from the hypotheses by propositional reasoning, treating relations such as x < y (and any other statements that are not Boolean combinations) as atoms.  The hypotheses and the negation of the goal are encoded in conjunctive normal form and handed to a SAT solver; if they cannot all hold, the goal is proved, and otherwise a satisfying assignment of the atoms is reported as a counterexample.
+    If `arithmetic` is True, each satisfying assignment is also checked for consistency by linear arithmetic (as in `Linarith`), and if the relations it makes true (or false) are inconsistent, it is ruled out and the search continues.  This proves goals that follow by propositional reasoning together with linear arithmetic, without splitting into cases by hand.
+    """
+
+    def __init__(self, arithmetic: bool = True) -> None:
+        """
+        :param arithmetic: If true, use linear arithmetic to rule out assignments of the relations that are inconsistent.
+        """
+        self.arithmetic = arithmetic
+
+    def activate(self, state: ProofState) -> list[ProofState]:
+        cnf = CNF()
+        for hypothesis in state.hypotheses.values():
+            if isinstance(hypothesis, Boolean) and not isinstance(hypothesis, Type):
+                cnf.add(hypothesis)
+        cnf.add(Not(state.goal))
+        solver = SatSolver(cnf)
+        declarations = {name: hyp for name, hyp in state.hypotheses.items() if isinstance(hyp, Type)}
+        arithmetic_used = False
+        while True:
+            assignment = solver.model()
+            if assignment is None:
+                if arithmetic_used:
+                    logger.info("Goal solved by propositional reasoning and linear arithmetic!")
+                else:
+                    logger.info("Goal solved by propositional reasoning!")
+                return []
+            relations = {atom: value for atom, value in assignment.items() if isinstance(atom, Relational)}
+            if self.arithmetic and relations and self._inconsistent(declarations, relations):
+                solver.block(relations)
+                arithmetic_used = True
+                continue
+            logger.info("Unable to prove goal; the hypotheses and the negation of the goal all hold when:")
+            for literal in sorted((atom if value else Not(atom) for atom, value in assignment.items()), key=str):
+                logger.info("%s", literal)
+            return [state.copy()]
+
+    @staticmethod
+    def _inconsistent(declarations: dict[str, Basic], relations: dict[Basic, bool]) -> bool:
+        """Whether the given truth values of relations are inconsistent by linear arithmetic."""
+        count("tauto_theory_checks")
+        hypotheses = dict(declarations)
+        for i, (atom, value) in enumerate(relations.items()):
+            hypotheses[f"_r{i}"] = atom if value else atom.negated
+        with output_mode("silent"):
+            return Linarith().activate(ProofState(false, hypotheses)) == []
+
+    def __str__(self) -> str:
+        return "tauto" if self.arithmetic else "tauto without arithmetic"
+
+    label = "Tautology"
+    description = "Prove the goal if it follows from the hypotheses by propositional reasoning (using a SAT solver), optionally together with linear arithmetic."
+    arguments = []
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+
+from sympy import Add, Basic, Mul, Pow, sympify
+
+from estimates.basic import Type
+from estimates.profiling import count
+from estimates.proofstate import ProofState
+
+# A substitution engine shared by the substitution tactics (`Set`, `Subst`, `SubstAll`, and the tactics such as `IsPositive` that replace a variable by one of a new type).
+# A substitution is compiled once, and then applied to the goal and every hypothesis of a proof state.  Rather than calling sympy's `subs` on each statement (which sympifies its arguments and handles many special cases on every call), the substitution replaces subexpressions exactly, in a single bottom-up traversal of each statement, rebuilding only the nodes that changed.  The results of the traversal are memoized, and the memo is shared between all the statements, so that a subexpression common to many hypotheses is only rewritten once.
+# Only the hypotheses that mention the symbols being substituted for are visited, using the occurrence index of the hypotheses (see `Hypotheses.mentioning`).
+# Sympy's `subs` also matches sums, products and powers "algebraically" (e.g. substituting for x + y in x + y + z, or for x**2 in x**4).  Substitutions for expressions of these kinds are therefore still performed by `subs`, applied to each distinct statement once.
+
+
+class Substitution:
+    """A simultaneous substitution of expressions for expressions, compiled for applying to many statements."""
+
+    def __init__(self, mapping: Mapping[Basic, Basic]) -> None:
+        self.mapping = {sympify(old): sympify(new) for old, new in mapping.items()}
+        self.algebraic = any(isinstance(old, Add | Mul | Pow) for old in self.mapping)
+        self.memo: dict[Basic, Basic] = {}
+        # The symbols of each expression substituted for: only the hypotheses mentioning all the symbols of some such expression can change (unless it has no symbols at all, in which case every hypothesis must be visited).
+        self.symbols: list[set[Basic]] | None = [old.free_symbols for old in self.mapping]
+        if any(not symbols for symbols in self.symbols):
+            self.symbols = None
+
+    def __call__(self, expr: Basic) -> Basic:
+        """Apply the substitution to an expression."""
+        if self.algebraic:
+            result = self.memo.get(expr)
+            if result is None:
+                count("substitutions")
+                result = self.memo[expr] = expr.subs(self.mapping, simultaneous=True)
+            return result
+        return self._replace(expr)
+
+    def _replace(self, expr: Basic) -> Basic:
+        result = self.memo.get(expr)
+        if result is not None:
+            return result
+        count("substitutions")
+        result = self.mapping.get(expr)
+        if result is None:
+            result = expr
+            if expr.args:
+                new_args = [self._replace(arg) for arg in expr.args]
+                if any(new is not old for new, old in zip(new_args, expr.args, strict=True)):
+                    result = expr.func(*new_args)
+        self.memo[expr] = result
+        return result
+
+    def hypotheses(self, state: ProofState, exclude: Iterable[str] = ()) -> Iterator[tuple[str, Basic, Basic]]:
+        """Apply the substitution to the hypotheses of a proof state (other than variable declarations, and those named in `exclude`), generating the name, old and new versions of each hypothesis that changed."""
+        exclude = set(exclude)
+        if self.symbols is None:
+            names: Iterable[str] = state.hypotheses
+        elif len(self.symbols) == 1:
+            names = state.hypotheses.mentioning(self.symbols[0])
+        else:
+            candidates = set().union(*(state.hypotheses.mentioning(symbols) for symbols in self.symbols))
+            names = [name for name in state.hypotheses if name in candidates]
+        for name in names:
+            hypothesis = state.hypotheses[name]
+            if isinstance(hypothesis, Type) or name in exclude:
+                continue
+            new_hypothesis = self(hypothesis)
+            if new_hypothesis != hypothesis:
+                yield name, hypothesis, new_hypothesis
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from itertools import pairwise
+
+from sympy import Basic, default_sort_key, false, true
+from sympy.core.relational import Relational
+from sympy.logic.boolalg import ITE, And, Equivalent, Implies, Not, Or, Xor
+from z3 import Bool, Solver, is_true, unsat
+from z3 import Not as z3Not
+from z3 import Or as z3Or
+
+from estimates.profiling import count
+
+# Propositional reasoning by satisfiability.
+# A statement is encoded as a set of clauses in conjunctive normal form by the Tseitin encoding: each compound subformula is given a fresh variable, together with clauses making that variable equivalent to the subformula.  The number of clauses is thus linear in the size of the statement (rather than exponential, as for a naive conversion to CNF, or for `simplify_logic(..., force=True)`), and the clauses are then handed to the SAT solver of z3.
+# The atoms of the encoding are the subformulas that are not Boolean combinations of other statements: propositions, relations such as x < y (with a relation and its negation, such as x >= y, sharing an atom), and anything else (treated as opaque).
+# Literals are nonzero integers, as in the DIMACS format: the variable v, or its negation -v.
+
+
+class CNF:
+    """A set of clauses, built up by adding statements to it by the Tseitin encoding."""
+
+    def __init__(self) -> None:
+        self.atoms: dict[Basic, int] = {}    # the variable of each atom
+        self.names: dict[int, Basic] = {}    # the atom of each variable that is one
+        self.clauses: list[list[int]] = []
+        self.num_vars = 0
+        self.definitions: dict[Basic, int] = {}  # the literal encoding each subformula encountered so far
+        self.true = self._new_var()
+        self.clauses.append([self.true])
+
+    def _new_var(self) -> int:
+        self.num_vars += 1
+        return self.num_vars
+
+    def _atom(self, expr: Basic) -> int:
+        if isinstance(expr, Relational):
+            # a relation and its negation share a variable; the canonical forms identify e.g. x < y with y > x
+            expr, negation = expr.canonical, expr.negated.canonical
+            if default_sort_key(negation) < default_sort_key(expr):
+                return -self._atom(negation)
+        var = self.atoms.get(expr)
+        if var is None:
+            var = self.atoms[expr] = self._new_var()
+            self.names[var] = expr
+        return var
+
+    def _and(self, literals: list[int]) -> int:
+        var = self._new_var()
+        for literal in literals:
+            self.clauses.append([-var, literal])
+        self.clauses.append([var] + [-literal for literal in literals])
+        return var
+
+    def _or(self, literals: list[int]) -> int:
+        return -self._and([-literal for literal in literals])
+
+    def _iff(self, a: int, b: int) -> int:
+        return self._or([self._and([a, b]), self._and([-a, -b])])
+
+    def literal(self, expr: Basic) -> int:
+        """The literal encoding a statement, adding the clauses defining it if needed."""
+        result = self.definitions.get(expr)
+        if result is not None:
+            return result
+        if expr == true:
+            result = self.true
+        elif expr == false:
+            result = -self.true
+        elif isinstance(expr, Not):
+            result = -self.literal(expr.args[0])
+        elif isinstance(expr, And):
+            result = self._and([self.literal(arg) for arg in expr.args])
+        elif isinstance(expr, Or):
+            result = self._or([self.literal(arg) for arg in expr.args])
+        elif isinstance(expr, Implies):
+            result = self._or([-self.literal(expr.args[0]), self.literal(expr.args[1])])
+        elif isinstance(expr, Equivalent):
+            literals = [self.literal(arg) for arg in expr.args]
+            result = self._and([self._iff(a, b) for a, b in pairwise(literals)])
+        elif isinstance(expr, Xor):
+            literals = [self.literal(arg) for arg in expr.args]
+            result = literals[0]
+            for literal in literals[1:]:
+                result = -self._iff(result, literal)
+        elif isinstance(expr, ITE):
+            condition, then, otherwise = (self.literal(arg) for arg in expr.args)
+            result = self._or([self._and([condition, then]), self._and([-condition, otherwise])])
+        else:
+            result = self._atom(expr)
+        self.definitions[expr] = result
+        return result
+
+    def add(self, expr: Basic) -> None:
+        """Add the clauses asserting a statement."""
+        self.clauses.append([self.literal(expr)])
+
+
+class SatSolver:
+    """The SAT solver of z3, applied to the clauses of a CNF (and any further clauses added to it)."""
+
+    def __init__(self, cnf: CNF) -> None:
+        self.cnf = cnf
+        self.solver = Solver()
+        self.vars = [None] + [Bool(f"v{i}") for i in range(1, cnf.num_vars + 1)]
+        for clause in cnf.clauses:
+            self.add_clause(clause)
+
+    def add_clause(self, clause: list[int]) -> None:
+        self.solver.add(z3Or([self.vars[l] if l > 0 else z3Not(self.vars[-l]) for l in clause]))
+
+    def model(self) -> dict[Basic, bool] | None:
+        """An assignment of truth values to the atoms satisfying all the clauses (omitting atoms whose value does not matter), or None if there is none."""
+        count("sat_checks")
+        if self.solver.check() == unsat:
+            return None
+        model = self.solver.model()
+        assignment = {}
+        for var, atom in self.cnf.names.items():
+            value = model.eval(self.vars[var], model_completion=False)
+            if value is not self.vars[var] and not value.eq(self.vars[var]):
+                assignment[atom] = is_true(value)
+        return assignment
+
+    def block(self, assignment: dict[Basic, bool]) -> None:
+        """Rule out all assignments that agree with the given (partial) assignment to the atoms."""
+        self.add_clause([-self.cnf.atoms[atom] if value else self.cnf.atoms[atom] for atom, value in assignment.items()])
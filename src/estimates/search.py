@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+
+from sympy import Eq, Symbol
+from sympy.logic.boolalg import Boolean
+
+from estimates.basic import Type
+from estimates.linarith import Linarith
+from estimates.log_linarith import ApplyThetaAll, LogLinarith
+from estimates.output import get_logger, output_mode
+from estimates.profiling import count, span, state_size
+from estimates.proofstate import ProofState
+from estimates.propositional_tactics import Cases, Contrapose, SplitGoal, SplitHyp, get_conjuncts, get_disjuncts
+from estimates.simp import SimpAll
+from estimates.subst import SubstAll
+from estimates.tactic import TACTIC_ERRORS, Tactic
+from estimates.test import Trivial
+
+logger = get_logger(__name__)
+
+# An automatic proof search over the existing tactics.
+# The search alternates between two kinds of choices: at a proof state, it may use any one of the candidate tactics (an "or" choice), and having used a tactic, it must then prove all of the resulting proof states (an "and" choice).
+# Closing tactics (`Trivial`, `Linarith`, `LogLinarith`) are tried at every proof state; the other candidate tactics (splitting, case analysis, proof by contradiction, substitution and simplification) are tried in order of how many proof states they produce, and how large these are.  The depth of the search (the number of non-closing tactics along any branch) is increased one step at a time, so the shortest proof is found first.
+# Several caches keep the search from repeating work:
+# * proof states are identified by their content hash, so a proof state that has been proved once is never proved again, and a proof state that could not be proved within a given depth is not retried at that depth;
+# * the proof states produced by each (proof state, tactic) pair are computed only once, and pairs that failed (including closing tactics, and tactics that raised an error) are not retried at the same or a smaller depth.
+# A tactic leading back to a proof state on the current branch is skipped, to avoid loops.  Whether this happens depends on the branch, not just the proof state, so a failure caused (anywhere below) by skipping such a tactic is not cached.
+# The search stops once it has used a given number of tactics, or a given amount of time.
+
+
+class SearchBudgetExceededError(Exception):
+    """Raised when a proof search runs out of time or tactics."""
+
+
+class Step:
+    """A step of a proof found by search: a tactic, the proof states it produced, and the steps proving each of them."""
+
+    def __init__(self, tactic: Tactic, states: list[ProofState], children: list[Step]) -> None:
+        self.tactic = tactic
+        self.states = states
+        self.children = children
+
+    def iter_lines(self, indent: str = "  ", next_indent: str = "  ") -> Iterator[str]:
+        """Generate the lines of a string representation of the proof, in the same format as `ProofTree.iter_lines`."""
+        stack = [(self, indent, next_indent)]
+        while stack:
+            step, indent, next_indent = stack.pop()
+            yield indent + str(step.tactic)
+            children = step.children
+            if len(children) > 0:
+                stack.append((children[-1], next_indent, next_indent))
+                for child in reversed(children[:-1]):
+                    stack.append((child, next_indent + ". ", next_indent + "  "))
+
+
+class StateTable:
+    """A dictionary keyed by proof states, compared by content (using their content hashes)."""
+
+    def __init__(self) -> None:
+        self.entries: dict[int, list[tuple[ProofState, object]]] = {}
+
+    def get(self, state: ProofState, default: object = None) -> object:
+        for other, value in self.entries.get(state.content_hash(), []):
+            if other.eq(state):
+                return value
+        return default
+
+    def set(self, state: ProofState, value: object) -> None:
+        bucket = self.entries.setdefault(state.content_hash(), [])
+        for i, (other, _) in enumerate(bucket):
+            if other.eq(state):
+                bucket[i] = (other, value)
+                return
+        bucket.append((state, value))
+
+
+def closing_tactics(state: ProofState) -> list[Tactic]:
+    """The tactics that are tried for closing the goal of a proof state outright."""
+    del state  # the same tactics are tried for every proof state
+    return [Trivial(), Linarith(), LogLinarith()]
+
+
+def candidate_tactics(state: ProofState) -> list[Tactic]:
+    """The tactics that are tried for making progress on a proof state without closing it."""
+    tactics: list[Tactic] = []
+    if get_conjuncts(state.goal) is not None:
+        tactics.append(SplitGoal())
+    if get_disjuncts(state.goal) is not None and "this" not in state.hypotheses:
+        tactics.append(Contrapose())  # the negation of a disjunction is a conjunction, which can then be split
+    cases: list[Tactic] = []
+    for name, hypothesis in state.hypotheses.items():
+        if isinstance(hypothesis, Type) or not isinstance(hypothesis, Boolean):
+            continue
+        if get_conjuncts(hypothesis) is not None:
+            tactics.append(SplitHyp(name))
+        if isinstance(hypothesis, Eq) and isinstance(hypothesis.lhs, Symbol):
+            tactics.append(SubstAll(name))
+        if get_disjuncts(hypothesis) is not None:
+            cases.append(Cases(name))
+    tactics.append(SimpAll())
+    tactics.append(ApplyThetaAll())
+    return tactics + cases
+
+
+class Search:
+    """
+    A proof search, with budgets on the depth of the proof, the number of tactics used, and the time taken.
+    The caches persist between calls to `prove`, so a search object can be reused for several goals sharing the same hypotheses.
+    """
+
+    def __init__(self, max_depth: int = 4, max_tactics: int = 500, timeout: float | None = 60.0) -> None:
+        """
+        :param max_depth: The maximum number of non-closing tactics along any branch of the proof.
+        :param max_tactics: The maximum number of tactics to use (not counting those whose results are reused from the caches).
+        :param timeout: The maximum time to search for, in seconds.
+        """
+        self.max_depth = max_depth
+        self.max_tactics = max_tactics
+        self.timeout = timeout
+        self.tactics_used = 0
+        self.deadline: float | None = None
+        self.proved = StateTable()      # proof states that have been proved, with their proofs
+        self.failed = StateTable()      # proof states that could not be proved, with the largest depth tried
+        self.expansions = StateTable()  # for each proof state, a dictionary from (the str of) tactics to the proof states they produced, or to None if they failed or did nothing
+        self.failed_tactics = StateTable()  # for each proof state, a dictionary from (the str of) tactics to the largest depth at which using them failed
+
+    def prove(self, state: ProofState) -> Step | None:
+        """Search for a proof of a proof state, returning it, or None if none was found within the budgets."""
+        self.deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        with output_mode("silent"), span("search", "search"):
+            try:
+                for depth in range(self.max_depth + 1):
+                    proof, _ = self._prove(state, depth, [])
+                    if proof is not None:
+                        return proof
+            except SearchBudgetExceededError:
+                pass
+        return None
+
+    def _use(self, state: ProofState, tactic: Tactic) -> list[ProofState] | None:
+        """Use a tactic on a proof state, returning the resulting proof states (or None if the tactic failed, or did nothing).  The results are cached."""
+        expansions = self.expansions.get(state)
+        if expansions is None:
+            expansions = {}
+            self.expansions.set(state, expansions)
+        key = str(tactic)
+        if key in expansions:
+            count("search_cache_hits")
+            return expansions[key]
+        if self.tactics_used >= self.max_tactics:
+            raise SearchBudgetExceededError(f"Used {self.tactics_used} tactics.")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchBudgetExceededError(f"Exceeded {self.timeout} seconds.")
+        self.tactics_used += 1
+        count("search_tactics")
+        try:
+            results = tactic.activate(state)
+        except TACTIC_ERRORS:  # a tactic that does not apply to this proof state may raise an error, which just means it is not useful here
+            results = None
+        if results is not None and len(results) == 1 and results[0].eq(state):
+            results = None
+        expansions[key] = results
+        return results
+
+    def _prove(self, state: ProofState, depth: int, path: list[ProofState]) -> tuple[Step | None, bool]:
+        """
+        Search for a proof of a proof state using at most `depth` non-closing tactics along any branch.  `path` lists the proof states from the root of the search to this one, so that loops can be avoided.
+        Returns the proof found (or None), and whether any tactic was skipped for leading back to a proof state on `path` (in which case a failure depends on `path`, and so is not cached).
+        """
+        proof = self.proved.get(state)
+        if proof is not None:
+            return proof, False
+        if self.failed.get(state, -1) >= depth:
+            return None, False
+        failed_tactics = self.failed_tactics.get(state)
+        if failed_tactics is None:
+            failed_tactics = {}
+            self.failed_tactics.set(state, failed_tactics)
+
+        for tactic in closing_tactics(state):
+            if str(tactic) in failed_tactics:
+                continue
+            results = self._use(state, tactic)
+            if results == []:
+                proof = Step(tactic, [], [])
+                self.proved.set(state, proof)
+                return proof, False
+            failed_tactics[str(tactic)] = self.max_depth  # whether a closing tactic succeeds does not depend on the depth
+
+        pruned = False
+        if depth > 0:
+            path = [*path, state]
+            options = []
+            for tactic in candidate_tactics(state):
+                if failed_tactics.get(str(tactic), -1) >= depth:
+                    continue
+                results = self._use(state, tactic)
+                if results is None:
+                    failed_tactics[str(tactic)] = self.max_depth  # the tactic does not make progress
+                    continue
+                if any(result.eq(other) for result in results for other in path):
+                    pruned = True  # the tactic loops on this branch (but perhaps not on others)
+                    continue
+                options.append((len(results), sum(state_size(result) for result in results), tactic, results))
+            options.sort(key=lambda option: option[:2])  # the most promising tactics first
+            for _, _, tactic, results in options:
+                children = []
+                for result in results:
+                    child, child_pruned = self._prove(result, depth - 1, path)
+                    if child is None:
+                        break
+                    children.append(child)
+                else:
+                    proof = Step(tactic, results, children)
+                    self.proved.set(state, proof)
+                    return proof, False
+                if child_pruned:
+                    pruned = True
+                else:
+                    failed_tactics[str(tactic)] = depth
+
+        if not pruned:
+            self.failed.set(state, depth)
+        return None, pruned
+
+
+class Auto(Tactic):
+    """
+    Search for a proof of the goal using the other tactics, and close the goal if one is found.  (`ProofAssistant.auto()` performs the same search, but records the proof found in the proof tree.)
+    """
+
+    def __init__(self, max_depth: int = 4, max_tactics: int = 500, timeout: float | None = 60.0) -> None:
+        """
+        :param max_depth: The maximum number of non-closing tactics along any branch of the proof.
+        :param max_tactics: The maximum number of tactics to use.
+        :param timeout: The maximum time to search for, in seconds.
+        """
+        self.max_depth = max_depth
+        self.max_tactics = max_tactics
+        self.timeout = timeout
+
+    def activate(self, state: ProofState) -> list[ProofState]:
+        search = Search(self.max_depth, self.max_tactics, self.timeout)
+        proof = search.prove(state)
+        if proof is None:
+            logger.info("Proof search was unable to prove goal (%s tactics used).", search.tactics_used)
+            return [state.copy()]
+        logger.info("Goal solved by proof search, with the following proof:")
+        for line in proof.iter_lines():
+            logger.info("%s", line)
+        return []
+
+    def __str__(self) -> str:
+        return "auto"
+
+    label = "Auto"
+    description = "Search for a proof of the goal using splitting, case analysis, substitution, simplification, and (log-)linear arithmetic."
+    arguments = []
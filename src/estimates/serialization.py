@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import ast
+import importlib
+from fractions import Fraction
+from typing import TYPE_CHECKING, Any
+
+import sympy
+from sympy import Basic, srepr
+
+from estimates import basic, bounded, littlewood_paley, order_of_magnitude, proposition
+from estimates.lemma import Lemma
+from estimates.tactic import Tactic
+
+if TYPE_CHECKING:
+    from estimates.prooftree import ProofTree
+
+# A serialization format for proofs, so that a proof can be saved to a file and later re-checked without re-running the Python session that produced it.
+# A proof is stored as a JSON object containing the hypotheses and goal of the initial proof state, and the steps of the proof tree in depth-first order: each step is a tactic (or null, for a sorry) together with the number of goals it produced, which determines the shape of the tree.
+# Sympy expressions are stored using `srepr`, and tactics (and other objects) by their class and attributes.  In particular, the certificates of infeasibility found by `Linarith` and `LogLinarith` are stored with the tactic, so that replaying the proof does not need to search for them again.
+# Loading a proof rebuilds the stored expressions by calling the sympy classes named in them (not by `eval`), and the stored objects by setting the attributes of classes of this package, so proofs should still only be loaded from trusted sources.
+
+FORMAT = "estimates-proof"
+FORMAT_VERSION = 1
+
+# The classes whose instances may be stored as objects: the tactics, and the lemmas that `UseLemma` applies.
+LOADABLE_CLASSES = (Tactic, Lemma)
+
+_namespace: dict[str, Any] | None = None
+
+
+def namespace() -> dict[str, Any]:
+    """The names that may occur in the `srepr` of an expression: those of sympy, together with the sympy classes defined in this package."""
+    global _namespace
+    if _namespace is None:
+        _namespace = dict(vars(sympy))
+        for module in (basic, bounded, littlewood_paley, order_of_magnitude, proposition):
+            for name, obj in vars(module).items():
+                if isinstance(obj, type) and issubclass(obj, Basic):
+                    _namespace[name] = obj
+    return _namespace
+
+
+# The classes whose `srepr` has string arguments (names, or the digits of a float).  Strings are not accepted as arguments to other classes, as many sympy constructors would parse (and evaluate) them.
+_STRING_ARGUMENTS = (sympy.Symbol, sympy.Function, sympy.Float)
+
+
+def _rebuild(node: ast.expr) -> Any:
+    """Rebuild an expression from its parsed `srepr`, which may only contain calls of sympy classes (with constant keyword arguments), sympy objects such as `true` and `oo`, numbers, strings, tuples, lists and negations."""
+    match node:
+        case ast.Constant(value=value) if isinstance(value, bool | int | float | str):
+            return value
+        case ast.Name(id=name):
+            value = namespace().get(name)
+            if isinstance(value, Basic) or (isinstance(value, type) and issubclass(value, Basic)):
+                return value
+        case ast.UnaryOp(op=ast.USub(), operand=operand):
+            return -_rebuild(operand)
+        case ast.Tuple(elts=elts):
+            return tuple(_rebuild(elt) for elt in elts)
+        case ast.List(elts=elts):
+            return [_rebuild(elt) for elt in elts]
+        case ast.Call(func=func, args=args, keywords=keywords) if all(keyword.arg is not None for keyword in keywords):
+            cls = _rebuild(func)
+            if isinstance(cls, type) and issubclass(cls, Basic):
+                arguments = [_rebuild(arg) for arg in args]
+                if issubclass(cls, _STRING_ARGUMENTS) or not any(isinstance(arg, str) for arg in arguments):
+                    return cls(*arguments, **{keyword.arg: _rebuild(keyword.value) for keyword in keywords})
+    raise ValueError(f"Cannot deserialize the expression {ast.unparse(node)}.")
+
+
+def encode(value: Any, certificates: bool = True) -> Any:
+    """
+    Encode a value (such as a tactic, or one of its attributes) as JSON-compatible data.
+    :param certificates: If false, replace any stored certificates of infeasibility by empty ones.
+    """
+    if value is None or isinstance(value, bool | int | float | str):
+        return value
+    if isinstance(value, Basic):
+        return {"sympy": srepr(value)}
+    if isinstance(value, Fraction):
+        return {"fraction": str(value)}
+    if isinstance(value, list):
+        return [encode(item, certificates) for item in value]
+    if isinstance(value, tuple):
+        return {"tuple": [encode(item, certificates) for item in value]}
+    if isinstance(value, set | frozenset):
+        return {type(value).__name__: [encode(item, certificates) for item in value]}
+    if isinstance(value, dict):
+        return {
+            "dict": [
+                [encode(key, certificates), encode(item, certificates)]
+                for key, item in value.items()
+            ]
+        }
+    if hasattr(value, "__dict__"):
+        cls = type(value)
+        return {
+            "object": f"{cls.__module__}.{cls.__qualname__}",
+            "vars": {
+                name: encode(
+                    {} if name == "certificates" and not certificates else item,
+                    certificates,
+                )
+                for name, item in vars(value).items()
+            },
+        }
+    raise TypeError(f"Cannot serialize {value!r}.")
+
+
+def decode(data: Any) -> Any:
+    """Decode data produced by `encode`."""
+    if data is None or isinstance(data, bool | int | float | str):
+        return data
+    if isinstance(data, list):
+        return [decode(item) for item in data]
+    if "sympy" in data:
+        return _rebuild(ast.parse(data["sympy"], mode="eval").body)
+    if "fraction" in data:
+        return Fraction(data["fraction"])
+    if "tuple" in data:
+        return tuple(decode(item) for item in data["tuple"])
+    if "set" in data:
+        return {decode(item) for item in data["set"]}
+    if "frozenset" in data:
+        return frozenset(decode(item) for item in data["frozenset"])
+    if "dict" in data:
+        return {decode(key): decode(item) for key, item in data["dict"]}
+    if "object" in data:
+        module_name, _, class_name = data["object"].rpartition(".")
+        cls = None
+        if module_name.startswith("estimates."):
+            try:
+                cls = getattr(importlib.import_module(module_name), class_name, None)
+            except ImportError:
+                pass
+        if not (
+            isinstance(cls, type)
+            and cls.__module__.startswith("estimates.")
+            and issubclass(cls, LOADABLE_CLASSES)
+        ):
+            raise ValueError(f"Cannot load object of class {data['object']}.")
+        obj = cls.__new__(cls)
+        obj.__dict__.update({name: decode(item) for name, item in data["vars"].items()})
+        return obj
+    raise ValueError(f"Cannot deserialize {data!r}.")
+
+
+def proof_to_dict(tree: ProofTree, certificates: bool = True) -> dict:
+    """Encode a proof tree (together with its initial hypotheses and goal) as JSON-compatible data."""
+    state = tree.proof_state
+    return {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "hypotheses": [
+            [name, encode(hypothesis)] for name, hypothesis in state.hypotheses.items()
+        ],
+        "goal": encode(state.goal),
+        "steps": [
+            [encode(tactic, certificates), num_children]
+            for tactic, num_children in tree.to_steps()
+        ],
+    }
+
+
+def proof_from_dict(
+    data: dict,
+) -> tuple[dict[str, Basic], Basic, list[tuple[Tactic | None, int]]]:
+    """Decode data produced by `proof_to_dict`, returning the hypotheses, the goal, and the steps of the proof."""
+    if data.get("format") != FORMAT:
+        raise ValueError("Not a saved proof.")
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported proof format version {data.get('version')}.")
+    hypotheses = {name: decode(hypothesis) for name, hypothesis in data["hypotheses"]}
+    goal = decode(data["goal"])
+    steps = []
+    for encoded, num_children in data["steps"]:
+        tactic = decode(encoded)
+        if tactic is not None and not isinstance(tactic, Tactic):
+            raise ValueError(f"{tactic} is not a tactic.")
+        steps.append((tactic, num_children))
+    return hypotheses, goal, steps
@@ -1,95 +1,121 @@
-from sympy import Basic, Eq, Max, Min, Not, false, simplify, true, Expr
+from collections import Counter, deque
+from collections.abc import Iterable, Mapping
+from collections.abc import Set as AbstractSet
+
+from sympy import And, Basic, Eq, Max, Min, Ne, Not, Or, false, simplify, true, Expr
 from sympy.logic.boolalg import Boolean
-from sympy.core.relational import (
-    GreaterThan,
-    LessThan,
-    Rel,
-    Relational,
-    StrictGreaterThan,
-    StrictLessThan,
-)
+from sympy.core.relational import Rel, Relational
 from sympy.core.sympify import sympify
 
+from estimates.assumptions import ask
 from estimates.basic import Type, new_var, typeof
 from estimates.order_of_magnitude import OrderMax, OrderMin, Theta
 from estimates.proofstate import ProofState
 from estimates.tactic import Tactic
 from estimates.test import test
 from estimates.bounded import is_fixed, is_bounded
+from estimates.hypothesis_index import RELATIONS, SIGNS, HypothesisIndex
+from estimates.output import Lazy, get_logger
+from estimates.profiling import count, profiled
+from estimates.rewrite import Substitution
+
+logger = get_logger(__name__)
 
 #  The simplifier
 
 
-def rsimp(goal: Basic, hypotheses: set[Basic] = set(), use_sympy = False) -> Basic:
+def rsimp(goal: Basic, hypotheses: set[Basic] | HypothesisIndex = set(), use_sympy = False) -> Basic:
     """
-    Recursively simplifies the goal using a set of hypotheses.  If `use_sympy` is True, it uses sympy's simplifier."""
+    Recursively simplifies the goal using a set of hypotheses (which may be given already indexed, as a `HypothesisIndex`).  If `use_sympy` is True, it uses sympy's simplifier."""
 
-    new_args = [rsimp(arg, hypotheses) for arg in goal.args]
+    if not isinstance(hypotheses, HypothesisIndex):
+        hypotheses = HypothesisIndex(hypotheses)
 
-    if use_sympy:  # Use sympy's simplifier.  Note that this may have unwanted behavior.
-        goal = simplify(goal)
-        hypotheses = {simplify(hyp) for hyp in hypotheses}
+    memo: dict[Basic, Basic] = {}
+    if not use_sympy:
+        return _rsimp(goal, hypotheses, memo)
+
+    count("rsimp_calls")
+    new_args = [_rsimp(arg, hypotheses, memo) for arg in goal.args]
+    # Use sympy's simplifier.  Note that this may have unwanted behavior.
+    return _simplify_node(
+        simplify(goal),
+        new_args,
+        HypothesisIndex(simplify(hyp) for hyp in hypotheses),
+    )
+
+
+def _rsimp(goal: Basic, hypotheses: HypothesisIndex, memo: dict[Basic, Basic]) -> Basic:
+    """
+    Simplify the subexpressions of the goal bottom-up, and then the goal itself.  Each distinct subexpression is only simplified once: the results are stored in `memo`, so that a subexpression occurring many times (as is common after substitutions) is not simplified again at each occurrence.
+    """
+    result = memo.get(goal)
+    if result is not None:
+        count("rsimp_cache_hits")
+        return result
+    count("rsimp_calls")
+    new_args = [_rsimp(arg, hypotheses, memo) for arg in goal.args]
+    result = memo[goal] = _simplify_node(goal, new_args, hypotheses)
+    return result
+
+
+def _simplify_node(goal: Basic, new_args: list[Basic], hypotheses: HypothesisIndex) -> Basic:
+    """Simplify a single node of an expression, given the simplified versions of its arguments."""
 
     if goal in hypotheses:
         return true
 
-    if Not(goal) in hypotheses:
+    if hypotheses.refutes(goal):
         return false
 
-    for hyp in hypotheses:
-        if isinstance(goal, Relational) and isinstance(hyp, Relational):
-            if goal.args[0] == hyp.args[0] and goal.args[1] == hyp.args[1]:
-                s = 1
-            elif goal.args[0] == hyp.args[1] and goal.args[1] == hyp.args[0]:
-                s = -1
-            else:
-                s = 0
-            if s != 0:
-                sign = {
-                    "<=": {0, 1},
-                    "<": {1},
-                    "==": {0},
-                    ">=": {-1, 0},
-                    ">": {-1},
-                    "!=": {-1, 1},
-                }
-                goalset = sign[goal.rel_op]
-                hypset = {s * i for i in sign[hyp.rel_op]}
-                if hypset.issubset(goalset):  # hypothesis implies goal
-                    return true
-                elif hypset.isdisjoint(goalset):  # hypothesis contradicts goal
-                    return false
-                else:
-                    goalset = goalset.intersection(hypset)
-                    for rel, signset in sign.items():  # hypothesis refines goal
-                        if goalset == signset:
-                            return Rel(goal.args[0], goal.args[1], rel)
-
-        if isinstance(hyp, LessThan | StrictLessThan | GreaterThan | StrictGreaterThan):
-            if hyp.lts != hyp.gts and hyp.lts in goal.args and hyp.gts in goal.args:
-                if isinstance(goal, Max | OrderMax):
-                    # can remove a copy of hyp.lts
-                    l = list(goal.args)
-                    l.remove(hyp.lts)
-                    return goal.func(*l)
-                if isinstance(goal, Min | OrderMin):
-                    # can remove a copy of hyp.gts
-                    l = list(goal.args)
-                    l.remove(hyp.gts)
-                    return goal.func(*l)
+    if isinstance(goal, Eq | Ne):
+        closure = hypotheses.closure()
+        if closure is not None:
+            decided = closure.decide(goal)  # equal by congruence, or distinct
+            if decided is not None:
+                return true if decided else false
+
+    if isinstance(goal, Relational):
+        hypset = hypotheses.relation_signs(goal.args[0], goal.args[1])
+        if hypset is not None:
+            goalset = SIGNS[goal.rel_op]
+            if hypset.issubset(goalset):  # hypotheses imply goal
+                return true
+            elif hypset.isdisjoint(goalset):  # hypotheses contradict goal
+                return false
+            elif goalset & hypset in RELATIONS:  # hypotheses refine goal
+                return Rel(goal.args[0], goal.args[1], RELATIONS[goalset & hypset])
+
+    if isinstance(goal, Max | OrderMax):
+        # can remove an argument that is at most another argument
+        arg = hypotheses.redundant_max_arg(goal.args)
+        if arg is not None:
+            l = list(goal.args)
+            l.remove(arg)
+            return goal.func(*l)
+
+    if isinstance(goal, Min | OrderMin):
+        # can remove an argument that is at least another argument
+        arg = hypotheses.redundant_min_arg(goal.args)
+        if arg is not None:
+            l = list(goal.args)
+            l.remove(arg)
+            return goal.func(*l)
 
     if isinstance(goal, Theta):
-        if is_fixed(goal.args[0], hypotheses):
+        if is_fixed(goal.args[0], hypotheses.hypotheses):
             return Theta(1) # Theta of a fixed quantity is Theta(1)
-        elif is_bounded(goal.args[0], hypotheses) and goal.args[0].is_integer:
+        elif is_bounded(goal.args[0], hypotheses.hypotheses) and ask(goal.args[0], "integer"):
             return Theta(1) # Theta of a bounded integer is Theta(1)
 
-    if goal.args == ():
-        return goal
-    else:
-        return goal.func(*new_args).doit()
+    if len(new_args) != len(goal.args) or any(new_arg is not arg for new_arg, arg in zip(new_args, goal.args, strict=True)):
+        goal = goal.func(*new_args)  # only rebuild the node if some argument changed
+    # The arguments have already been simplified and evaluated, so only the node itself needs evaluating (which does nothing for most nodes, but normalizes e.g. nested maxima of orders of magnitude).
+    result = goal.doit(deep=False)
+    return goal if result == goal else result  # return the original node if nothing changed, so that its parent need not be rebuilt either
 
 
+@profiled("simp", "simp")
 def simp(goal: Basic, hypotheses:set[Basic] = set(), use_sympy = False) -> Basic:
     """
     Simplifies the goal using the hypothesis.  If `use_sympy` is True, it uses sympy's simplifier.
@@ -108,77 +134,217 @@ def simp(goal: Basic, hypotheses:set[Basic] = set(), use_sympy = False) -> Basic
     else:
         new_goal = goal
 
-    if test(hypotheses, new_goal):
-        print(f"Simplified {goal} to True using {hypotheses}.")
+    index = HypothesisIndex(hypotheses)  # shared by the tests below and the simplifier
+    if test(index, new_goal):
+        logger.info("Simplified %s to True using %s.", goal, hypotheses)
         return true
-    if test(hypotheses, Not(new_goal)):
-        print(f"Simplified {goal} to False using {hypotheses}.")
+    if test(index, Not(new_goal)):
+        logger.info("Simplified %s to False using %s.", goal, hypotheses)
         return false
 
     # TODO: this is recursive also, and may be merged with rsimp
     new_goal = makeSimplestGoal(new_goal, hypotheses)
 
-    new_goal = rsimp(new_goal, hypotheses, use_sympy)
+    new_goal = rsimp(new_goal, index, use_sympy)
 
     if Eq(new_goal, goal) is not true:
-        print(f"Simplified {goal} to {new_goal} using {hypotheses}.")
+        logger.info("Simplified %s to %s using %s.", goal, new_goal, hypotheses)
     return new_goal
 
-def makeSimplestGoal(goal, hypotheses):
-    new_goal = goal
-    for hyp in hypotheses:
-        if isinstance(hyp,Boolean):
-            # If a hypothesis is a boolean, we can use it to simplify the goal further.
-            new_goal = new_goal.subs(hyp, True)
-            if isinstance(hyp, Not):
-                new_goal = new_goal.subs(hyp.args[0], False)
-    if new_goal != goal:
-        return makeSimplestGoal(new_goal, hypotheses)
-    else:
+class _BooleanFacts:
+    """
+    The Boolean hypotheses, arranged so that every subexpression of a goal that they decide can be replaced by True or False in a single traversal of the goal.
+    A conjunctive hypothesis also makes each of its conjuncts true, and a negated disjunction makes each of its disjuncts false; a disjunctive hypothesis makes true any disjunction containing all of its disjuncts, and a negated conjunction makes false any conjunction containing all of its conjuncts.
+    """
+
+    def __init__(self, hypotheses: Iterable[Basic]) -> None:
+        self.true: set[Basic] = set()
+        self.false: set[Basic] = set()
+        self.disjunctions: list[frozenset[Basic]] = []
+        self.conjunctions: list[frozenset[Basic]] = []
+        for hyp in hypotheses:
+            if not isinstance(hyp, Boolean) or isinstance(hyp, Type):
+                continue
+            self.true.add(hyp)
+            if isinstance(hyp, And):
+                self.true.update(hyp.args)
+            elif isinstance(hyp, Or):
+                self.disjunctions.append(frozenset(hyp.args))
+            elif isinstance(hyp, Not):
+                prop = hyp.args[0]
+                self.false.add(prop)
+                if isinstance(prop, Or):
+                    self.false.update(prop.args)
+                elif isinstance(prop, And):
+                    self.conjunctions.append(frozenset(prop.args))
+
+    def __bool__(self) -> bool:
+        return bool(self.true or self.false)
+
+    def decide(self, expr: Basic) -> Basic | None:
+        """True or False if the facts decide the expression outright, and None otherwise."""
+        if expr in self.true:
+            return true
+        if expr in self.false:
+            return false
+        if isinstance(expr, Or) and self.disjunctions:
+            args = set(expr.args)
+            if any(disjunction <= args for disjunction in self.disjunctions):
+                return true
+        if isinstance(expr, And) and self.conjunctions:
+            args = set(expr.args)
+            if any(conjunction <= args for conjunction in self.conjunctions):
+                return false
+        return None
+
+    def replace(self, expr: Basic, memo: dict[Basic, Basic]) -> Basic:
+        """Replace (bottom up) each Boolean subexpression decided by the facts with True or False."""
+        if not isinstance(expr, Boolean) or isinstance(expr, Type):
+            return expr  # the facts are propositions, which only occur inside other propositions
+        cached = memo.get(expr)
+        if cached is not None:
+            return cached
+        result = self.decide(expr)
+        if result is None:
+            new_args = tuple(self.replace(arg, memo) for arg in expr.args)
+            result = expr
+            if any(new is not old for new, old in zip(new_args, expr.args, strict=True)):
+                result = expr.func(*new_args)
+                decided = self.decide(result)
+                if decided is not None:
+                    result = decided
+        memo[expr] = result
+        return result
+
+
+def makeSimplestGoal(goal: Basic, hypotheses: Iterable[Basic], max_passes: int = 10) -> Basic:
+    """
+    Replace each part of the goal that is decided by the Boolean hypotheses with True or False.  Each pass is one traversal of the goal; as a replacement can create new subexpressions decided by the hypotheses, passes are repeated until the goal stops changing (or `max_passes` is reached).
+    """
+    facts = _BooleanFacts(hypotheses)
+    if not facts:
         return goal
+    for _ in range(max_passes):
+        count("boolean_substitution_passes")
+        new_goal = facts.replace(goal, {})
+        if new_goal == goal:
+            break
+        goal = new_goal
+    return goal
+
+class _Dependencies:
+    """
+    The hypotheses of a proof state, indexed by the symbols that they mention.  The simplification of a statement can only depend on the hypotheses that share a symbol with it (or that mention no symbols at all), and, since the simplifier reasons with the congruence closure of the equations among the hypotheses, on the hypotheses that share a symbol with an equation linked to the statement by a chain of equations (so that e.g. x = z depends on x = w, w = v and v = z).  These are the only hypotheses passed to the simplifier, and the only ones that need to be revisited when the statement changes.
+    """
+
+    def __init__(self, hypotheses: Mapping[str, Basic]) -> None:
+        self.hypotheses: dict[str, Basic] = {}
+        self.symbols: dict[str, AbstractSet[Basic]] = {}  # the symbols mentioned by each hypothesis
+        self.by_symbol: dict[Basic, set[str]] = {}        # the names of the hypotheses mentioning each symbol
+        self.closed: set[str] = set()                     # the names of the hypotheses mentioning no symbols
+        for name, hypothesis in hypotheses.items():
+            self.add(name, hypothesis)
+
+    def add(self, name: str, hypothesis: Basic) -> None:
+        self.hypotheses[name] = hypothesis
+        symbols = self.symbols[name] = hypothesis.free_symbols
+        if not symbols:
+            self.closed.add(name)
+        for symbol in symbols:
+            self.by_symbol.setdefault(symbol, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        del self.hypotheses[name]
+        self.closed.discard(name)
+        for symbol in self.symbols.pop(name):
+            self.by_symbol[symbol].discard(name)
+
+    def related(self, expr: Basic, exclude: str | None = None) -> set[str]:
+        """The names of the hypotheses (other than `exclude`) that the simplification of expr can depend on."""
+        names = self.closed - {exclude}
+        seen: set[Basic] = set()
+        symbols = list(expr.free_symbols)
+        while symbols:
+            symbol = symbols.pop()
+            if symbol in seen:
+                continue
+            seen.add(symbol)
+            for name in self.by_symbol.get(symbol, ()):
+                if name == exclude or name in names:
+                    continue
+                names.add(name)
+                if isinstance(self.hypotheses[name], Eq):
+                    symbols.extend(self.symbols[name])  # the symbols equated with those of expr are related to it in turn
+        return names
+
+    def relevant(self, expr: Basic, exclude: str | None = None) -> set[Basic]:
+        """The hypotheses (other than `exclude`) that the simplification of expr can depend on."""
+        return {self.hypotheses[name] for name in self.related(expr, exclude)}
+
 
 class SimpAll(Tactic):
     """
     Simplifies each hypothesis using other hypotheses, then the goal using the hypothesis.
     """
 
+    MAX_VISITS = 10  # with `repeat`, the maximum number of times that any one statement is simplified, in case the simplifications never settle down
+
     def __init__(self, use_sympy:bool = False, repeat:bool = False) -> None:
         self.use_sympy = use_sympy
         self.repeat = repeat
 
     def activate(self, state: ProofState) -> list[ProofState]:
+        # The hypotheses are simplified in order, each using the current versions of the hypotheses that it could depend on.  With `repeat`, whenever a hypothesis changes, the hypotheses that could depend on it are queued to be simplified again, until nothing changes.
         newstate = state.copy()
-
-        while True:
-            for name, hyp in state.hypotheses.items():
-                other_hypotheses = set()
-                for other_name, other_hyp in newstate.hypotheses.items():
-                    if other_name != name:  # Cannot use a hypothesis to simplify itself!
-                        other_hypotheses.add(other_hyp)
-                hyp = simp(hyp, other_hypotheses, self.use_sympy)
-                newstate.hypotheses[name] = hyp
-
-                if hyp == true:
-                    newstate.remove_hypothesis(name)
-
-                if hyp == false:
-                    print("Goal solved by _ex falso quodlibet_.")
-                    return []
-
-            goal = newstate.goal
-            goal = simp(goal, set(newstate.hypotheses.values()), self.use_sympy)
-            newstate.set_goal(goal)
-
-            if goal == true:
-                print("Goal solved!")
+        dependencies = _Dependencies(state.hypotheses)
+        order = {
+            name: i
+            for i, (name, hyp) in enumerate(state.hypotheses.items())
+            if not isinstance(hyp, Type)
+        }
+        worklist = deque(order)
+        queued = set(order)
+        visits = Counter()
+
+        while worklist:
+            name = worklist.popleft()
+            queued.discard(name)
+            visits[name] += 1
+            hyp = dependencies.hypotheses[name]
+            new_hyp = simp(hyp, dependencies.relevant(hyp, name), self.use_sympy)
+            if new_hyp == hyp:
+                continue
+
+            if new_hyp == false:
+                logger.info("Goal solved by _ex falso quodlibet_.")
                 return []
-            
-            if not self.repeat:
+
+            dependents = dependencies.related(hyp, name) | dependencies.related(new_hyp, name)
+            dependencies.remove(name)
+            if new_hyp == true:
+                newstate.remove_hypothesis(name)
+            else:
+                newstate.hypotheses[name] = new_hyp
+                dependencies.add(name, new_hyp)
+
+            if self.repeat:
+                for dependent in sorted(dependents & order.keys(), key=order.__getitem__):
+                    if dependent in dependencies.hypotheses and dependent not in queued and visits[dependent] < self.MAX_VISITS:
+                        worklist.append(dependent)
+                        queued.add(dependent)
+
+        goal = newstate.goal
+        for _ in range(self.MAX_VISITS if self.repeat else 1):
+            new_goal = simp(goal, dependencies.relevant(goal), self.use_sympy)
+            if new_goal == goal:
                 break
+            goal = new_goal
+        newstate.set_goal(goal)
+
+        if goal == true:
+            logger.info("Goal solved!")
+            return []
 
-            if newstate.eq(state):
-                break  # if repeat is True, we keep simplifying until the goal stabilizes
-    
         return [newstate]
 
     def __str__(self) -> str:
@@ -189,6 +355,18 @@ class SimpAll(Tactic):
     arguments = []
 
 
+def retype(state: ProofState, name: str, var: Basic, newvar: Basic) -> ProofState:
+    """A copy of a proof state in which the variable declared by the hypothesis `name` is replaced everywhere by a new variable of the same name (but a different type)."""
+    substitution = Substitution({var: newvar})
+    changes = list(substitution.hypotheses(state, exclude=[name]))  # before copying, so that the copy shares any occurrence index built
+    newstate = state.copy()
+    newstate.hypotheses[name] = Type(newvar)
+    for other_name, _, new_hypothesis in changes:
+        newstate.hypotheses[other_name] = new_hypothesis
+    newstate.set_goal(substitution(state.goal))
+    return newstate
+
+
 class IsPositive(Tactic):
     """
     Makes a variable positive by searching for hypotheses that imply positivity.
@@ -204,36 +382,30 @@ class IsPositive(Tactic):
         else:
             var = self.name
             name = state.get_var_name(var)
-        if var.is_positive:
-            print(f"{name} is already a positive type.")
+        if ask(var, "positive", state.assumption_cache):
+            logger.info("%s is already a positive type.", name)
             return [state.copy()]
 
         if not state.test(var > 0):
-            print(f"Cannot prove {name} is positive.")
+            logger.info("Cannot prove %s is positive.", name)
             return [state.copy()]
 
-        if var.is_integer:
+        if ask(var, "integer", state.assumption_cache):
             newvar = new_var("pos_int", name)
-        elif var.is_rational:
+        elif ask(var, "rational", state.assumption_cache):
             newvar = new_var("pos_rat", name)
-        elif var.is_real:
+        elif ask(var, "real", state.assumption_cache):
             newvar = new_var("pos_real", name)
         else:
             raise ValueError(
                 f"INCONSISTENCY: {name}:{typeof} was somehow proven positive, which is impossible."
             )
 
-        print(f"{name} is now of type {typeof(newvar)}.")
-        newstate = state.copy()
-        for other_name, other_var in state.hypotheses.items():
-            if other_name == name:
-                newstate.hypotheses[name] = Type(newvar)
-            else:
-                newstate.hypotheses[other_name] = other_var.subs(var, newvar)
-        newstate.set_goal(state.goal.subs(var, newvar))
+        logger.info("%s is now of type %s.", name, typeof(newvar))
+        newstate = retype(state, name, var, newvar)
 
         if newstate.goal == true:
-            print("Goal solved!")
+            logger.info("Goal solved!")
             return []
         else:
             return [newstate]
@@ -261,36 +433,30 @@ class IsNonnegative(Tactic):
         else:
             var = self.name
             name = state.get_var_name(var)
-        if var.is_nonnegative:
-            print(f"{name} is already a nonnegative type.")
+        if ask(var, "nonnegative", state.assumption_cache):
+            logger.info("%s is already a nonnegative type.", name)
             return [state.copy()]
 
         if not state.test(var >= 0):
-            print(f"Cannot prove {name} is nonnegative.")
+            logger.info("Cannot prove %s is nonnegative.", name)
             return [state.copy()]
 
-        if var.is_integer:
+        if ask(var, "integer", state.assumption_cache):
             newvar = new_var("nonneg_int", name)
-        elif var.is_rational:
+        elif ask(var, "rational", state.assumption_cache):
             newvar = new_var("nonneg_rat", name)
-        elif var.is_real:
+        elif ask(var, "real", state.assumption_cache):
             newvar = new_var("nonneg_real", name)
         else:
             raise ValueError(
                 f"INCONSISTENCY: {name}:{typeof} was somehow proven nonnegative, which is impossible."
             )
 
-        print(f"{name} is now of type {typeof(newvar)}.")
-        newstate = state.copy()
-        for other_name, other_var in state.hypotheses.items():
-            if other_name == name:
-                newstate.hypotheses[name] = Type(newvar)
-            else:
-                newstate.hypotheses[other_name] = other_var.subs(var, newvar)
-        newstate.set_goal(newstate.goal.subs(var, newvar))
+        logger.info("%s is now of type %s.", name, typeof(newvar))
+        newstate = retype(state, name, var, newvar)
 
         if newstate.goal == true:
-            print("Goal solved!")
+            logger.info("Goal solved!")
             return []
         else:
             return [newstate]
@@ -318,36 +484,30 @@ class IsNonzero(Tactic):
         else:
             var = self.name
             name = state.get_var_name(var)
-        if var.is_nonzero:
-            print(f"{name} is already a nonzero type.")
+        if ask(var, "nonzero", state.assumption_cache):
+            logger.info("%s is already a nonzero type.", name)
             return [state.copy()]
 
         if not state.test(var != 0):
-            print(f"Cannot prove {name} is nonzero.")
+            logger.info("Cannot prove %s is nonzero.", name)
             return [state.copy()]
 
-        if var.is_integer:
+        if ask(var, "integer", state.assumption_cache):
             newvar = new_var("nonzero_int", name)
-        elif var.is_rational:
+        elif ask(var, "rational", state.assumption_cache):
             newvar = new_var("nonzero_rat", name)
-        elif var.is_real:
+        elif ask(var, "real", state.assumption_cache):
             newvar = new_var("nonzero_real", name)
         else:
             raise ValueError(
                 f"INCONSISTENCY: {name}:{typeof} was somehow proven positive, which is impossible."
             )
 
-        print(f"{name} is now of type {typeof(newvar)}.")
-        newstate = state.copy()
-        for other_name, other_var in state.hypotheses.items():
-            if other_name == name:
-                newstate.hypotheses[name] = Type(newvar)
-            else:
-                newstate.hypotheses[other_name] = other_var.subs(var, newvar)
-        newstate.set_goal(newstate.goal.subs(var, newvar))
+        logger.info("%s is now of type %s.", name, typeof(newvar))
+        newstate = retype(state, name, var, newvar)
 
         if newstate.goal == true:
-            print("Goal solved!")
+            logger.info("Goal solved!")
             return []
         else:
             return [newstate]
@@ -484,11 +644,11 @@ class Calc(Tactic):
             goals.append(new_state.goal)
         if len(self.relations) == 1:
             if new_states[0].goal == goal:
-                print(f"No change to goal.")
+                logger.info("No change to goal.")
             else:
-                print(f"Goal strengthened to {new_states[0].goal}.")
+                logger.info("Goal strengthened to %s.", new_states[0].goal)
         else:
-            print(f"Split into goals " + ", ".join([str(g) for g in goals]) + ".")
+            logger.info("Split into goals %s.", Lazy(lambda: ", ".join(map(str, goals))))
         return new_states
 
     def __str__(self) -> str:
@@ -1,9 +1,14 @@
 from sympy import Basic, Eq, true
 
 from estimates.basic import Type, is_defined, new_var, typeof
+from estimates.congruence import CongruenceClosure
+from estimates.rewrite import Substitution
 from estimates.proofstate import ProofState
 from estimates.tactic import Tactic
 from estimates.simp import simp
+from estimates.output import get_logger
+
+logger = get_logger(__name__)
 
 # Substitution tactics
 
@@ -30,7 +35,7 @@ class Let(Tactic):
         newstate = state.copy()
         var = new_var(typeof(self.expr), name)
         newstate.hypotheses[name] = Type(var)
-        print(f"Letting {name} := {self.expr}.")
+        logger.info("Letting %s := %s.", name, self.expr)
         def_name = state.new(self.name + "_def")
         newstate.hypotheses[def_name] = Eq(var, self.expr)
         return [newstate]
@@ -62,16 +67,17 @@ class Set(Tactic):
                 f"{self.expr!s} is not defined in the current proof state."
             )
         name = state.new(self.name)
-        newstate = state.copy()
         var = new_var(typeof(self.expr), name)
+        substitution = Substitution({self.expr: var})
+        changes = list(substitution.hypotheses(state))  # before copying, so that the copy shares any occurrence index built
+        newstate = state.copy()
         newstate.hypotheses[name] = Type(var)
-        print(f"Setting {name} := {self.expr}.")
+        logger.info("Setting %s := %s.", name, self.expr)
 
-        for other_name, other_expr in state.hypotheses.items():
-            if not isinstance(other_expr, Type):
-                newstate.hypotheses[other_name] = other_expr.subs(self.expr, var)
+        for other_name, _, new_expr in changes:
+            newstate.hypotheses[other_name] = new_expr
 
-        newstate.set_goal(state.goal.subs(self.expr, var))
+        newstate.set_goal(substitution(state.goal))
 
         def_name = state.new(self.name + "_def")
         newstate.hypotheses[def_name] = Eq(var, self.expr)
@@ -109,7 +115,7 @@ class Subst(Tactic):
         if not isinstance(hyp, Eq):
             raise ValueError(f"{self.hyp} is not an equality hypothesis.")
         if self.hyp == self.target:
-            print(
+            logger.warning(
                 "Warning: substituting a hypothesis into itself will lose information."
             )
 
@@ -127,21 +133,31 @@ class Subst(Tactic):
                 )
 
         if self.reversed:
-            newtarget = simp(target.subs(hyp.rhs, hyp.lhs))
+            newtarget = Substitution({hyp.rhs: hyp.lhs})(target)
             if newtarget != target:
-                print(
-                    f"Substituted {self.hyp} in reverse to replace {target} with {newtarget}."
+                newtarget = simp(newtarget)  # only simplify if the substitution had an effect
+                logger.info(
+                    "Substituted %s in reverse to replace %s with %s.",
+                    self.hyp,
+                    target,
+                    newtarget,
                 )
         else:
-            newtarget = simp(target.subs(hyp.lhs, hyp.rhs))
+            newtarget = Substitution({hyp.lhs: hyp.rhs})(target)
             if newtarget != target:
-                print(f"Substituted {self.hyp} to replace {target} with {newtarget}.")
+                newtarget = simp(newtarget)
+                logger.info(
+                    "Substituted %s to replace %s with %s.",
+                    self.hyp,
+                    target,
+                    newtarget,
+                )
 
         if newtarget == target:
-            print("Substitution had no effect.")
+            logger.info("Substitution had no effect.")
 
         if newtarget == true and self.target == None:
-            print("Goal proved!")
+            logger.info("Goal proved!")
             return []
 
         newstate = state.copy()
@@ -186,42 +202,50 @@ class SubstAll(Tactic):
         if self.reversed:
             hyp = hyp.reversed
 
+        substitution = Substitution({hyp.lhs: hyp.rhs})
+        # don't substitute a hypothesis into itself
+        changes = list(substitution.hypotheses(state, exclude=[self.hyp]))  # before copying, so that the copy shares any occurrence index built
         newstate = state.copy()
 
-        for other_name, other_expr in state.hypotheses.items():
-            if isinstance(other_expr, Type):
-                continue
-            if self.hyp == other_name:
-                continue  # don't substitute a hypothesis into itself
-
-            newtarget = other_expr.subs(hyp.lhs, hyp.rhs)
-            if newtarget != other_expr:
-                if self.reversed:
-                    print(
-                        f"Substituted {self.hyp} in reverse to replace {other_expr} with {newtarget}."
-                    )
-                else:
-                    print(
-                        f"Substituted {self.hyp} to replace {other_expr} with {newtarget}."
-                    )
+        for other_name, other_expr, newtarget in changes:
+            if self.reversed:
+                logger.info(
+                    "Substituted %s in reverse to replace %s with %s.",
+                    self.hyp,
+                    other_expr,
+                    newtarget,
+                )
+            else:
+                logger.info(
+                    "Substituted %s to replace %s with %s.",
+                    self.hyp,
+                    other_expr,
+                    newtarget,
+                )
             newstate.hypotheses[other_name] = newtarget
 
-        newtarget = state.goal.subs(hyp.lhs, hyp.rhs)
+        newtarget = substitution(state.goal)
         if newtarget != state.goal:
             if self.reversed:
-                print(
-                    f"Substituted {self.hyp} in reverse to replace {state.goal} with {newtarget}."
+                logger.info(
+                    "Substituted %s in reverse to replace %s with %s.",
+                    self.hyp,
+                    state.goal,
+                    newtarget,
                 )
             else:
-                print(
-                    f"Substituted {self.hyp} to replace {state.goal} with {newtarget}."
+                logger.info(
+                    "Substituted %s to replace %s with %s.",
+                    self.hyp,
+                    state.goal,
+                    newtarget,
                 )
         newstate.set_goal(newtarget)
 
-        if newstate == state:
-            print("Substitution had no effect.")
+        if newstate.hypotheses == state.hypotheses and newtarget == state.goal:
+            logger.info("Substitution had no effect.")
         if newtarget == true:
-            print("Goal proved!")
+            logger.info("Goal proved!")
             return []
         return [newstate]
 
@@ -232,3 +256,47 @@ class SubstAll(Tactic):
     label = "Substitute all"
     description = "Use an existing equality hypothesis to substitute all instances of one side with the other in the goal and all other hypotheses."
     arguments = ["hypotheses"]
+
+
+class Congruence(Tactic):
+    """
+    Use all the equality hypotheses at once: rewrite the goal and all other hypotheses (other than variable declarations and the equalities themselves), replacing each term with the simplest term that the equalities make it equal to (a number, if there is one).  Closes the goal if it follows from the equalities by congruence, or if the equalities are inconsistent.
+    """
+
+    def activate(self, state: ProofState) -> list[ProofState]:
+        closure = CongruenceClosure(state.hypotheses.values())
+        if closure.inconsistent:
+            logger.info("The equality hypotheses are inconsistent.")
+            logger.info("Goal proved!")
+            return []
+        if closure.decide(state.goal):
+            logger.info("Goal %s follows from the equality hypotheses.", state.goal)
+            return []
+
+        newstate = state.copy()
+        memo = {}
+        for name, hypothesis in state.hypotheses.items():
+            if isinstance(hypothesis, Type | Eq):
+                continue
+            newhypothesis = closure.canonical(hypothesis, memo)
+            if newhypothesis != hypothesis:
+                logger.info("Rewrote %s as %s.", hypothesis, newhypothesis)
+                newstate.hypotheses[name] = newhypothesis
+
+        newtarget = closure.canonical(state.goal, memo)
+        if newtarget != state.goal:
+            logger.info("Rewrote %s as %s.", state.goal, newtarget)
+        if newtarget == true:
+            logger.info("Goal proved!")
+            return []
+        if newstate.hypotheses == state.hypotheses and newtarget == state.goal:
+            logger.info("Rewriting had no effect.")
+        newstate.set_goal(newtarget)
+        return [newstate]
+
+    def __str__(self) -> str:
+        return "cc"
+
+    label = "Congruence closure"
+    description = "Use all the equality hypotheses at once to rewrite the goal and all other hypotheses in terms of the simplest equal terms."
+    arguments = []
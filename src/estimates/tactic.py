@@ -3,11 +3,16 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Literal
 
+from z3 import Z3Exception
+
 if TYPE_CHECKING:
     from estimates.proofstate import ProofState
 
 ## Tactics are operations that can transform a proof state into one or more proof states.
 
+# The errors raised by tactics that do not apply to a proof state: tactics raise ValueError when their arguments do not fit the proof state, sympy raises TypeError when it cannot decide a relation, and z3 raises Z3Exception on statements outside the theories it handles.
+TACTIC_ERRORS = (ValueError, TypeError, Z3Exception)
+
 
 class Tactic(ABC):
     @abstractmethod
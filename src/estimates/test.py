@@ -3,17 +3,54 @@ from __future__ import annotations
 from collections.abc import Iterable
 from typing import TYPE_CHECKING
 
-from sympy import Basic, true
-from sympy.logic.boolalg import Implies
+from sympy import Basic, Eq, Ne, false, true
+from sympy.core.relational import Relational
+from sympy.logic.boolalg import Boolean, Implies
+
+from estimates.hypothesis_index import SIGNS, HypothesisIndex
+from estimates.output import get_logger
+from estimates.tactic import Tactic
 
 if TYPE_CHECKING:
     from estimates.proofstate import ProofState
-from estimates.tactic import Tactic
+
+logger = get_logger(__name__)
+
+
+def implied_by(hypotheses: HypothesisIndex, goal: Basic) -> list[Basic] | None:
+    """
+    The hypotheses from which the goal follows immediately, or None if it does not.  The checks are ordered from cheapest to most expensive:
+
+    * a hash lookup of the goal (or of False) among the hypotheses;
+    * for a relational goal, the signs of rhs - lhs allowed by the hypotheses relating the same two sides, as in the simplifier; then a lookup of its canonical form (e.g. `y > x` for `x < y`);
+    * for an equation or disequation, the congruence closure of the equality hypotheses;
+    * for a goal or hypothesis that is not a proposition, sympy's evaluation of `Implies(hyp, goal)`.
+    """
+    if goal in hypotheses:
+        return [goal]
+    if false in hypotheses:
+        return [false]
+    if isinstance(goal, Relational):
+        lhs, rhs = goal.args
+        signs = hypotheses.relation_signs(lhs, rhs)
+        if signs is not None and signs <= SIGNS[goal.rel_op]:
+            return hypotheses.relations[lhs, rhs]
+        hyp = hypotheses.canonical_relations().get(goal.canonical)
+        if hyp is not None:
+            return [hyp]
+    if isinstance(goal, Eq | Ne):
+        closure = hypotheses.closure()
+        if closure is not None and closure.decide(goal):
+            return [hyp for hyp in hypotheses if isinstance(hyp, Eq)]
+    for hyp in hypotheses:
+        if not (isinstance(goal, Boolean) and isinstance(hyp, Boolean)) and Implies(hyp, goal) == True:
+            return [hyp]
+    return None
 
 
-def test(hypotheses: Iterable[Basic|None], goal: Basic, verbose: bool = True) -> bool:
+def test(hypotheses: Iterable[Basic|None] | HypothesisIndex, goal: Basic, verbose: bool = True) -> bool:
     """
-    Check if a goal follows immediately from the stated hypotheses, including from the implicit ones.
+    Check if a goal follows immediately from the stated hypotheses, including from the implicit ones.  The hypotheses may be given already indexed, as a `HypothesisIndex`.
     """
 
     # use of sympy's simplifier has been discontinued as it caused multiple unwanted operations and simplifications
@@ -21,13 +58,17 @@ def test(hypotheses: Iterable[Basic|None], goal: Basic, verbose: bool = True) ->
     if goal == true:
         return True
 
-    for hyp in hypotheses:
-        if hyp != None:
-            if Implies(hyp, goal) == True:
-                if verbose:
-                    print(f"Goal {goal} follows from hypothesis {hyp}!")
-                return True
-    return False
+    if not isinstance(hypotheses, HypothesisIndex):
+        hypotheses = HypothesisIndex(hyp for hyp in hypotheses if hyp != None)
+    used = implied_by(hypotheses, goal)
+    if used is None:
+        return False
+    if verbose:
+        if len(used) == 1:
+            logger.info("Goal %s follows from hypothesis %s!", goal, used[0])
+        else:
+            logger.info("Goal %s follows from hypotheses %s!", goal, ", ".join(str(hyp) for hyp in used))
+    return True
 
 
 class Trivial(Tactic):
@@ -37,10 +78,13 @@ class Trivial(Tactic):
 
     def activate(self, state: ProofState) -> list[ProofState]:
         if state.test(state.goal):
-            print(f"Goal {state.goal} follows trivially from the hypotheses.")
+            logger.info("Goal %s follows trivially from the hypotheses.", state.goal)
             return []
         else:
-            print(f"Goal {state.goal} does not follow trivially from the hypotheses.")
+            logger.info(
+                "Goal %s does not follow trivially from the hypotheses.",
+                state.goal,
+            )
             return [state.copy()]
 
     def __str__(self) -> str:
@@ -1,6 +1,22 @@
+import io
+import json
+import sys
+
 import pytest
+import sympy
 
 from estimates.main import *
+from estimates.assumptions import ask
+from estimates.basic import Type
+from estimates.batch import AllGoals, Job, run_batch
+from estimates.benchmark import compare, load_baseline, run_benchmarks, save_baseline, simp_all_family
+from estimates.output import output_mode
+from estimates.profiling import profiling
+from estimates.proofstate import Hypotheses
+from estimates.prooftree import ProofTree
+from estimates.rewrite import Substitution
+from estimates.simp import makeSimplestGoal, rsimp
+from estimates.test import test as follows  # not collected by pytest under this name
 
 class TestAll(object):
 
@@ -29,7 +45,279 @@ class TestAll(object):
     def test_case_split_solution(self, capsys):
         case_split_solution()
         self.proof_complete(capsys)
-    
+
+    def test_tauto(self, capsys):
+        case_split_tauto_solution()
+        self.proof_complete(capsys)
+        p = pigeonhole_exercise()
+        p.use(Tauto(arithmetic=False))
+        captured = capsys.readouterr()
+        assert captured.out.endswith("all hold when:\nx + y > 5\nx <= 2\ny <= 3\n")
+        p.use(Tauto())
+        self.proof_complete(capsys)
+
+    def test_goal_navigation(self, capsys):
+        p = split_exercise()
+        p.use(SplitHyp("h1"))
+        p.use(SplitGoal())
+        p.last_goal()
+        p.previous_goal()
+        p.next_goal()
+        p.undo()
+        captured = capsys.readouterr()
+        assert captured.out.endswith("2 goals remaining.\nMoved to goal 2 of 2.\nMoved to goal 1 of 2.\nMoved to goal 2 of 2.\nMoved to a proof state currently handled by \"split_goal\").\nUndid previous tactic (split_goal).\n")
+        assert p.proof_tree.num_sorries() == 1
+        p.use(SplitHyp("h2"))
+        p.use(SplitGoal())
+        p.all_goals_use(Linarith())
+        self.proof_complete(capsys)
+
+    def test_parallel_all_goals(self, capsys):
+        p = split_exercise()
+        p.use(SplitHyp("h1"))
+        p.use(SplitHyp("h2"))
+        p.use(SplitGoal())
+        p.all_goals_use(SubstAll("h3"), workers=2)
+        captured = capsys.readouterr()
+        assert "ValueError: h3 is not a hypothesis in the current proof state." in captured.out
+        assert p.proof_tree.num_sorries() == 2
+        p.all_goals_use(Linarith(), workers=2)
+        self.proof_complete(capsys)
+
+    def test_rsimp_index(self, capsys):
+        x, y, z = sympy.symbols("x y z", real=True)
+        assert rsimp(sympy.Eq(x, y), {x <= y, y <= x}) == sympy.true
+        assert rsimp(x < y, {x <= y, sympy.Ne(x, y)}) == sympy.true
+        assert rsimp(x <= y, {x >= y}) == sympy.Eq(x, y)
+        assert rsimp(sympy.Max(x, y, z) + 1, {x < z}) == sympy.Max(y, z) + 1
+        goal = sympy.Max(x, y) ** 2 + sympy.Max(x, y) * z <= 1
+        with profiling() as profiler:
+            assert rsimp(goal, {z > 0}) is goal
+        assert profiler.counters["rsimp_cache_hits"] == 1  # the second Max(x, y)
+
+    def test_implication_test(self, capsys):
+        x, y = sympy.symbols("x y", real=True)
+        assert follows({x < y}, x <= y)
+        assert capsys.readouterr().out == "Goal x <= y follows from hypothesis x < y!\n"
+        assert follows({x <= y, sympy.Ne(x, y)}, y > x)
+        assert follows({-x < -y}, y < x)
+        assert follows({sympy.false}, x < y)
+        assert not follows({x <= y}, x < y)
+
+    def test_contrapose_negation(self, capsys):
+        p = ProofAssistant()
+        Ps = p.vars("bool", *[f"P_{i}" for i in range(12)])
+        x = p.var("real", "x")
+        p.begin_proof(sympy.Or(*[Ps[i] & (x < i) for i in range(12)]))
+        p.use(Contrapose())
+        hypothesis = p.current_proof_state().hypotheses["this"]
+        assert hypothesis == sympy.And(*[~Ps[i] | (x >= i) for i in range(12)])
+
+    def test_boolean_substitution(self, capsys):
+        a, b, c = sympy.symbols("a b c")
+        x = sympy.Symbol("x", real=True)
+        assert makeSimplestGoal(a & b & c, {a & b}) == c
+        assert makeSimplestGoal(a | b | c, {a | b}) == sympy.true
+        assert makeSimplestGoal(sympy.Implies(a, b) & (x < 1), {~b, x < 1}) == ~a
+        assert makeSimplestGoal(a & b & c, {~(a & b)}) == sympy.false
+
+    def test_simp_all_repeat(self, capsys):
+        p = ProofAssistant()
+        x, y = p.vars("real", "x", "y")
+        p.assume(x > 0, "h1")
+        p.assume((x > 0) | (y > 0), "h2")
+        p.assume((y > 0) | (x + y > 1), "h3")
+        p.begin_proof(x + y > 0)
+        p.use(SimpAll(repeat=True))
+        assert list(p.current_hypotheses()) == ["x", "y", "h1", "h3"]
+
+    def test_assumption_cache_retype(self, capsys):
+        p = ProofAssistant()
+        x, y = p.vars("real", "x", "y")
+        p.assume(x > 0, "h")
+        p.begin_proof(x**3 + x > y)
+        state = p.current_proof_state()
+        assert ask(x**3 + x, "positive", state.assumption_cache) is None
+        p.use(IsPositive("x"))
+        new_state = p.current_proof_state()
+        assert new_state.assumption_cache is state.assumption_cache
+        (new_x,) = p.get_vars("x")
+        assert new_x != x
+        assert new_state.goal == (new_x**3 + new_x > y)
+        assert ask(new_state.goal.lhs, "positive", new_state.assumption_cache) is True
+        assert ask(x**3 + x, "positive", new_state.assumption_cache) is None
+
+    def test_simp_all_equation_chain(self, capsys):
+        p = ProofAssistant()
+        x, w, v, u, z = p.vars("real", "x", "w", "v", "u", "z")
+        p.assume(sympy.Eq(x, w), "h1")
+        p.assume(sympy.Eq(w, v), "h2")
+        p.assume(sympy.Eq(v, u), "h3")
+        p.assume(sympy.Eq(u, z), "h4")
+        p.begin_proof(sympy.Eq(x, z))
+        p.use(SimpAll())
+        self.proof_complete(capsys)
+
+    def test_content_hash(self, capsys):
+        p = split_exercise()
+        x, y = p.get_vars("x", "y")
+        state = p.current_proof_state()
+        original_hash = state.content_hash()
+        hypotheses_hash = state.hypotheses.content_hash()
+        copy = state.copy()
+        hypothesis = copy.hypotheses["h1"]
+        copy.hypotheses["h1"] = x > 0
+        assert len(copy.hypotheses) == len(state.hypotheses)
+        assert copy.hypotheses.content_hash() != hypotheses_hash
+        assert not copy.eq(state)
+        assert copy.hypotheses != state.hypotheses
+        copy.hypotheses["h1"] = hypothesis
+        assert copy.hypotheses.content_hash() == hypotheses_hash
+        assert copy.content_hash() == original_hash
+        assert copy.eq(state)
+        assert copy.hypotheses == state.hypotheses
+        copy.set_goal(x + y > 0)
+        assert not copy.eq(state)
+
+    def test_hypotheses_copy(self, capsys):
+        p = split_exercise()
+        x, y = p.get_vars("x", "y")
+        state = p.current_proof_state()
+        original = dict(state.hypotheses)
+        copy = state.copy()
+        copy.hypotheses["h1"] = x > 0
+        del copy.hypotheses["x"]
+        copy.hypotheses["h3"] = y > 0
+        assert dict(state.hypotheses) == original
+        assert list(state.hypotheses) == ["x", "y", "h1", "h2"]
+        assert list(copy.hypotheses) == ["y", "h1", "h2", "h3"]
+        assert copy.hypotheses["h1"] == (x > 0)
+        copy.hypotheses["x"] = x < 0
+        assert list(copy.hypotheses) == ["y", "h1", "h2", "h3", "x"]
+
+    def test_symbol_table(self, capsys):
+        x = sympy.Symbol("x", real=True)
+        hypotheses = Hypotheses({"a": Type(x), "b": Type(x)})
+        copy = hypotheses.copy()
+        del copy["a"]
+        assert copy.var_name(x) == "b"
+        assert set(copy.vars()) == {x}
+        copy["b"] = x > 0
+        assert copy.var_name(x) is None
+        assert hypotheses.var_name(x) == "a"
+
+    def test_occurrence_index(self, capsys):
+        p = split_exercise()
+        x, y = p.get_vars("x", "y")
+        hypotheses = p.current_proof_state().hypotheses
+        assert hypotheses.mentioning([x]) == ["x", "h1"]
+        copy = hypotheses.copy()
+        copy["h3"] = x + y > 0
+        del copy["h1"]
+        assert copy.mentioning([x]) == ["x", "h3"]
+        assert copy.mentioning([x, y]) == ["h3"]
+        assert hypotheses.mentioning([x]) == ["x", "h1"]
+
+    def test_deep_proof_tree(self, capsys):
+        state = split_exercise().current_proof_state()
+        depth = sys.getrecursionlimit() + 100
+        root = node = ProofTree(state)
+        for _ in range(depth):
+            node, _ = node.splice(Trivial(), [state, state])
+        assert len(root.rstr_join(current_node=node).split("\n")) == 2 * depth + 1
+        assert len(list(root.iter_nodes())) == 2 * depth + 1
+        assert root.num_sorries() == depth + 1
+        assert len(root.list_sorries()) == depth + 1
+        assert root.find_sorry(node) == (True, None, node.parent.children[1])
+        assert root.count_sorries(node) == (True, 0, depth)
+        assert len(root.to_steps()) == 2 * depth + 1
+
+    def test_state_budget(self, capsys):
+        q = split_exercise()
+        q.use(SplitHyp("h1"))
+        p = split_exercise()
+        p.set_state_budget(0)
+        p.use(SplitHyp("h1"))
+        p.use(SplitHyp("h2"))
+        node = p.proof_tree.children[0]
+        assert node._proof_state is None
+        assert node.proof_state.eq(q.current_proof_state())
+        p.use(SplitGoal())
+        p.all_goals_use(Linarith())
+        self.proof_complete(capsys)
+
+    def test_output_modes(self, capsys):
+        with output_mode("silent"):
+            linarith_solution()
+        assert capsys.readouterr().out == ""
+        with output_mode("json"):
+            linarith_solution()
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert messages[-1] == {"level": "info", "source": "estimates.proofassistant", "message": "Proof complete!"}
+        linarith_solution()
+        self.proof_complete(capsys)
+
+    def test_profiling(self, capsys):
+        p = linarith_exercise()
+        with profiling() as profiler:
+            p.use(Linarith())
+        self.proof_complete(capsys)
+        assert p.proof_tree.profile["counters"]["lp_calls"] == 1
+        trace = profiler.chrome_trace()
+        assert {event["name"] for event in trace["traceEvents"]} == {"linarith", "feasibility"}
+
+    def test_auto(self, capsys):
+        p = split_exercise()
+        p.auto()
+        self.proof_complete(capsys)
+        assert [str(node.tactic) for node in p.proof_tree.iter_nodes()] == ["split_hyp h1", "split_hyp h2", "split_goal", "linarith", "linarith"]
+        pigeonhole_auto_solution()
+        self.proof_complete(capsys)
+
+    def test_save_load_proof(self, capsys):
+        p = split_exercise()
+        p.use(SplitHyp("h1"))
+        p.use(SplitHyp("h2"))
+        p.use(SplitGoal())
+        p.all_goals_use(Linarith())
+        file = io.StringIO()
+        p.save_proof(file)
+        q = ProofAssistant()
+        q.load_proof(io.StringIO(file.getvalue()))
+        self.proof_complete(capsys)
+        assert q.theorem_str == p.theorem_str
+        assert q.proof_tree.rstr_join() == p.proof_tree.rstr_join()
+        data = json.loads(file.getvalue())
+        data["goal"] = {"sympy": "__import__('os').getcwd()"}
+        with pytest.raises(ValueError):
+            ProofAssistant().load_proof(io.StringIO(json.dumps(data)))
+        data = json.loads(file.getvalue())
+        for name in ["estimates.parallel.ProcessPoolExecutor", "estimates.proofassistant.ProofAssistant", "estimates.missing.Tactic"]:
+            data["steps"][0][0] = {"object": name, "vars": {}}
+            with pytest.raises(ValueError):
+                ProofAssistant().load_proof(io.StringIO(json.dumps(data)))
+
+    def test_batch(self, capsys):
+        jobs = [
+            Job.from_assistant("split", split_exercise(), [SplitHyp("h1"), SplitHyp("h2"), SplitGoal(), AllGoals(Linarith())]),
+            Job.from_assistant("open", split_exercise(), [SplitGoal()]),
+            Job.from_assistant("error", split_exercise(), [Claim(3)]),
+        ]
+        results = run_batch(jobs, workers=2)
+        assert [result["status"] for result in results] == ["proved", "open", "error"]
+        assert results[1]["goals"] == 2
+        assert results[0]["counters"]["lp_calls"] > 0
+        assert "linarith" in results[0]["timings"]
+
+    def test_benchmark(self, capsys):
+        results = run_benchmarks([simp_all_family(4)], repeat=1)
+        assert results["simp_all[4]"]["peak_memory"] > 0
+        file = io.StringIO()
+        save_baseline(results, file)
+        baseline = load_baseline(io.StringIO(file.getvalue()))
+        baseline["simp_all[4]"]["median"] /= 10
+        assert compare(results, baseline) == ["simp_all[4]"]
+
     def test_split_solution(self, capsys):
         split_solution()
         self.proof_complete(capsys)
@@ -87,6 +375,10 @@ class TestAll(object):
         loglinarith_hard_solution2()
         self.proof_complete(capsys)
 
+    def test_loglinarith_hard_solution3(self, capsys):
+        loglinarith_hard_solution3()
+        self.proof_complete(capsys)
+
     def test_littlewood_paley_solution(self, capsys):
         littlewood_paley_solution()
         self.proof_complete(capsys)
@@ -107,6 +399,27 @@ class TestAll(object):
         subst_all_solution_reversed()
         self.proof_complete(capsys)
 
+    def test_congruence(self, capsys):
+        p = subst_example()
+        p.use(Trivial())
+        self.proof_complete(capsys)
+        p = subst_all_example()
+        p.use(Congruence())
+        assert str(p.current_proof_state().goal) == "x + y + z <= 100"
+        p.use(Linarith())
+        self.proof_complete(capsys)
+        subst_all_congruence_solution()
+        self.proof_complete(capsys)
+
+    def test_substitution(self, capsys):
+        x, y, z, a = sympy.symbols("x y z a", real=True)
+        substitution = Substitution({x: y + 1})
+        assert substitution(sympy.Max(x, z) <= x**2) == (sympy.Max(y + 1, z) <= (y + 1) ** 2)
+        with profiling() as profiler:
+            assert substitution(sympy.Max(x, z) > 0) == (sympy.Max(y + 1, z) > 0)
+        assert profiler.counters["substitutions"] == 2  # only the new nodes are visited
+        assert Substitution({x + y: a})(x + y + z <= 1) == (a + z <= 1)
+
     def test_sympy_simplify_solution(self, capsys):
         sympy_simplify_solution()
         self.proof_complete(capsys)